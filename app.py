@@ -2,140 +2,126 @@
 import eventlet
 eventlet.monkey_patch()
 
+import os
+from shared.boot import boot
+
+# Set default configuration values for key operational parameters
+# (before the modules below load the shared configuration)
+os.environ.setdefault('UI_UPDATE_INTERVAL', '2')  # Broadcast UI updates every 2 seconds
+os.environ.setdefault('DB_UPDATE_INTERVAL', '60')  # 60 seconds default
+os.environ.setdefault('NETWORK_UPDATE_INTERVAL', '60') # 60 seconds default
+os.environ.setdefault('REPORT_JOB_WORKERS', '2')  # Concurrent background report jobs
+os.environ.setdefault('CONFIG_WATCH_INTERVAL', '2')  # Seconds between config file checks
+os.environ.setdefault('SENSOR_ACQUISITION', 'thread')  # 'process' samples sensors in hardware.acquisition
+os.environ.setdefault('WEB_WORKERS', '0')  # Web worker processes; 0 serves everything from this process
+
 # Now import Flask and other modules
 import signal
 import sys
 import time    # For the sleep function in signal handler
 import threading
 from flask import Flask, render_template, request, has_request_context
-from shared.database import db
-from shared.socketio import socketio
-import os
-import socket
-import platform  # Add platform import here
-import subprocess  # Add subprocess import for the SSID function
-from shared.config import Config
+from shared.database import db, add_missing_columns
+from shared.socketio import socketio, init_socketio
+from shared import workers
+from shared.workers import is_worker, worker_local, socketio_transports
+from shared.message_queue import MessageBroker, DEFAULT_URL, socket_path
+from shared.config import Config, get_config
+from shared.network import network_info
 from shared.routes import shared_bp
 from irrigation.routes import irrigation_bp
 from weather.routes import weather_bp
 from reports.routes import reports_bp
+import copy
 import json
 import logging
-from irrigation.controllers import init_scheduler, shutdown_scheduler
+from irrigation.controllers import init_scheduler, shutdown_scheduler, init_zone_sensors, init_rules, init_predictor
 
 # Import all models to ensure they are registered with SQLAlchemy
 from weather.models import WeatherData
-from irrigation.models import Preset, PumpLog, IrrigationLog
+from irrigation.models import Preset, Schedule, PumpLog, IrrigationLog
 
-# Set default configuration values for key operational parameters
-os.environ.setdefault('UI_UPDATE_INTERVAL', '2')  # Broadcast UI updates every 2 seconds
-os.environ.setdefault('DB_UPDATE_INTERVAL', '60')  # 60 seconds default
-os.environ.setdefault('NETWORK_UPDATE_INTERVAL', '60') # 60 seconds default
+# Module imports include the pump and zone setup in irrigation.controllers
+boot.measure('imports')
 
-def get_ip_address():
-    """Get the primary IP address of the device"""
-    try:
-        # Create a socket connection to determine the primary interface IP
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        # Doesn't need to be reachable, just used to determine interface
-        s.connect(('8.8.8.8', 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception as e:
-        print(f"Error getting IP address: {e}")
-        return '127.0.0.1'  # Fallback to localhost
+# With web workers, the primary runs the local message broker and the worker processes
+message_broker = None
+worker_pool = None
 
-def get_network_ssid():
-    """Get the SSID of the connected WiFi network."""
-    try:
-        if platform.system() == "Linux":
-            # For Raspberry Pi / Linux
-            result = subprocess.check_output(['iwgetid', '-r']).decode('utf-8').strip()
-            return result if result else "Not connected"
-        else:
-            # For other OS (e.g., development)
-            return "Dev-SSID"  # Placeholder for development
-    except Exception as e:
-        print(f"Error getting network SSID: {e}")
-        return "Unknown"
+def publish_network_info(app, info):
+    """Publishes a network change to the app config and connected clients."""
+    app.config['IP_ADDRESS'] = info['ip_address']
+    app.config['NETWORK_SSID'] = info['ssid']
+    socketio.emit('network_info', info)
 
-def update_network_info(app):
-    """Updates network IP and SSID in app config."""
-    ip_address = get_ip_address()
-    network_ssid = get_network_ssid()
+def apply_config_changes(app, snapshot, changed_keys):
+    """Applies reloaded logging, sensor calibration and circuit breaker settings to the running app."""
+    from weather.controllers import sensor_controller
     
-    current_ip = app.config.get('IP_ADDRESS')
-    current_ssid = app.config.get('NETWORK_SSID')
-
-    if ip_address != current_ip or network_ssid != current_ssid:
-        logging.info(f"Network change detected. New IP: {ip_address}, New SSID: {network_ssid}")
-        app.config['IP_ADDRESS'] = ip_address
-        app.config['NETWORK_SSID'] = network_ssid
+    if any(key.startswith('logging.') for key in changed_keys):
+        app.config['logging'] = copy.deepcopy(snapshot.get('logging', {}))
+        sensor_controller.apply_logging_config(app.config['logging'])
+    if any(key.startswith('hardware.sensors.pins.') for key in changed_keys):
+        sensor_controller.apply_calibration(snapshot.get('hardware.sensors.pins', {}))
+    if any(key.startswith('hardware.circuit_breaker.') for key in changed_keys):
+        sensor_controller.apply_breaker_config(snapshot.get('hardware.circuit_breaker', {}))
 
-def network_update_loop(app):
-    """Periodically updates network information."""
-    interval = app.config.get('NETWORK_UPDATE_INTERVAL', 60)
-    logging.info(f"Network info will be updated every {interval} seconds.")
-    
-    while getattr(app, 'network_thread_running', False):
-        update_network_info(app)
-        eventlet.sleep(interval)
+def init_database(app):
+    """Creates missing tables and columns."""
+    with app.app_context():
+        db.create_all()
+        add_missing_columns(Schedule, PumpLog, IrrigationLog)
 
 def create_app(config_class=Config):
     # Configure logging to show INFO level messages in the terminal
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     
-    # Initialize configuration
-    config = config_class()
-    
-    # Create Flask app
-    app = Flask(__name__)
-    app.config.from_object(config)
-    
-    # Load and apply the logging configuration
-    logging_config_path = os.path.join(os.path.dirname(__file__), 'config', 'logging.json')
-    if os.path.exists(logging_config_path):
-        with open(logging_config_path, 'r') as f:
-            try:
-                logging_config = json.load(f)
-                app.config['logging'] = logging_config
-                logging.info("Successfully loaded logging configuration.")
-            except json.JSONDecodeError as e:
-                logging.error(f"Could not parse logging.json: {e}")
-    else:
-        logging.warning(f"Logging config file not found at {logging_config_path}")
-
-    # Configure the database with an absolute path to instance/app.db
-    basedir = os.path.abspath(os.path.dirname(__file__))
-    db_path = os.path.join(basedir, 'instance', 'app.db')
-    
-    # Ensure the instance directory exists
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
-    # Initialize extensions
-    db.init_app(app)
-    socketio.init_app(app)
-    
-    # Register blueprints - IMPORTANT: Remove url_prefix to fix 404 errors
-    app.register_blueprint(shared_bp)
-    app.register_blueprint(irrigation_bp)  # Removed url_prefix
-    app.register_blueprint(weather_bp)     # Removed url_prefix
-    app.register_blueprint(reports_bp, url_prefix='/reports')
+    with boot.phase('config'):
+        # Initialize configuration (the shared instance, so hot reloads reach every module)
+        config = get_config() if config_class is Config else config_class()
+        
+        # Create Flask app
+        app = Flask(__name__)
+        app.config.from_object(config)
+        
+        # Load and apply the logging configuration
+        logging_config_path = os.path.join(os.path.dirname(__file__), 'config', 'logging.json')
+        if os.path.exists(logging_config_path):
+            with open(logging_config_path, 'r') as f:
+                try:
+                    logging_config = json.load(f)
+                    app.config['logging'] = logging_config
+                    logging.info("Successfully loaded logging configuration.")
+                except json.JSONDecodeError as e:
+                    logging.error(f"Could not parse logging.json: {e}")
+        else:
+            logging.warning(f"Logging config file not found at {logging_config_path}")
     
-    # Create database tables within app context
-    with app.app_context():
-        db.create_all()
+        # Configure the database with an absolute path to instance/app.db
+        basedir = os.path.abspath(os.path.dirname(__file__))
+        db_path = os.path.join(basedir, 'instance', 'app.db')
+        
+        # Ensure the instance directory exists
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
-    # Initialize the irrigation scheduler
-    init_scheduler(app)
+    with boot.phase('extensions'):
+        # Initialize extensions
+        db.init_app(app)
+        init_socketio(app)
+        
+        # Register blueprints - IMPORTANT: Remove url_prefix to fix 404 errors
+        app.register_blueprint(shared_bp)
+        app.register_blueprint(irrigation_bp)  # Removed url_prefix
+        app.register_blueprint(weather_bp)     # Removed url_prefix
+        app.register_blueprint(reports_bp, url_prefix='/reports')
     
     @app.route('/')
+    @worker_local
     def index():
-        return render_template('index.html')
+        return render_template('index.html', socketio_transports=socketio_transports())
         
     # Add server time endpoint to fix 404 error
     @app.route('/api/server-time', methods=['GET'])
@@ -143,12 +129,55 @@ def create_app(config_class=Config):
         from datetime import datetime
         return {"time": datetime.now().isoformat()}
     
+    if is_worker():
+        # A web worker serves pages, sockets and database reads; the primary does the rest
+        workers.init_app(app)
+        workers.watch_primary()
+        signal.signal(signal.SIGINT, lambda sig, frame: sys.exit(0))
+        return app
+    
+    # Keep the network information in the app config; it is polled once started
+    network_info.refresh_interval = app.config.get('NETWORK_UPDATE_INTERVAL', 60)
+    network_info.add_listener(lambda info: publish_network_info(app, info))
+    
+    # The database schema and the network lookup do not depend on each other
+    results = boot.run_parallel({
+        'database': lambda: init_database(app),
+        'network': lambda: network_info.refresh(force=True)
+    })
+    if isinstance(results['database'], Exception):
+        raise results['database']
+    
+    with boot.phase('irrigation'):
+        # Initialize the irrigation scheduler
+        init_scheduler(app)
+        
+        # Sample the soil moisture of zones that have their own sensor channel
+        from weather.controllers import sensor_controller
+        init_zone_sensors(sensor_controller)
+        init_rules(sensor_controller)
+        init_predictor(app, sensor_controller)
+    
+    with boot.phase('services'):
+        # Reload changed configuration files without a restart
+        config.subscribe(lambda snapshot, changed: apply_config_changes(app, snapshot, changed),
+                         ['logging.', 'hardware.sensors.pins.', 'hardware.circuit_breaker.'])
+        config.watch(config.get('server.config_watch_interval', 2))
+        
+        # Let scheduled runs compute ET0 outside a request
+        from weather.controllers import et0_calculator
+        et0_calculator.set_app(app)
+    
     def signal_handler(sig, frame):
-        """Handle SIGINT (Ctrl+C) gracefully."""
-        logging.info("\nReceived SIGINT")
+        """Handle SIGINT (Ctrl+C) and SIGTERM (kill, systemd stop) gracefully."""
+        logging.info(f"\nReceived {signal.Signals(sig).name}")
         
-        if hasattr(app, 'network_thread_running'):
-            app.network_thread_running = False
+        network_info.stop()
+        get_config().stop_watching()
+        if worker_pool:
+            worker_pool.stop()
+        if message_broker:
+            message_broker.stop()
         
         # Shutdown the irrigation scheduler
         shutdown_scheduler()
@@ -176,25 +205,36 @@ def create_app(config_class=Config):
     
     # Register signal handler
     signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
     
     return app
 
 if __name__ == '__main__':
+    web_workers = workers.worker_count()
+    if web_workers > 0 and not is_worker():
+        # Start the local broker before anything emits (a redis:// queue runs on its own)
+        queue_url = os.environ.get('SOCKETIO_MESSAGE_QUEUE', DEFAULT_URL)
+        if queue_url.startswith('unix://'):
+            message_broker = MessageBroker(socket_path(queue_url))
+            message_broker.start()
+    
     app = create_app()
-    app.network_thread_running = True
     
     # Get configuration values
     config = app.config.get_namespace('')
     
+    if is_worker():
+        # Every worker listens on the public port; eventlet.listen sets SO_REUSEPORT
+        boot.mark('server')
+        socketio.run(app, host=config.get('HOST', '0.0.0.0'), port=config.get('PORT', 5000))
+        sys.exit(0)
+    
     # Get logging interval for display
     logging_config = config.get('logging', {})
     log_interval = logging_config.get('log_interval', 60)
     
-    # Initial network info fetch
-    update_network_info(app)
-    
-    # Start network update loop
-    eventlet.spawn(network_update_loop, app)
+    # Watch for network changes (the first lookup ran during create_app)
+    network_info.start()
     
     # Run the application
     host = config.get('HOST', '0.0.0.0')
@@ -214,12 +254,19 @@ if __name__ == '__main__':
     print(f"Network check interval: {config.get('NETWORK_UPDATE_INTERVAL', 60)} seconds")
     print(f"CSV logging interval: {log_interval} seconds")
     
-    # Initialize weather controller with app context - moved here to run after server info is displayed
+    # Probe the sensors and LCD in the background; it starts once the server below
+    # is listening, so requests are served while slow hardware initializes
     from weather.controllers import init_app as init_weather
-    print("\nChecking connected devices:")
-    print("-" * 30)
-    init_weather(app)
-    print("-" * 30)
+    print("\nChecking connected devices in the background (see /api/system/boot)")
+    boot.run_background('hardware', init_weather, app)
+    
+    # With web workers, they serve the public port and this process serves them on loopback
+    if web_workers > 0:
+        worker_pool = workers.WorkerPool(web_workers)
+        worker_pool.start()
+        host, port = '127.0.0.1', workers.primary_port()
+        print(f"Web workers: {web_workers} (primary API on {workers.primary_url()})")
+    boot.mark('server')
     
     # Start the server
     socketio.run(app, host=host, port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,443 @@
+"""
+Sensor acquisition in a separate process, publishing through shared memory.
+
+With SENSOR_ACQUISITION=process the sensors are sampled by a standalone
+process (`python -m hardware.acquisition`). Every reading is written into a
+`multiprocessing.shared_memory` block guarded by a sequence lock: the writer
+makes the sequence odd, updates the values, stores a CRC and makes it even
+again. Readers map the block directly and retry if the sequence moved or
+the CRC does not match while they copied the values. Reading never takes a
+lock or serializes anything, and sampling continues while the web process
+restarts.
+
+Block layout (little endian):
+    0   magic (8s), sequence (Q), heartbeat (d), key count (I), names length (I)
+    32  CRC32 of heartbeat, values and counts (I), writer pid (I)
+    64  key names as JSON, padded to NAMES_SIZE
+    ..  values (float64 per key, NaN when missing), then update counts (uint64 per key)
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import signal
+import logging
+import argparse
+import threading
+import subprocess
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .sensor_controller import SensorController
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SENSHM01'
+HEADER = struct.Struct('<8sQdII')
+TRAILER = struct.Struct('<II')
+SEQUENCE_OFFSET = 8
+HEARTBEAT_OFFSET = 16
+TRAILER_OFFSET = 32
+NAMES_OFFSET = 64
+NAMES_SIZE = 1024
+DATA_OFFSET = NAMES_OFFSET + NAMES_SIZE
+DEFAULT_BLOCK_NAME = 'irrigation_sensors'
+
+class SharedReadings:
+    """Seqlock-protected block of the latest sensor readings in shared memory."""
+
+    def __init__(self, shm, keys, owner=False):
+        self.shm = shm
+        self.keys = list(keys)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.owner = owner
+        self.lock = threading.Lock()
+        count = len(self.keys)
+        self.data_end = DATA_OFFSET + 16 * count
+        self.values = np.ndarray((count,), dtype='<f8', buffer=shm.buf, offset=DATA_OFFSET)
+        self.counts = np.ndarray((count,), dtype='<u8', buffer=shm.buf, offset=DATA_OFFSET + 8 * count)
+        self.sequence = struct.unpack_from('<Q', shm.buf, SEQUENCE_OFFSET)[0]
+
+    @classmethod
+    def create(cls, name, keys):
+        """Create (or replace) the block for a set of reading keys. Used by the acquisition process."""
+        names = json.dumps(list(keys)).encode('utf-8')
+        if len(names) > NAMES_SIZE:
+            raise ValueError(f"Too many sensor keys for the shared block ({len(names)} bytes of names)")
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=DATA_OFFSET + 16 * len(keys))
+        shm.buf[NAMES_OFFSET:NAMES_OFFSET + len(names)] = names
+        HEADER.pack_into(shm.buf, 0, MAGIC, 0, 0.0, len(keys), len(names))
+        block = cls(shm, keys, owner=True)
+        block.values[:] = np.nan
+        block.counts[:] = 0
+        block.write({}, [])
+        return block
+
+    @classmethod
+    def attach(cls, name):
+        """Map an existing block read-only by convention. Raises FileNotFoundError if it does not exist."""
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            # Python < 3.13 would unlink the block when this process exits
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        magic, _, _, count, names_length = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"Shared memory block {name} is not a sensor readings block")
+        keys = json.loads(bytes(shm.buf[NAMES_OFFSET:NAMES_OFFSET + names_length]).decode('utf-8'))
+        return cls(shm, keys)
+
+    def _checksum(self):
+        return zlib.crc32(self.shm.buf[HEARTBEAT_OFFSET:HEARTBEAT_OFFSET + 8],
+                          zlib.crc32(self.shm.buf[DATA_OFFSET:self.data_end]))
+
+    def write(self, readings, changed_keys):
+        """Publish the changed readings. Usable directly as a SensorController listener."""
+        with self.lock:
+            self.sequence += 1
+            struct.pack_into('<Q', self.shm.buf, SEQUENCE_OFFSET, self.sequence)
+            for key in changed_keys:
+                i = self.index.get(key)
+                if i is None:
+                    continue
+                value = readings.get(key)
+                self.values[i] = value if isinstance(value, (int, float)) else np.nan
+                self.counts[i] += 1
+            struct.pack_into('<d', self.shm.buf, HEARTBEAT_OFFSET, time.time())
+            TRAILER.pack_into(self.shm.buf, TRAILER_OFFSET, self._checksum(), os.getpid())
+            self.sequence += 1
+            struct.pack_into('<Q', self.shm.buf, SEQUENCE_OFFSET, self.sequence)
+
+    def writer_pid(self):
+        """Get the pid of the process that last wrote the block."""
+        return TRAILER.unpack_from(self.shm.buf, TRAILER_OFFSET)[1]
+
+    def touch(self):
+        """Refresh the heartbeat without changing any reading."""
+        self.write({}, [])
+
+    def read(self, retries=100):
+        """Take a consistent copy of the block.
+
+        Returns:
+            tuple: (sequence, heartbeat, values array, counts array)
+
+        Raises:
+            RuntimeError: If no consistent copy could be taken
+        """
+        buf = self.shm.buf
+        for attempt in range(retries):
+            before = struct.unpack_from('<Q', buf, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                time.sleep(0)
+                continue
+            heartbeat = bytes(buf[HEARTBEAT_OFFSET:HEARTBEAT_OFFSET + 8])
+            data = bytes(buf[DATA_OFFSET:self.data_end])
+            checksum = TRAILER.unpack_from(buf, TRAILER_OFFSET)[0]
+            after = struct.unpack_from('<Q', buf, SEQUENCE_OFFSET)[0]
+            if before == after and zlib.crc32(heartbeat, zlib.crc32(data)) == checksum:
+                count = len(self.keys)
+                return (before, struct.unpack('<d', heartbeat)[0],
+                        np.frombuffer(data, dtype='<f8', count=count),
+                        np.frombuffer(data, dtype='<u8', count=count, offset=8 * count))
+            time.sleep(0)
+        raise RuntimeError("Could not read a consistent sensor snapshot")
+
+    def close(self):
+        """Unmap the block, and remove it if this process created it."""
+        # Views into the buffer must be released before it can be closed
+        self.values = self.counts = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+class SharedMemorySensorController(SensorController):
+    """Sensor controller for the web process that reads the acquisition process's block.
+
+    Listeners, the UI broadcast and get_latest_readings work as with local
+    sensors. Sampling, CSV logging and calibration happen in the acquisition
+    process, which is started if it is not already running. A block whose
+    writer is gone counts as missing; when the block goes stale, the
+    controller re-attaches to a restarted process's block, or starts the
+    process again if its writer died.
+    """
+
+    local_sensors = False
+
+    def __init__(self, block_name=DEFAULT_BLOCK_NAME, poll_interval=0.25, stale_after=15, start_timeout=20):
+        """Initialize the controller.
+
+        Args:
+            block_name: Name of the shared memory block
+            poll_interval: Seconds between checks for new readings
+            stale_after: Seconds without a heartbeat after which readings count as missing
+            start_timeout: Seconds to wait for a newly started acquisition process
+        """
+        super().__init__()
+        self.block_name = block_name
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.start_timeout = start_timeout
+        self.block = None
+        self.last_counts = None
+        self.stale = False
+        self.process = None
+        self.next_recovery = 0
+        self.next_start = 0
+        self.restart_interval = 5
+
+    def _start_acquisition_process(self):
+        """Start the acquisition process in its own session so it outlives this one."""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'hardware.acquisition', '--name', self.block_name],
+            cwd=root, start_new_session=True
+        )
+        logger.info(f"Started sensor acquisition process (pid {self.process.pid}).")
+
+    def _writer_alive(self, pid):
+        """Check whether the process with this pid is still running."""
+        if not pid:
+            return False
+        if self.process is not None and self.process.pid == pid:
+            # Our own child stays visible to os.kill as a zombie until it is reaped
+            return self.process.poll() is None
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _attach_live(self):
+        """Attach to the block if its writer is alive and its heartbeat is fresh, else return None."""
+        try:
+            block = SharedReadings.attach(self.block_name)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            heartbeat = block.read()[1]
+            live = time.time() - heartbeat <= self.stale_after and self._writer_alive(block.writer_pid())
+        except RuntimeError:
+            live = False
+        if not live:
+            block.close()
+            return None
+        return block
+
+    def _use_block(self, block):
+        """Start reading a block, replacing the current one after the acquisition process restarted."""
+        previous, self.block = self.block, block
+        self.last_counts = None
+        if previous is not None:
+            # Counts as the stale block recovering, so every reading is published again
+            self.stale = True
+            previous.close()
+        with self.readings_lock:
+            for key in block.keys:
+                self.last_readings.setdefault(key, None)
+        logger.info(f"Attached to sensor block {self.block_name} (writer pid {block.writer_pid()}) "
+                    f"with keys: {', '.join(block.keys)}")
+
+    def probe_sensors(self):
+        """Attach to the acquisition process's block, starting the process if there is no live one."""
+        with self.probe_lock:
+            if self.probed:
+                return
+            deadline = None
+            while self.block is None:
+                block = self._attach_live()
+                if block is not None:
+                    self._use_block(block)
+                    break
+                if deadline is None:
+                    # Missing, or left over from a process that is gone
+                    self._start_acquisition_process()
+                    deadline = time.monotonic() + self.start_timeout
+                elif time.monotonic() > deadline:
+                    logger.error(f"Sensor acquisition process did not publish {self.block_name}; readings unavailable.")
+                    break
+                time.sleep(0.2)
+            self.probed = True
+
+    def _recover(self):
+        """Re-attach to a restarted acquisition process, or start it again if it died.
+
+        Called while the block is stale (or missing), at most once a second.
+        A process that is alive but stopped publishing is left alone.
+        """
+        now = time.monotonic()
+        if now < self.next_recovery:
+            return
+        self.next_recovery = now + 1
+        block = self._attach_live()
+        if block is not None:
+            self._use_block(block)
+            return
+        if self.block is not None and self._writer_alive(self.block.writer_pid()):
+            return
+        if self.process is not None and self.process.poll() is None:
+            # Started by us and not publishing yet
+            return
+        if now >= self.next_start:
+            logger.warning("Sensor acquisition process is gone; starting it again.")
+            self._start_acquisition_process()
+            # A process that exits right away is not restarted more often than this
+            self.next_start = now + self.restart_interval
+
+    def add_sensor(self, name, instance, key):
+        """Register a reading key; the sensor itself is sampled by the acquisition process."""
+        with self.readings_lock:
+            self.sensor_keys[name] = key
+            self.last_readings.setdefault(key, None)
+
+    def apply_logging_config(self, logging_config):
+        """CSV logging runs in the acquisition process, which applies its own configuration."""
+
+    def apply_calibration(self, pins_config):
+        """Calibration is applied by the acquisition process, which watches the same files."""
+
+    def _subscribe_csv(self):
+        """The acquisition process has the CSV sink; the web process must not log twice."""
+
+    def start_monitoring(self):
+        """Start following the shared block and broadcasting to the UI."""
+        if self.running:
+            logger.warning("Monitoring is already running.")
+            return
+        self.probe_sensors()
+        self.running = True
+        thread = threading.Thread(target=self._poll_loop)
+        thread.daemon = True
+        thread.start()
+        self.sensor_threads.append(thread)
+        self._start_sinks()
+        logger.info("Following readings from the sensor acquisition process.")
+
+    def poll(self):
+        """Copy new readings from the block and notify listeners of the keys that changed.
+
+        Returns:
+            list: The changed keys
+        """
+        if not self.block:
+            self._recover()
+            return []
+        block = self.block
+        _, heartbeat, values, counts = block.read()
+        stale = time.time() - heartbeat > self.stale_after
+        if stale:
+            self._recover()
+            if self.block is not block:
+                # Re-attached; the next poll publishes the new block's readings
+                return []
+        if stale != self.stale:
+            # Every reading disappears when the process stops and returns when it recovers
+            changed = list(self.block.keys)
+            if stale:
+                logger.warning(f"No heartbeat from the sensor acquisition process for {self.stale_after}s.")
+            else:
+                logger.info("Sensor acquisition process is publishing again.")
+        elif stale:
+            changed = []
+        elif self.last_counts is None:
+            changed = [key for i, key in enumerate(self.block.keys) if counts[i]]
+        else:
+            changed = [key for i, key in enumerate(self.block.keys) if counts[i] != self.last_counts[i]]
+        self.last_counts = counts
+        self.stale = stale
+        if not changed:
+            return []
+        with self.readings_lock:
+            for key in changed:
+                value = values[self.block.index[key]]
+                self.last_readings[key] = None if stale or np.isnan(value) else float(value)
+        self._notify_listeners(changed)
+        return changed
+
+    def _poll_loop(self):
+        while self.running:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error reading the shared sensor block: {e}")
+            time.sleep(self.poll_interval)
+
+def create_sensor_controller():
+    """Create the sensor controller for the configured acquisition mode.
+
+    SENSOR_ACQUISITION=process reads from the acquisition process; any other
+    value samples the sensors in this process.
+    """
+    if os.environ.get('SENSOR_ACQUISITION', 'thread') == 'process':
+        return SharedMemorySensorController(os.environ.get('SENSOR_SHM_NAME', DEFAULT_BLOCK_NAME))
+    return SensorController()
+
+def main(argv=None):
+    """Run sensor acquisition until SIGINT or SIGTERM."""
+    from shared.config import get_config
+    from irrigation.zones import zone_moisture_sensors
+
+    parser = argparse.ArgumentParser(description="Sample the sensors and publish readings through shared memory.")
+    parser.add_argument('--name', default=os.environ.get('SENSOR_SHM_NAME', DEFAULT_BLOCK_NAME),
+                        help="Name of the shared memory block")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = get_config()
+    controller = SensorController()
+    controller._initialize_csv_logging({'logging': config.get('logging', {})})
+    controller.apply_breaker_config(config.get('hardware.circuit_breaker', {}))
+    controller.probe_sensors()
+    for zone_id, channel, key in zone_moisture_sensors(config):
+        try:
+            from hardware.soil_moisture import SoilMoistureSensor
+            controller.add_sensor(key, SoilMoistureSensor(channel=channel), key)
+        except Exception as e:
+            logger.error(f"Failed to initialize soil moisture sensor for zone {zone_id}: {e}")
+
+    keys = [key for key in controller.last_readings if key != 'timestamp']
+    block = SharedReadings.create(args.name, keys)
+    controller.add_listener(block.write)
+    config.subscribe(lambda snapshot, changed: controller.apply_logging_config(snapshot.get('logging', {})), ['logging.'])
+    config.subscribe(lambda snapshot, changed: controller.apply_calibration(snapshot.get('hardware.sensors.pins', {})),
+                     ['hardware.sensors.pins.'])
+    config.subscribe(lambda snapshot, changed: controller.apply_breaker_config(snapshot.get('hardware.circuit_breaker', {})),
+                     ['hardware.circuit_breaker.'])
+    config.watch(config.get('server.config_watch_interval', 2))
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda sig, frame: stopping.set())
+    signal.signal(signal.SIGINT, lambda sig, frame: stopping.set())
+
+    controller.start_monitoring()
+    logger.info(f"Publishing {len(keys)} sensor readings to shared memory block {args.name} (pid {os.getpid()}).")
+    try:
+        while not stopping.wait(1.0):
+            block.touch()
+    finally:
+        controller.stop_monitoring()
+        config.stop_watching()
+        block.close()
+        logger.info("Sensor acquisition stopped.")
+
+if __name__ == '__main__':
+    main()
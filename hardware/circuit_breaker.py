@@ -0,0 +1,135 @@
+"""
+Per-sensor circuit breaker with exponential backoff.
+
+A sensor that keeps failing (unplugged probe, dead bus) should not cost a
+driver call, a timeout and an error log line every few seconds. After
+`failure_threshold` consecutive failures the breaker opens and the sensor is
+left alone. Once the backoff has passed it goes half-open and lets a single
+health probe through: success closes it again, failure reopens it with twice
+the delay (up to `max_delay`). Jitter spreads the probes of several dead
+sensors on the same bus apart.
+
+    closed --failures--> open --delay--> half_open --success--> closed
+                          ^                  |
+                          +-----failure------+
+"""
+
+import time
+import random
+import logging
+import threading
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    """Tracks the failures of one sensor and decides when it may be read."""
+
+    def __init__(self, name, failure_threshold=3, base_delay=5.0, max_delay=300.0, jitter=0.2):
+        """Initialize a closed breaker.
+
+        Args:
+            name: Sensor name, used in log messages
+            failure_threshold: Consecutive failures that open the breaker
+            base_delay: Seconds before the first health probe
+            max_delay: Upper bound of the doubled delay
+            jitter: Fraction of the delay added or removed at random
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.next_attempt = 0
+        self.last_error = None
+        self.last_success = None
+        self.stats = {'successes': 0, 'failures': 0, 'probes': 0, 'trips': 0}
+
+    def configure(self, options):
+        """Apply the hardware.circuit_breaker configuration (delays apply from the next failure)."""
+        with self.lock:
+            self.failure_threshold = options.get('failure_threshold', self.failure_threshold)
+            self.base_delay = options.get('base_delay', self.base_delay)
+            self.max_delay = options.get('max_delay', self.max_delay)
+            self.jitter = options.get('jitter', self.jitter)
+
+    def _delay(self):
+        delay = min(self.base_delay * 2 ** (self.opened - 1), self.max_delay)
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def allow(self):
+        """Check whether the sensor may be read now; an open breaker whose delay has passed turns half-open.
+
+        Returns:
+            bool: True if the caller should read (or probe) the sensor
+        """
+        with self.lock:
+            if self.state == OPEN:
+                if time.monotonic() < self.next_attempt:
+                    return False
+                self.state = HALF_OPEN
+                self.stats['probes'] += 1
+            return True
+
+    def retry_in(self):
+        """Get the seconds until an open breaker allows the next health probe."""
+        with self.lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.next_attempt - time.monotonic())
+
+    def record_success(self):
+        """Close the breaker after a successful read."""
+        with self.lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self.opened = 0
+            self.last_success = time.time()
+            self.stats['successes'] += 1
+        if recovered:
+            logger.info(f"Sensor {self.name} recovered; reading it again.")
+
+    def record_failure(self, error):
+        """Count a failed read and open the breaker when the threshold is reached.
+
+        Returns:
+            bool: True if the breaker is open now
+        """
+        with self.lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self.stats['failures'] += 1
+            if self.state == CLOSED and self.failures < self.failure_threshold:
+                logger.error(f"Error reading from {self.name}: {error}")
+                return False
+            probing = self.state == HALF_OPEN
+            self.state = OPEN
+            self.opened += 1
+            delay = self._delay()
+            self.next_attempt = time.monotonic() + delay
+            if not probing:
+                self.stats['trips'] += 1
+        if probing:
+            # A dead sensor only logs at debug level until it comes back
+            logger.debug(f"Health probe of {self.name} failed: {error}; next probe in {delay:.0f}s.")
+        else:
+            logger.error(f"Sensor {self.name} failed {self.failures} times in a row ({error}); "
+                         f"backing off, next probe in {delay:.0f}s.")
+        return True
+
+    def status(self):
+        """Get the state, the consecutive failures, the time to the next probe and the counters."""
+        with self.lock:
+            retry_in = max(0.0, self.next_attempt - time.monotonic()) if self.state == OPEN else None
+            return dict(self.stats, state=self.state, consecutive_failures=self.failures,
+                        retry_in=round(retry_in, 1) if retry_in is not None else None,
+                        last_error=self.last_error, last_success=self.last_success)
@@ -0,0 +1,162 @@
+"""
+Hardware executor: blocking driver calls on native threads, with timeouts.
+
+The web process runs under eventlet, but the drivers block inside C
+extensions (spidev.xfer2, smbus reads, adafruit_dht bit-banging, RPLCD GPIO
+writes) where eventlet cannot switch. Run on the hub, a slow or stuck bus
+freezes every HTTP request and WebSocket. The executor runs those calls in
+eventlet's native thread pool (tpool) and waits for them cooperatively, with
+a timeout per call.
+
+A call that times out cannot be cancelled; its native thread stays blocked
+until the driver returns. The device stays marked busy until then, and
+further calls to it fail immediately instead of piling more threads onto the
+stuck bus. At most `max_concurrent` hardware calls run at once, so report
+jobs, which share the pool, keep their threads. Without eventlet monkey
+patching (e.g. in the acquisition process), a plain thread pool provides the
+same timeouts.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import eventlet
+    from eventlet import tpool
+    from eventlet.patcher import is_monkey_patched
+    EVENTLET_AVAILABLE = True
+except ImportError:
+    EVENTLET_AVAILABLE = False
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class HardwareTimeout(TimeoutError):
+    """A driver call did not return in time, or its device is still stuck in an earlier call."""
+
+class HardwareExecutor:
+    """Runs blocking driver calls on native threads with per-call timeouts."""
+
+    def __init__(self, max_concurrent=4, timeout=3.0, timeouts=None):
+        """Initialize the executor.
+
+        Args:
+            max_concurrent: Native threads hardware calls may use at the same time
+            timeout: Default seconds before a call is abandoned
+            timeouts: Per-device timeouts overriding the default (e.g. {'dht': 12})
+        """
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.busy = {}
+        self.stats = {}
+        self.pool = None
+
+    def configure(self, options):
+        """Apply the hardware.executor configuration (timeouts apply to the next call)."""
+        self.timeout = options.get('timeout', self.timeout)
+        self.timeouts = dict(options.get('timeouts', self.timeouts))
+        if options.get('max_concurrent', self.max_concurrent) != self.max_concurrent:
+            logger.warning("Hardware executor max_concurrent changes take effect after a restart.")
+
+    def timeout_for(self, device):
+        """Get the timeout of a device's calls."""
+        return self.timeouts.get(device, self.timeout)
+
+    def _record(self, device, outcome, duration=None):
+        entry = self.stats.setdefault(device, {'calls': 0, 'timeouts': 0, 'rejected': 0, 'errors': 0,
+                                               'total_time': 0.0, 'max_time': 0.0})
+        entry[outcome] += 1
+        if duration is not None:
+            entry['total_time'] += duration
+            entry['max_time'] = max(entry['max_time'], duration)
+
+    def _run(self, device, func, args, kwargs):
+        """Run in the native thread; clears the device's busy mark when the driver returns."""
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.busy.pop(device, None)
+
+    def _execute(self, device, func, args, kwargs, timeout):
+        if EVENTLET_AVAILABLE and is_monkey_patched('thread'):
+            # tpool.execute waits on a green event, so the Timeout interrupts only this greenthread
+            with eventlet.Timeout(timeout, HardwareTimeout(f"{device} did not respond within {timeout}s")):
+                return tpool.execute(self._run, device, func, args, kwargs)
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='hardware')
+        future = self.pool.submit(self._run, device, func, args, kwargs)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            raise HardwareTimeout(f"{device} did not respond within {timeout}s")
+
+    def call(self, device, func, *args, timeout=None, **kwargs):
+        """Run func(*args, **kwargs) on a native thread and wait for it.
+
+        Args:
+            device: Name of the device (sensor, 'lcd', ...) for timeouts, the busy check and stats
+            func: The blocking driver call
+            timeout: Seconds to wait, overriding the device's configured timeout
+
+        Returns:
+            The call's return value
+
+        Raises:
+            HardwareTimeout: The call took too long, or the device is still stuck in an earlier call
+        """
+        started = self.busy.get(device)
+        if started is not None:
+            self._record(device, 'rejected')
+            raise HardwareTimeout(f"{device} is still busy with a call started {time.monotonic() - started:.1f}s ago")
+        timeout = timeout if timeout is not None else self.timeout_for(device)
+
+        with self.slots:
+            self.busy[device] = time.monotonic()
+            start = time.monotonic()
+            try:
+                result = self._execute(device, func, args, kwargs, timeout)
+            except HardwareTimeout:
+                # The native thread is still blocked in the driver and keeps the device busy
+                self._record(device, 'timeouts')
+                logger.error(f"Hardware call to {device} timed out after {timeout}s; the device is marked busy until it returns.")
+                raise
+            except Exception:
+                self._record(device, 'errors', time.monotonic() - start)
+                raise
+        self._record(device, 'calls', time.monotonic() - start)
+        return result
+
+    def status(self):
+        """Get the per-device counters and the devices stuck in a call."""
+        now = time.monotonic()
+        devices = {}
+        for device, entry in list(self.stats.items()):
+            completed = entry['calls'] + entry['errors']
+            devices[device] = dict(entry, total_time=round(entry['total_time'], 4),
+                                   max_time=round(entry['max_time'], 4),
+                                   average_time=round(entry['total_time'] / completed, 4) if completed else None,
+                                   timeout=self.timeout_for(device))
+        return {
+            'backend': 'tpool' if EVENTLET_AVAILABLE and is_monkey_patched('thread') else 'threads',
+            'max_concurrent': self.max_concurrent,
+            'busy': {device: round(now - started, 2) for device, started in list(self.busy.items())},
+            'devices': devices
+        }
+
+def _create_executor():
+    """Create the executor from hardware.executor and follow configuration reloads."""
+    from shared.config import get_config
+    config = get_config()
+    options = config.get('hardware.executor', {}) or {}
+    executor = HardwareExecutor(max_concurrent=options.get('max_concurrent', 4))
+    executor.configure(options)
+    config.subscribe(lambda snapshot, changed: executor.configure(snapshot.get('hardware.executor', {}) or {}),
+                     ['hardware.executor.'])
+    return executor
+
+# Shared executor for every driver call
+hardware_executor = _create_executor()
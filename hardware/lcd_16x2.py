@@ -24,6 +24,10 @@ class LCD:
         self.pin_e = pin_e
         self.pins_data = pins_data or [23, 17, 18, 22]
         self.lcd = None
+        # What is currently on the glass, one list of characters per row (None = unknown)
+        self.shadow = None
+        self.cells_written = 0
+        self.commands = 0
         
         try:
             import RPi.GPIO as GPIO
@@ -51,12 +55,75 @@ class LCD:
         if self.lcd:
             try:
                 self.lcd.clear()
+                self.commands += 1
+                self.shadow = [[' '] * self.cols for _ in range(self.rows)]
             except Exception as e:
+                self.shadow = None
                 logger.error(f"Error clearing LCD: {e}")
     
+    def invalidate(self):
+        """Forget what is on the display, so the next render rewrites every cell."""
+        self.shadow = None
+    
+    def _changed_runs(self, row, text):
+        """Find the runs of cells in a row that differ from the glass.
+        
+        Runs separated by one or two unchanged cells are merged, since
+        rewriting those cells costs no more than moving the cursor.
+        
+        Returns:
+            list: (start column, end column) pairs, end exclusive
+        """
+        if self.shadow is None:
+            return [(0, self.cols)]
+        current = self.shadow[row]
+        runs = []
+        for col in range(self.cols):
+            if text[col] == current[col]:
+                continue
+            if runs and col - runs[-1][1] <= 2:
+                runs[-1][1] = col + 1
+            else:
+                runs.append([col, col + 1])
+        return [tuple(run) for run in runs]
+    
+    def _update_row(self, row, text):
+        """Write only the cells of a row that changed."""
+        text = str(text)[:self.cols].ljust(self.cols)
+        runs = self._changed_runs(row, text)
+        if not runs or not self.lcd:
+            return
+        try:
+            for start, end in runs:
+                self.lcd.cursor_pos = (row, start)
+                self.lcd.write_string(text[start:end])
+                self.commands += 1
+                self.cells_written += end - start
+        except Exception as e:
+            self.shadow = None
+            logger.error(f"Error writing to LCD: {e}")
+            return
+        if self.shadow is None:
+            self.shadow = [[None] * self.cols for _ in range(self.rows)]
+        self.shadow[row] = list(text)
+    
+    def render(self, lines):
+        """Show a page of lines, writing only the cells that differ from the display.
+        
+        Rows without a line are blanked. The display is never cleared, so
+        unchanged cells do not flicker.
+        
+        Args:
+            lines: Text for each row (truncated to the display width)
+        """
+        for row in range(self.rows):
+            self._update_row(row, lines[row] if row < len(lines) else '')
+    
     def write_line(self, row, text):
         """Write text to a specific row on the display.
         
+        Only the characters that differ from what is displayed are sent.
+        
         Args:
             row: Row number (0 or 1 for a 16x2 display)
             text: Text to display (will be truncated if longer than display width)
@@ -64,19 +131,7 @@ class LCD:
         if row < 0 or row >= self.rows:
             logger.error(f"Invalid row: {row}")
             return
-        
-        # Truncate text if needed
-        text = str(text)[:self.cols]
-        
-        # Pad text to fill the row
-        text = text.ljust(self.cols)
-        
-        if self.lcd:
-            try:
-                self.lcd.cursor_pos = (row, 0)
-                self.lcd.write_string(text)
-            except Exception as e:
-                logger.error(f"Error writing to LCD: {e}")
+        self._update_row(row, text)
     
     def write_string(self, text, row=0, col=0):
         """Write text to the display at a specific position.
@@ -91,6 +146,8 @@ class LCD:
             return
         
         if self.lcd:
+            # Bypasses the diff, so the display contents are no longer known
+            self.shadow = None
             try:
                 self.lcd.cursor_pos = (row, col)
                 self.lcd.write_string(text)
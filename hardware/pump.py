@@ -42,7 +42,7 @@ class Pump:
             logger.info(f"{self.name} is already running")
             return False
         
-        result = self.relay.on()
+        result = self.relay.turn_on()
         if result:
             self.running = True
             self.start_time = time.time()
@@ -60,7 +60,7 @@ class Pump:
             logger.info(f"{self.name} is already stopped")
             return {"status": "not_running", "message": f"{self.name} was not running"}
         
-        result = self.relay.off()
+        result = self.relay.turn_off()
         if result:
             self.running = False
             runtime = time.time() - self.start_time if self.start_time else 0
@@ -0,0 +1,211 @@
+"""
+In-process publish/subscribe bus for sensor samples.
+
+The sensor controller publishes every new sample once: a read-only snapshot
+of all readings plus the keys the reading changed. Each sink subscribes with
+its own bounded queue and delivery thread, so a slow sink (SQLite, the LCD)
+never holds up the sensor threads or the other sinks. The backpressure policy
+decides what happens when a sink falls behind:
+
+- drop_oldest: keep the newest `maxsize` samples, discarding the oldest
+- coalesce: keep one pending sample, merged from everything published since
+  the last delivery (newest readings, union of the changed keys)
+- block: make the publisher wait for room (up to `block_timeout`), so the
+  sink sees every sample in order
+
+`min_interval` rate-limits delivery; with coalesce, a sink that wants a
+snapshot every N seconds gets the latest state without polling for it.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+POLICIES = ('drop_oldest', 'coalesce', 'block')
+
+class Subscription:
+    """A sink's queue, delivery thread and counters."""
+
+    def __init__(self, name, callback, policy='drop_oldest', maxsize=100, min_interval=0, block_timeout=1.0):
+        """Initialize the subscription and start its delivery thread.
+
+        Args:
+            name: Sink name, unique on the bus
+            callback: Called with (readings, changed_keys) for each delivered sample
+            policy: 'drop_oldest', 'coalesce' or 'block'
+            maxsize: Samples queued before the policy applies (coalesce always keeps one)
+            min_interval: Minimum seconds between two deliveries
+            block_timeout: Seconds a publisher waits under the block policy before dropping the sample
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}. Use one of {', '.join(POLICIES)}.")
+        self.name = name
+        self.callback = callback
+        self.policy = policy
+        self.maxsize = max(1, maxsize)
+        self.min_interval = min_interval
+        self.block_timeout = block_timeout
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.active = True
+        self.last_delivery = 0
+        self.stats = {'published': 0, 'delivered': 0, 'dropped': 0, 'coalesced': 0, 'errors': 0,
+                      'max_depth': 0, 'last_latency': None}
+        self.thread = threading.Thread(target=self._run, name=f"sensor-sink-{name}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def offer(self, readings, changed_keys, published_at):
+        """Queue a sample according to the policy.
+
+        Returns:
+            bool: False if the sample was dropped
+        """
+        with self.condition:
+            self.stats['published'] += 1
+            if self.policy == 'coalesce' and self.pending:
+                _, keys, first_published = self.pending[0]
+                merged = keys + [key for key in changed_keys if key not in keys]
+                self.pending[0] = (readings, merged, first_published)
+                self.stats['coalesced'] += 1
+                return True
+            if self.policy == 'block':
+                deadline = time.monotonic() + self.block_timeout
+                while self.active and len(self.pending) >= self.maxsize:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['dropped'] += 1
+                        logger.warning(f"Sensor sink '{self.name}' stayed full for {self.block_timeout}s; sample dropped.")
+                        return False
+                    self.condition.wait(remaining)
+            elif len(self.pending) >= self.maxsize:
+                self.pending.popleft()
+                self.stats['dropped'] += 1
+            self.pending.append((readings, list(changed_keys), published_at))
+            self.stats['max_depth'] = max(self.stats['max_depth'], len(self.pending))
+            self.condition.notify_all()
+            return True
+
+    def close(self):
+        """Stop delivering; queued samples are discarded."""
+        with self.condition:
+            self.active = False
+            self.pending.clear()
+            self.condition.notify_all()
+
+    def status(self):
+        """Get the policy, queue depth and counters."""
+        with self.condition:
+            return dict(self.stats, name=self.name, policy=self.policy, maxsize=self.maxsize,
+                        min_interval=self.min_interval, depth=len(self.pending))
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.active and not self.pending:
+                    self.condition.wait()
+                if not self.active:
+                    return
+            # Leave room for more samples to coalesce until the interval has passed
+            wait = self.last_delivery + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            with self.condition:
+                if not self.active or not self.pending:
+                    continue
+                readings, changed_keys, published_at = self.pending.popleft()
+                self.condition.notify_all()
+            self.last_delivery = time.monotonic()
+            try:
+                self.callback(readings, changed_keys)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error in sensor sink '{self.name}': {e}")
+            self.stats['delivered'] += 1
+            self.stats['last_latency'] = round(time.monotonic() - published_at, 4)
+
+class SensorBus:
+    """Publishes each sensor sample once to every subscribed sink."""
+
+    def __init__(self):
+        """Initialize an empty bus."""
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, name, callback, policy='drop_oldest', maxsize=100, min_interval=0, block_timeout=1.0):
+        """Add a sink, replacing any sink with the same name (see Subscription).
+
+        Returns:
+            Subscription: The new subscription
+        """
+        subscription = Subscription(name, callback, policy, maxsize, min_interval, block_timeout)
+        with self.lock:
+            previous = self.subscriptions.get(name)
+            self.subscriptions[name] = subscription
+        if previous:
+            previous.close()
+        logger.info(f"Sensor sink '{name}' subscribed ({policy}, maxsize {maxsize}, min interval {min_interval}s).")
+        return subscription
+
+    def unsubscribe(self, name):
+        """Remove a sink and stop its delivery thread."""
+        with self.lock:
+            subscription = self.subscriptions.pop(name, None)
+        if subscription:
+            subscription.close()
+
+    def get(self, name):
+        """Get a sink's subscription, or None."""
+        with self.lock:
+            return self.subscriptions.get(name)
+
+    def __bool__(self):
+        return bool(self.subscriptions)
+
+    def publish(self, readings, changed_keys):
+        """Offer a sample to every sink; readings must not be modified afterwards."""
+        published_at = time.monotonic()
+        with self.lock:
+            self.published += 1
+            subscriptions = list(self.subscriptions.values())
+        for subscription in subscriptions:
+            subscription.offer(readings, changed_keys, published_at)
+
+    def status(self):
+        """Get the number of published samples and the state of every sink."""
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+            published = self.published
+        return {'published': published, 'sinks': [subscription.status() for subscription in subscriptions]}
+
+class ReadingMetrics:
+    """Sink that counts the samples of each reading key and how often they arrive."""
+
+    def __init__(self):
+        """Initialize empty counters."""
+        self.lock = threading.Lock()
+        self.keys = {}
+
+    def __call__(self, readings, changed_keys):
+        now = time.time()
+        with self.lock:
+            for key in changed_keys:
+                entry = self.keys.setdefault(key, {'samples': 0, 'missing': 0, 'last_update': None, 'interval': None})
+                if entry['last_update'] is not None:
+                    # Exponential moving average of the seconds between samples
+                    interval = now - entry['last_update']
+                    entry['interval'] = interval if entry['interval'] is None else 0.8 * entry['interval'] + 0.2 * interval
+                entry['samples'] += 1
+                entry['missing'] += readings.get(key) is None
+                entry['last_update'] = now
+
+    def snapshot(self):
+        """Get the counters per key, with the average interval rounded."""
+        with self.lock:
+            return {key: dict(entry, interval=round(entry['interval'], 3) if entry['interval'] is not None else None)
+                    for key, entry in self.keys.items()}
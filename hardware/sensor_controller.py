@@ -1,5 +1,14 @@
 """
 Module for integrating and managing hardware sensors.
+
+Each new reading is published once on the controller's SensorBus. The UI
+broadcast, CSV logging, database persistence, LCD, rules, predictor and
+metrics are sinks on that bus with their own queues, instead of loops that
+poll the latest readings on their own timers.
+
+Each sensor has a circuit breaker: a sensor that keeps failing is backed off
+and only probed now and then, and one that failed to initialize is created
+again by those probes, so it reattaches without a restart.
 """
 import time
 import logging
@@ -10,6 +19,9 @@ from flask import current_app
 import os
 import csv
 from threading import Lock
+from .sensor_bus import SensorBus, ReadingMetrics
+from .executor import hardware_executor
+from .circuit_breaker import CircuitBreaker
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -17,9 +29,15 @@ logger = logging.getLogger(__name__)
 class SensorController:
     """Controller for managing all sensors in the system."""
     
+    # Sensors are sampled in this process (see hardware.acquisition for the alternative)
+    local_sensors = True
+    
     def __init__(self):
         """Initialize the sensor controller."""
         self.sensors = {}
+        self.sensor_specs = {}
+        self.breakers = {}
+        self.breaker_options = {}
         self.last_readings = {
             'temperature': None, 'humidity': None, 'soil_moisture': None,
             'pressure': None, 'light': None, 'rain': None, 'timestamp': None
@@ -30,6 +48,18 @@ class SensorController:
         
         self.readings_lock = Lock()
         self.sensor_threads = []
+        self.listeners = []
+        self.bus = SensorBus()
+        self.metrics = ReadingMetrics()
+        
+        # Map sensors to the keys they update in last_readings
+        self.sensor_keys = {
+            'dht': ['temperature', 'humidity'],
+            'soil_moisture': 'soil_moisture',
+            'pressure': 'pressure',
+            'light': 'light',
+            'rain': 'rain'
+        }
 
         self.ui_update_interval = 0.5  # Broadcast data to UI every 500ms
         self.db_update_interval = 60
@@ -38,9 +68,22 @@ class SensorController:
         self.data_folder = None
         self.log_interval = 60
         self.csv_writer = None
-        self.logging_thread = None
         
-        self._initialize_sensors()
+        # Sensors are probed on first use (see probe_sensors), not at import time
+        self.probed = False
+        self.probe_lock = Lock()
+    
+    def probe_sensors(self):
+        """Initialize the built-in sensors once; later calls return immediately.
+        
+        Probing opens the GPIO, SPI and I2C devices and can be slow, so it
+        runs as a boot phase rather than when this module is imported.
+        """
+        with self.probe_lock:
+            if self.probed:
+                return
+            self._initialize_sensors()
+            self.probed = True
     
     def _initialize_sensors(self):
         """Initialize all sensors and create placeholder if they fail."""
@@ -53,40 +96,162 @@ class SensorController:
         }
 
         for name, (module_path, class_name, kwargs) in sensor_map.items():
+            self.sensor_specs[name] = (module_path, class_name, kwargs)
+            started = time.monotonic()
             try:
-                module = __import__(module_path, fromlist=[class_name])
-                sensor_class = getattr(module, class_name)
-                self.sensors[name] = sensor_class(**kwargs)
-                logger.info(f"Successfully initialized {name} sensor.")
+                # Importing opens the bus and the constructor may take a test reading
+                self.sensors[name] = hardware_executor.call(
+                    name, self._create_sensor, module_path, class_name, kwargs,
+                    timeout=hardware_executor.timeout_for('probe')
+                )
+                logger.info(f"Successfully initialized {name} sensor in {time.monotonic() - started:.3f}s.")
             except Exception as e:
                 self.sensors[name] = None
-                logger.error(f"Failed to initialize {name} sensor: {e}. It will be disabled.")
+                logger.error(f"Failed to initialize {name} sensor: {e}. It will be probed again with backoff.")
+
+    @staticmethod
+    def _create_sensor(module_path, class_name, kwargs):
+        """Import a sensor module and create the sensor (runs on a native thread)."""
+        module = __import__(module_path, fromlist=[class_name])
+        return getattr(module, class_name)(**kwargs)
+
+    def _reattach_sensor(self, name):
+        """Create a sensor that failed to initialize again (the health probe of a missing sensor)."""
+        module_path, class_name, kwargs = self.sensor_specs[name]
+        instance = hardware_executor.call(name, self._create_sensor, module_path, class_name, kwargs,
+                                          timeout=hardware_executor.timeout_for('probe'))
+        self.sensors[name] = instance
+        logger.info(f"Reattached {name} sensor.")
+        return instance
+
+    def get_breaker(self, name):
+        """Get the circuit breaker of a sensor, creating it from hardware.circuit_breaker."""
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(name)
+            breaker.configure(self.breaker_options)
+        return breaker
+
+    def apply_breaker_config(self, options):
+        """Apply a reloaded hardware.circuit_breaker configuration to every sensor's breaker."""
+        self.breaker_options = dict(options or {})
+        for breaker in list(self.breakers.values()):
+            breaker.configure(self.breaker_options)
+
+    def add_sensor(self, name, instance, key):
+        """Register an additional sensor whose read() value is stored under key.
+        
+        The sensor is sampled like the built-in ones; if monitoring is already
+        running its reading thread starts immediately.
+        """
+        with self.readings_lock:
+            self.sensors[name] = instance
+            self.sensor_keys[name] = key
+            self.last_readings.setdefault(key, None)
+        logger.info(f"Registered {name} sensor.")
+        if self.running and instance:
+            self._start_sensor_thread(name, instance)
+    
+    def add_listener(self, callback):
+        """Register a callback run synchronously after every sensor reading.
+        
+        The callback receives a copy of the latest readings and the list of
+        keys that the reading updated. It runs on the sensor's reading thread,
+        so it must be quick; use subscribe for anything that can block.
+        """
+        self.listeners.append(callback)
+    
+    def subscribe(self, name, callback, policy='drop_oldest', maxsize=100, min_interval=0, block_timeout=1.0):
+        """Register a sink that receives every sample through its own queue and thread.
+        
+        Args:
+            name: Sink name; subscribing again under the same name replaces the sink
+            callback: Called with (readings, changed_keys); readings must not be modified
+            policy: 'drop_oldest', 'coalesce' or 'block' (see hardware.sensor_bus)
+            maxsize: Samples queued before the policy applies
+            min_interval: Minimum seconds between deliveries
+            block_timeout: Seconds a reading waits for room under the block policy
+        
+        Returns:
+            Subscription: The sink's subscription
+        """
+        return self.bus.subscribe(name, callback, policy, maxsize, min_interval, block_timeout)
+    
+    def unsubscribe(self, name):
+        """Remove a sink."""
+        self.bus.unsubscribe(name)
+    
+    def get_bus_status(self):
+        """Get the sinks' queue depths and counters and the per-key sample metrics."""
+        status = self.bus.status()
+        status['readings'] = self.metrics.snapshot()
+        return status
+    
+    def _notify_listeners(self, changed_keys):
+        """Publish the latest readings once, to the listeners and the bus sinks."""
+        if not self.listeners and not self.bus:
+            return
+        with self.readings_lock:
+            readings = self.last_readings.copy()
+        readings['timestamp'] = datetime.now().isoformat()
+        for callback in self.listeners:
+            try:
+                callback(readings, changed_keys)
+            except Exception as e:
+                logger.error(f"Error in sensor listener: {e}")
+        self.bus.publish(readings, changed_keys)
+    
+    def _start_sensor_thread(self, name, instance):
+        """Start the reading thread of a single sensor."""
+        self.get_breaker(name)
+        thread = threading.Thread(target=self._read_sensor_loop, args=(name, instance, self.sensor_keys[name]))
+        thread.daemon = True
+        thread.start()
+        self.sensor_threads.append(thread)
 
     def _read_sensor_loop(self, sensor_name, sensor_instance, keys_to_update):
-        """Dedicated loop to read data from a single sensor."""
+        """Dedicated loop to read data from a single sensor, backing off while it keeps failing."""
+        changed_keys = keys_to_update if isinstance(keys_to_update, list) else [keys_to_update]
+        breaker = self.get_breaker(sensor_name)
         while self.running:
+            if not breaker.allow():
+                # Open breaker: no driver calls until the next health probe
+                time.sleep(min(breaker.retry_in(), 5))
+                continue
             try:
-                reading = sensor_instance.read()
+                if sensor_instance is None:
+                    sensor_instance = self._reattach_sensor(sensor_name)
+                # The driver blocks in C; the executor keeps the hub free and bounds the wait
+                reading = hardware_executor.call(sensor_name, sensor_instance.read)
+                if sensor_name == 'pressure' and isinstance(reading, (list, tuple)) and len(reading) > 1:
+                    # Handle BMP180 returning (temp, pressure)
+                    values = {'pressure': reading[1]}
+                elif isinstance(keys_to_update, list): # For DHT
+                    values = {key: reading.get(key) if reading else None for key in keys_to_update}
+                else: # For other sensors
+                    values = {keys_to_update: reading}
+                # The drivers catch their own errors and return None values; count those as failures
+                if all(value is None for value in values.values()):
+                    raise OSError(f"{sensor_name} returned no values")
                 with self.readings_lock:
-                    if sensor_name == 'pressure' and isinstance(reading, (list, tuple)) and len(reading) > 1:
-                        # Handle BMP180 returning (temp, pressure)
-                        self.last_readings['pressure'] = reading[1]
-                    elif isinstance(keys_to_update, list): # For DHT
-                        for key in keys_to_update:
-                            self.last_readings[key] = reading.get(key)
-                    else: # For other sensors
-                        self.last_readings[keys_to_update] = reading
+                    self.last_readings.update(values)
+                breaker.record_success()
+                
+                self._notify_listeners(changed_keys)
                 
                 # Sleep for 2 seconds as requested for stability
                 time.sleep(2)
 
             except Exception as e:
-                logger.error(f"Error reading from {sensor_name}: {e}")
                 with self.readings_lock:
-                    if isinstance(keys_to_update, list):
-                        for key in keys_to_update: self.last_readings[key] = None
-                    else: self.last_readings[keys_to_update] = None
-                time.sleep(5) # Longer sleep on error
+                    lost = any(self.last_readings.get(key) is not None for key in changed_keys)
+                    for key in changed_keys:
+                        self.last_readings[key] = None
+                # Sinks only hear about the reading disappearing, not every failed probe
+                if lost:
+                    self._notify_listeners(changed_keys)
+                if not breaker.record_failure(e):
+                    time.sleep(5) # Longer sleep on error
 
     def get_latest_readings(self):
         """Get the latest sensor readings in a thread-safe way."""
@@ -120,22 +285,48 @@ class SensorController:
             os.makedirs(self.data_folder, exist_ok=True)
             logger.info(f"CSV data folder set to: {self.data_folder}")
 
-    def _broadcast_loop(self):
-        """Continuously broadcasts the latest data to the UI."""
-        logger.info(f"UI broadcast loop started. Interval: {self.ui_update_interval}s")
-        while self.running:
-            try:
-                readings = self.get_latest_readings()
-                statuses = self.get_sensor_statuses()
-                
-                if self.socketio:
-                    self.socketio.emit('sensor_update', readings)
-                    self.socketio.emit('sensor_status_update', statuses)
-                
-                self.socketio.sleep(self.ui_update_interval)
-            except Exception as e:
-                logger.error(f"Error in broadcast loop: {e}")
-                self.socketio.sleep(self.ui_update_interval)
+    def apply_logging_config(self, logging_config):
+        """Apply a reloaded logging configuration while monitoring keeps running.
+        
+        The CSV sink is subscribed, unsubscribed or given the new log_interval.
+        """
+        self._initialize_csv_logging({'logging': logging_config})
+        if self.running:
+            self._subscribe_csv()
+    
+    def _subscribe_csv(self):
+        """Subscribe the CSV sink at log_interval, or remove it when CSV logging is disabled."""
+        subscription = self.bus.get('csv')
+        if not self.csv_logging_enabled:
+            if subscription:
+                self.unsubscribe('csv')
+                logger.info("CSV logging stopped.")
+        elif subscription:
+            subscription.min_interval = self.log_interval
+        else:
+            self.subscribe('csv', self._log_data_to_csv, policy='coalesce', min_interval=self.log_interval)
+    
+    def apply_calibration(self, pins_config):
+        """Apply reloaded ADC calibration values to the analog sensors in place."""
+        calibration = {
+            'soil_moisture': ('soil_moisture', ('dry_value', 'wet_value')),
+            'light': ('ldr', ('min_value', 'max_value')),
+            'rain': ('rain', ('dry_value', 'wet_value'))
+        }
+        for name, (section, attributes) in calibration.items():
+            sensor = self.sensors.get(name)
+            values = pins_config.get(section, {})
+            if sensor is None:
+                continue
+            for attribute in attributes:
+                if attribute in values and hasattr(sensor, attribute):
+                    setattr(sensor, attribute, values[attribute])
+            logger.info(f"Applied {section} calibration: {', '.join(f'{a}={getattr(sensor, a, None)}' for a in attributes)}")
+
+    def _broadcast(self, readings, changed_keys):
+        """Sink: push a sample and the derived sensor statuses to the UI."""
+        self.socketio.emit('sensor_update', readings)
+        self.socketio.emit('sensor_status_update', self.sensor_statuses(readings))
 
     def _setup_csv_file(self):
         """Setup CSV file with headers including units."""
@@ -154,14 +345,12 @@ class SensorController:
         
         return csv_file, csv_writer
 
-    def _log_data_to_csv(self):
-        """Rounds sensor data, writes it to CSV, and logs it to the terminal."""
+    def _log_data_to_csv(self, readings, changed_keys=None):
+        """Sink: rounds sensor data, writes it to CSV, and logs it to the terminal."""
         if not self.csv_logging_enabled:
             return
 
         try:
-            readings = self.get_latest_readings()
-            
             # Data for logging to terminal
             log_payload = {'timestamp': readings.get('timestamp')}
             # Data for writing to CSV
@@ -189,29 +378,43 @@ class SensorController:
         except Exception as e:
             logger.error(f"Failed to write to CSV: {e}")
 
-    def _csv_logging_loop(self):
-        """Periodically log data to CSV."""
-        logger.info(f"CSV logging loop started with interval {self.log_interval}s")
-        while self.running:
-            try:
-                self._log_data_to_csv()
-                if self.socketio:
-                    self.socketio.sleep(self.log_interval)
-                else:
-                    time.sleep(self.log_interval)
-            except Exception as e:
-                logger.error(f"Error in CSV logging loop: {e}")
+    @staticmethod
+    def sensor_statuses(readings):
+        """Get the connection status of each sensor from a snapshot of the readings."""
+        keys = {'dht': 'temperature', 'soil_moisture': 'soil_moisture', 'pressure': 'pressure',
+                'light': 'light', 'rain': 'rain'}
+        return {name: 'Connected' if readings.get(key) is not None else 'Disconnected'
+                for name, key in keys.items()}
 
     def get_sensor_statuses(self):
         """Get the connection status of each sensor."""
-        statuses = {}
         with self.readings_lock:
-            statuses['dht'] = 'Connected' if self.last_readings['temperature'] is not None else 'Disconnected'
-            statuses['soil_moisture'] = 'Connected' if self.last_readings['soil_moisture'] is not None else 'Disconnected'
-            statuses['pressure'] = 'Connected' if self.last_readings['pressure'] is not None else 'Disconnected'
-            statuses['light'] = 'Connected' if self.last_readings['light'] is not None else 'Disconnected'
-            statuses['rain'] = 'Connected' if self.last_readings['rain'] is not None else 'Disconnected'
-        return statuses
+            return self.sensor_statuses(self.last_readings)
+
+    def get_sensor_health(self):
+        """Get the connection status and circuit breaker state of each sensor.
+
+        Returns:
+            dict: Per sensor, 'status' and 'breaker' (state, failures, seconds to the next probe), or None without a breaker
+        """
+        with self.readings_lock:
+            sensor_keys = dict(self.sensor_keys)
+            readings = self.last_readings.copy()
+        health = {}
+        for name, keys in sensor_keys.items():
+            keys = keys if isinstance(keys, list) else [keys]
+            connected = any(readings.get(key) is not None for key in keys)
+            breaker = self.breakers.get(name)
+            health[name] = {'status': 'Connected' if connected else 'Disconnected',
+                            'breaker': breaker.status() if breaker else None}
+        return health
+
+    def _start_sinks(self):
+        """Subscribe the controller's own sinks: metrics, UI broadcast and CSV logging."""
+        self.subscribe('metrics', self.metrics, policy='drop_oldest', maxsize=1000)
+        if self.socketio:
+            self.subscribe('broadcast', self._broadcast, policy='coalesce', min_interval=self.ui_update_interval)
+        self._subscribe_csv()
 
     def start_monitoring(self):
         """Start all monitoring threads."""
@@ -219,33 +422,16 @@ class SensorController:
             logger.warning("Monitoring is already running.")
             return
             
+        self.probe_sensors()
         self.running = True
 
-        # Map sensors to the keys they update in last_readings
-        sensor_key_map = {
-            'dht': ['temperature', 'humidity'],
-            'soil_moisture': 'soil_moisture',
-            'pressure': 'pressure',
-            'light': 'light',
-            'rain': 'rain'
-        }
-
-        # Start a thread for each active sensor
-        for name, instance in self.sensors.items():
-            if instance:
-                keys = sensor_key_map[name]
-                thread = threading.Thread(target=self._read_sensor_loop, args=(name, instance, keys))
-                thread.daemon = True
-                thread.start()
-                self.sensor_threads.append(thread)
-        
-        # Start the UI broadcasting loop
-        if self.socketio:
-            self.socketio.start_background_task(self._broadcast_loop)
+        # Start a thread for each sensor; one that failed to initialize is probed with backoff
+        for name, instance in list(self.sensors.items()):
+            if instance or name in self.sensor_specs:
+                self._start_sensor_thread(name, instance)
         
-        # Start CSV logging loop
-        if self.csv_logging_enabled:
-            self.logging_thread = self.socketio.start_background_task(self._csv_logging_loop)
+        # UI broadcasting and CSV logging receive the readings from the bus
+        self._start_sinks()
 
         logger.info("All sensor monitoring threads started.")
 
@@ -5,6 +5,7 @@ irrigation_bp = Blueprint('irrigation', __name__)
 
 # Import routes after creating the blueprint to avoid circular imports
 from . import routes
+from . import sockets
 
 # Remove any problematic imports if they exist
 # from . import views  # Remove if present
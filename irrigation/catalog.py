@@ -0,0 +1,121 @@
+"""
+In-memory catalog of presets and their schedules.
+
+The catalog is loaded with a single outer-join query (Preset.schedules is a
+dynamic relationship, so it cannot be eager-loaded) and kept until a preset or
+schedule is changed. It serves /api/presets from a pre-serialized body with an
+ETag, is the source the scheduler compiles the active preset from, and keeps
+a weekly interval index per preset and zone for conflict checks.
+"""
+
+import json
+import hashlib
+import logging
+import threading
+
+from shared.database import db
+from .intervals import WeeklyIntervalIndex, week_seconds
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class PresetCatalog:
+    """Cached presets and schedules, reloaded lazily after invalidation."""
+
+    def __init__(self, min_interval=0, default_zone_id=None):
+        """Initialize an empty, stale catalog.
+
+        Args:
+            min_interval: Minimum gap in seconds between two runs of a zone
+            default_zone_id: Zone that schedules without a zone_id run on
+        """
+        self.min_interval = min_interval
+        self.default_zone_id = default_zone_id
+        self.lock = threading.Lock()
+        self.stale = True
+        self.presets = []
+        self.indexes = {}
+        self.body = b'[]'
+        self.etag = None
+
+    def invalidate(self):
+        """Mark the catalog stale; the next read reloads it.
+
+        Call after committing a change to presets or schedules.
+        """
+        with self.lock:
+            self.stale = True
+
+    def _load(self):
+        """Reload presets and schedules with one query. Caller holds the lock."""
+        from .models import Preset, Schedule
+
+        rows = db.session.query(Preset, Schedule).outerjoin(
+            Schedule, Schedule.preset_id == Preset.id
+        ).order_by(Preset.id, Schedule.id).all()
+
+        presets = []
+        by_id = {}
+        for preset, schedule in rows:
+            data = by_id.get(preset.id)
+            if data is None:
+                data = by_id[preset.id] = preset.to_dict()
+                presets.append(data)
+            if schedule is not None:
+                data['schedules'].append(schedule.to_dict())
+
+        indexes = {}
+        for preset in presets:
+            for schedule in preset['schedules']:
+                if not schedule['is_active']:
+                    continue
+                try:
+                    start = week_seconds(schedule['day_of_week'], schedule['start_time'])
+                except ValueError:
+                    logger.warning(f"Schedule {schedule['id']} has an invalid day: {schedule['day_of_week']}")
+                    continue
+                key = (preset['id'], schedule['zone_id'] or self.default_zone_id)
+                if key not in indexes:
+                    indexes[key] = WeeklyIntervalIndex(self.min_interval)
+                indexes[key].add(schedule['id'], start, schedule['duration_seconds'])
+
+        self.presets = presets
+        self.indexes = indexes
+        self.body = json.dumps(presets).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.stale = False
+        logger.debug(f"Preset catalog loaded: {len(presets)} preset(s), {len(rows)} row(s).")
+
+    def snapshot(self):
+        """Get the presets list, its serialized JSON body and ETag.
+
+        The returned objects are shared and must not be modified. Must run in
+        an app context when the catalog is stale.
+        """
+        with self.lock:
+            if self.stale:
+                self._load()
+            return self.presets, self.body, self.etag
+
+    def get_presets(self):
+        """Get all presets with their schedules."""
+        return self.snapshot()[0]
+
+    def get_preset(self, preset_id):
+        """Get a preset dict by id, or None."""
+        return next((p for p in self.get_presets() if p['id'] == preset_id), None)
+
+    def get_index(self, preset_id, zone_id=None):
+        """Get the interval index of a preset's schedules on one zone."""
+        zone_id = zone_id or self.default_zone_id
+        with self.lock:
+            if self.stale:
+                self._load()
+            return self.indexes.get((preset_id, zone_id)) or WeeklyIntervalIndex(self.min_interval)
+
+    def get_active(self):
+        """Get the active preset dict (with all its schedules), or None."""
+        for preset in self.get_presets():
+            if preset['is_active']:
+                return preset
+        return None
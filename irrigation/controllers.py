@@ -1,106 +1,153 @@
 import time
 import threading
 import logging
-from datetime import datetime, time as time_obj
+from datetime import datetime, timedelta
 from flask import current_app
 from shared.database import db
 from shared.socketio import socketio
-from .models import Preset, Schedule, IrrigationLog
+from shared.timers import timers
+from shared.config import get_config
+from shared.event_log import event_log
+from shared.workers import is_worker
+from .models import Preset, Schedule, PumpLog, IrrigationLog
+from .scheduler import IrrigationScheduler
+from .zones import ZoneDispatcher, build_zones
+from .rules import RuleEngine, Rule
+from .catalog import PresetCatalog
+from .predictor import MoisturePredictor
+from .intervals import DAYS_OF_WEEK, ScheduleConflictError, week_seconds, format_week_seconds
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
 # --- Hardware Initialization ---
-try:
-    from hardware.pump import Pump
-    pump = Pump()
-except Exception as e:
-    logger.error(f"Could not import hardware pump: {e}. Running in simulated mode.")
-    class DummyPump:
-        def start(self):
-            logger.warning("Running in dummy mode. Pump not started.")
-            return True
-        def stop(self):
-            logger.warning("Running in dummy mode. Pump not stopped.")
-            return True
-    pump = DummyPump()
-
-# In-memory state for pump and scheduler
-pump_running = False
-pump_start_time = None
-pump_lock = threading.Lock()
-scheduler_thread = None
-scheduler_running = False
+
+def _on_run_finished(zone, duration, preset_id):
+    """Logs a finished zone run."""
+    log_irrigation_run(preset_id, duration, zone.id)
+
+def _on_pump_event(action, zone, duration):
+    """Logs a pump start/stop/queue event and pushes the new state to clients."""
+    event_log.log(PumpLog, action=action, zone_id=zone.id, duration=duration, relay_state=zone.relay_state)
+    status = zone.to_dict()
+    status.update({'action': action, 'zone': zone.id, 'server_time': time.time()})
+    if duration is not None:
+        status['last_run_duration'] = duration
+    socketio.emit('pump_status', status)
+    if action in ('start', 'stop'):
+        predictor.on_pump_event(action, zone.id)
+
+_config = get_config()
+# Web workers forward pump commands to the primary and never drive the relays
+dispatcher = ZoneDispatcher(
+    build_zones(_config, simulate=is_worker()),
+    max_flow=_config.get('irrigation.dispatcher.max_flow'),
+    max_concurrent=_config.get('irrigation.dispatcher.max_concurrent'),
+    on_run_finished=_on_run_finished,
+    on_pump_event=_on_pump_event
+)
 
 # --- Pump Control ---
 
-def get_pump_duration():
-    """Calculates how long the pump has been running."""
-    if pump_running and pump_start_time:
-        return time.time() - pump_start_time
-    return 0
-
-def get_pump_status():
-    """Returns the current status of the pump."""
-    with pump_lock:
-        return {
-            "running": pump_running,
-            "duration": get_pump_duration()
-        }
-
-def start_pump(duration_seconds=None):
-    """Manually starts the pump, optionally for a specific duration."""
-    global pump_running, pump_start_time
-    with pump_lock:
-        if pump_running:
-            return {"status": "warning", "message": "Pump is already running."}
-        
-        logger.info("Starting pump manually.")
-        pump.start()
-        pump_running = True
-        pump_start_time = time.time()
-        
-        # If a duration is specified, schedule a stop
-        if duration_seconds:
-            def stop_after_duration():
-                time.sleep(duration_seconds)
-                stop_pump()
-            
-            duration_thread = threading.Thread(target=stop_after_duration)
-            duration_thread.daemon = True
-            duration_thread.start()
-            
-        return {"status": "success", "message": f"Pump started for {duration_seconds}s." if duration_seconds else "Pump started."}
-
-def stop_pump():
-    """Manually stops the pump."""
-    global pump_running, pump_start_time
-    with pump_lock:
-        if not pump_running:
-            return {"status": "warning", "message": "Pump is not running."}
-        
-        duration = get_pump_duration()
-        logger.info(f"Stopping pump manually after {duration:.2f} seconds.")
-        pump.stop()
-        pump_running = False
-        pump_start_time = None
-        
-        # Log the manual run
-        log_irrigation_run(None, duration)
-        
-        return {"status": "success", "message": "Pump stopped.", "duration": duration}
+def get_pump_duration(zone_id=None):
+    """Calculates how long a zone's pump has been running (default zone if omitted)."""
+    zone = dispatcher.get_zone(zone_id)
+    return zone.get_duration() if zone else 0
+
+def get_pump_status(zone_id=None):
+    """Returns the current status of a zone's pump, plus all zones and the queue."""
+    with dispatcher.lock:
+        zone = dispatcher.get_zone(zone_id)
+        if not zone:
+            return {"status": "error", "message": f"Unknown zone: {zone_id}"}
+        status = dispatcher.status()
+        status.update({
+            "zone": zone.id,
+            "running": zone.running,
+            "duration": zone.get_duration(),
+            "remaining": timers.remaining(zone.timer_key)
+        })
+        return status
+
+def start_pump(duration_seconds=None, zone_id=None, preset_id=None):
+    """Starts a zone's pump (default zone if omitted), optionally for a specific duration.
+    
+    The run is queued instead when the dispatcher's flow/concurrency budget is in use.
+    """
+    return dispatcher.request_run(zone_id, duration_seconds, preset_id)
+
+def stop_pump(run_id=None, zone_id=None):
+    """Stops a zone's pump (default zone if omitted).
+    
+    Args:
+        run_id: When given, only stop if this is still the zone's current run
+        zone_id: Zone to stop
+    """
+    return dispatcher.stop(zone_id, run_id=run_id)
+
+def handle_pump_command(data):
+    """Runs a pump command received over Socket.IO.
+    
+    Args:
+        data: {'action': 'start'|'stop'|'status', 'zone': optional zone id,
+               'duration': optional seconds for 'start'}
+    
+    Returns:
+        dict: The command result, sent back as the acknowledgement
+    """
+    data = data or {}
+    action = data.get('action')
+    zone_id = data.get('zone')
+    if action == 'start':
+        return start_pump(duration_seconds=data.get('duration'), zone_id=zone_id)
+    if action == 'stop':
+        return stop_pump(zone_id=zone_id)
+    if action == 'status':
+        status = get_pump_status(zone_id)
+        status.setdefault("status", "success")
+        status["server_time"] = time.time()
+        return status
+    return {"status": "error", "message": f"Unknown pump command: {action}"}
+
+def get_zones():
+    """Returns the configured zones and their state."""
+    return dispatcher.status()
+
+def init_zone_sensors(sensor_controller):
+    """Registers soil-moisture sensors for zones on their own ADC channels."""
+    for zone in dispatcher.zones.values():
+        if zone.moisture_key == 'soil_moisture':
+            continue
+        try:
+            sensor = None
+            if sensor_controller.local_sensors:
+                from hardware.soil_moisture import SoilMoistureSensor
+                sensor = SoilMoistureSensor(channel=zone.soil_moisture_channel)
+            sensor_controller.add_sensor(zone.moisture_key, sensor, zone.moisture_key)
+        except Exception as e:
+            logger.error(f"Failed to initialize soil moisture sensor for zone {zone.id}: {e}")
 
 # --- Preset and Schedule Management ---
 
+catalog = PresetCatalog(
+    min_interval=_config.get('irrigation.schedules.min_interval', 0),
+    default_zone_id=dispatcher.default_zone_id
+)
+
 def get_all_presets():
     """Returns all presets with their schedules."""
-    return [p.to_dict(include_schedules=True) for p in Preset.query.all()]
+    return catalog.get_presets()
+
+def get_presets_snapshot():
+    """Returns all presets as (presets, serialized JSON body, ETag)."""
+    return catalog.snapshot()
 
 def create_preset(data):
     """Creates a new preset."""
     new_preset = Preset(name=data['name'], description=data.get('description'))
     db.session.add(new_preset)
     db.session.commit()
+    catalog.invalidate()
     logger.info(f"Created new preset: {new_preset.name}")
     return new_preset.to_dict()
 
@@ -112,6 +159,9 @@ def update_preset(preset_id, data):
     preset.name = data['name']
     preset.description = data.get('description')
     db.session.commit()
+    catalog.invalidate()
+    if preset.is_active:
+        scheduler.invalidate()
     logger.info(f"Updated preset {preset_id}: {preset.name}")
     return preset.to_dict()
 
@@ -120,22 +170,27 @@ def delete_preset(preset_id):
     preset = Preset.query.get(preset_id)
     if not preset:
         return False
+    was_active = preset.is_active
     db.session.delete(preset)
     db.session.commit()
+    catalog.invalidate()
+    if was_active:
+        scheduler.invalidate()
     logger.info(f"Deleted preset {preset_id}")
     return True
 
 def activate_preset(preset_id):
     """Activates a preset and deactivates all others."""
-    with pump_lock:
-        # Deactivate all other presets
-        Preset.query.filter(Preset.id != preset_id).update({'is_active': False})
-        # Activate the target preset
-        target_preset = Preset.query.get(preset_id)
-        if not target_preset:
-            return None
-        target_preset.is_active = True
-        db.session.commit()
+    # Deactivate all other presets
+    Preset.query.filter(Preset.id != preset_id).update({'is_active': False})
+    # Activate the target preset
+    target_preset = Preset.query.get(preset_id)
+    if not target_preset:
+        return None
+    target_preset.is_active = True
+    db.session.commit()
+    catalog.invalidate()
+    scheduler.invalidate()
     logger.info(f"Activated preset: {target_preset.name}")
     return target_preset.to_dict(include_schedules=True)
 
@@ -143,25 +198,97 @@ def deactivate_all_presets():
     """Deactivates all presets."""
     updated_rows = Preset.query.filter_by(is_active=True).update({'is_active': False})
     db.session.commit()
+    catalog.invalidate()
     if updated_rows > 0:
+        scheduler.invalidate()
         logger.info(f"Deactivated {updated_rows} preset(s).")
         return {"status": "success", "message": "All presets deactivated."}
     return {"status": "info", "message": "No presets were active."}
 
+def _parse_schedule_slot(data):
+    """Validates the day, start time and duration of a schedule request."""
+    day_of_week = data.get('day_of_week')
+    if day_of_week not in DAYS_OF_WEEK:
+        raise ValueError(f"Invalid day_of_week: {day_of_week}")
+    try:
+        start_time = datetime.strptime(data['start_time'], '%H:%M').time()
+        duration = int(data['duration_seconds'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("start_time (HH:MM) and duration_seconds are required.")
+    if duration <= 0:
+        raise ValueError("duration_seconds must be positive.")
+    return day_of_week, start_time, duration
+
+def _describe_slots(slots):
+    return [dict(zip(('day_of_week', 'start_time'), format_week_seconds(slot))) for slot in slots]
+
+def find_free_slots(preset_id, data, limit=3):
+    """Returns the next start times from the requested one at which a schedule fits.
+    
+    Returns:
+        list: Slots as {'day_of_week', 'start_time'} dicts, or None if the preset does not exist
+    """
+    if not catalog.get_preset(preset_id):
+        return None
+    zone_id = data.get('zone_id')
+    if zone_id is not None and not dispatcher.get_zone(zone_id):
+        raise ValueError(f"Unknown zone: {zone_id}")
+    day_of_week, start_time, duration = _parse_schedule_slot(data)
+    index = catalog.get_index(preset_id, zone_id)
+    return _describe_slots(index.free_slots(week_seconds(day_of_week, start_time.strftime('%H:%M')), duration, limit))
+
+def check_schedule_conflicts(preset, zone_id, day_of_week, start_time, duration):
+    """Raises ScheduleConflictError if a new schedule overlaps or crowds an existing one.
+    
+    Enforces irrigation.schedules.min_interval (seconds between runs of the same zone).
+    """
+    index = catalog.get_index(preset['id'], zone_id)
+    start = week_seconds(day_of_week, start_time)
+    conflicts = index.conflicts(start, duration)
+    if not conflicts:
+        return
+    schedules = {s['id']: s for s in preset['schedules']}
+    details = [dict(schedules[schedule_id], reason=reason) for schedule_id, reason in conflicts]
+    raise ScheduleConflictError(
+        f"Schedule conflicts with {len(details)} existing schedule(s) "
+        f"(minimum interval {index.min_interval}s).",
+        details,
+        _describe_slots(index.free_slots(start, duration))
+    )
+
 def add_schedule_to_preset(preset_id, data):
-    """Adds a new schedule to a preset."""
+    """Adds a new schedule to a preset.
+    
+    Raises:
+        ScheduleConflictError: If the schedule overlaps or is too close to another run of its zone
+        ValueError: If the request is invalid or the preset is full
+    """
     preset = Preset.query.get(preset_id)
     if not preset:
         return None
     
+    zone_id = data.get('zone_id')
+    if zone_id is not None and not dispatcher.get_zone(zone_id):
+        raise ValueError(f"Unknown zone: {zone_id}")
+    day_of_week, start_time, duration = _parse_schedule_slot(data)
+    
+    cached = catalog.get_preset(preset_id)
+    max_schedules = _config.get('irrigation.schedules.max_schedules')
+    if max_schedules and len(cached['schedules']) >= max_schedules:
+        raise ValueError(f"Preset already has the maximum of {max_schedules} schedules.")
+    check_schedule_conflicts(cached, zone_id, day_of_week, start_time.strftime('%H:%M'), duration)
+    
     new_schedule = Schedule(
         preset_id=preset_id,
-        day_of_week=data['day_of_week'],
-        start_time=datetime.strptime(data['start_time'], '%H:%M').time(),
-        duration_seconds=data['duration_seconds']
+        day_of_week=day_of_week,
+        start_time=start_time,
+        duration_seconds=duration,
+        zone_id=zone_id
     )
     db.session.add(new_schedule)
     db.session.commit()
+    catalog.invalidate()
+    scheduler.add_schedule(new_schedule, preset)
     logger.info(f"Added new schedule to preset {preset.name}")
     return new_schedule.to_dict()
 
@@ -172,81 +299,231 @@ def delete_schedule(schedule_id):
         return False
     db.session.delete(schedule)
     db.session.commit()
+    catalog.invalidate()
+    scheduler.remove_schedule(schedule_id)
     logger.info(f"Deleted schedule {schedule_id}")
     return True
 
 # --- Scheduler Logic ---
 
-def scheduler_loop(app):
-    """The main loop for the irrigation scheduler."""
-    global scheduler_running
-    logger.info("Irrigation scheduler started.")
-    while scheduler_running:
-        try:
-            with app.app_context():
-                check_schedules()
-        except Exception as e:
-            logger.error(f"Error in scheduler loop: {e}")
-        # Check every 60 seconds
-        time.sleep(60)
-    logger.info("Irrigation scheduler stopped.")
+def get_et0_factor():
+    """Returns the factor scheduled durations are scaled by: recent ET0 over the reference ET0.
 
-def check_schedules():
-    """Checks the active schedule and triggers the pump if needed."""
-    with pump_lock:
-        if pump_running:
-            logger.debug("Scheduler check skipped: pump is already running manually.")
-            return
-
-        active_preset = Preset.query.filter_by(is_active=True).first()
-        if not active_preset:
-            logger.debug("Scheduler check skipped: no active preset.")
-            return
-
-        now = datetime.now()
-        today_str = now.strftime('%A') # e.g., "Monday"
-        
-        schedules_today = active_preset.schedules.filter_by(
-            day_of_week=today_str, 
-            is_active=True
-        ).all()
-
-        for schedule in schedules_today:
-            # Check if current time is within one minute of the scheduled start time
-            if schedule.start_time.hour == now.hour and schedule.start_time.minute == now.minute:
-                logger.info(f"Scheduler: Triggering pump for preset '{active_preset.name}' based on schedule.")
-                start_pump(duration_seconds=schedule.duration_seconds)
-                log_irrigation_run(active_preset.id, schedule.duration_seconds)
-                break # Avoid running multiple schedules in the same minute
-
-def log_irrigation_run(preset_id, duration):
-    """Logs an irrigation event to the database."""
-    log_entry = IrrigationLog(
-        preset_id=preset_id,
-        duration=duration,
-        pump_status=True
-    )
-    db.session.add(log_entry)
-    db.session.commit()
-    logger.info(f"Logged irrigation run. Preset ID: {preset_id}, Duration: {duration:.2f}s")
+    Returns 1.0 when scaling is disabled or there is no recent history.
+    """
+    et0_config = _config.get('irrigation.et0', {}) or {}
+    if not et0_config.get('scale_durations'):
+        return 1.0
+    from weather.controllers import et0_calculator
+    
+    try:
+        average = et0_calculator.recent_average(et0_config.get('lookback_days', 3))
+    except Exception as e:
+        logger.error(f"Failed to compute ET0 for duration scaling: {e}")
+        return 1.0
+    if average is None:
+        return 1.0
+    factor = average / et0_config.get('reference_mm', 4.0)
+    return min(max(factor, et0_config.get('min_factor', 0.5)), et0_config.get('max_factor', 1.5))
+
+def run_scheduled_irrigation(entry):
+    """Starts the pump for a schedule that has become due."""
+    duration = entry.duration_seconds
+    factor = get_et0_factor()
+    if factor != 1.0:
+        duration = max(1, round(duration * factor))
+        logger.info(f"Schedule {entry.schedule_id} scaled by ET0 factor {factor:.2f}: {entry.duration_seconds}s -> {duration}s.")
+    result = start_pump(duration_seconds=duration, zone_id=entry.zone_id, preset_id=entry.preset_id)
+    if result['status'] not in ('success', 'queued'):
+        logger.info(f"Scheduled run for schedule {entry.schedule_id} skipped: {result['message']}")
+
+scheduler = IrrigationScheduler(run_scheduled_irrigation, catalog)
+
+def get_upcoming_runs(limit=5):
+    """Returns the next scheduled runs of the active preset."""
+    return scheduler.next_runs(limit)
+
+# --- Sensor Rules ---
+
+def run_rule(rule):
+    """Starts a zone for a sensor rule that has triggered."""
+    result = start_pump(duration_seconds=rule.duration_seconds, zone_id=rule.zone_id)
+    if result['status'] not in ('success', 'queued'):
+        logger.info(f"Run for rule {rule.id} skipped: {result['message']}")
+
+rule_engine = RuleEngine(run_rule)
+
+def init_rules(sensor_controller):
+    """Compiles the configured rules and evaluates them on every sensor reading.
+    
+    The rules see every sample in order (block policy), off the sensor threads.
+    """
+    rule_engine.load(_config.get('irrigation.rules', []))
+    sensor_controller.subscribe('rules', rule_engine.on_readings, policy='block')
+
+def get_rules():
+    """Returns the configured rules and their state."""
+    return rule_engine.status()
+
+def _apply_config_changes(snapshot, changed_keys):
+    """Applies reloaded rules, flow limits and schedule spacing without a restart."""
+    if any(key.startswith('irrigation.rules') for key in changed_keys):
+        rule_engine.load(snapshot.get('irrigation.rules', []))
+    dispatcher.max_flow = snapshot.get('irrigation.dispatcher.max_flow')
+    dispatcher.max_concurrent = snapshot.get('irrigation.dispatcher.max_concurrent')
+    min_interval = snapshot.get('irrigation.schedules.min_interval', 0)
+    if min_interval != catalog.min_interval:
+        catalog.min_interval = min_interval
+        catalog.invalidate()
+
+_config.subscribe(_apply_config_changes, ['irrigation.rules', 'irrigation.dispatcher', 'irrigation.schedules'])
+
+# --- Simulation ---
+
+def simulate_preset(preset_id, start, end, zone_id=None, model=None, rules=True, source='auto', points=0):
+    """Simulates what a preset would have done over recorded history.
+    
+    Args:
+        preset_id: Preset to replay
+        start: Start of the range (datetime)
+        end: End of the range (datetime, exclusive)
+        zone_id: Zone to simulate (default zone if omitted)
+        model: Soil-moisture model overrides (see simulator.DEFAULT_MODEL)
+        rules: True for the configured rules of the zone, False for none,
+               or a list of rule configurations
+        source: 'db', 'csv' or 'auto'
+        points: Number of points of the returned moisture series (0 = none)
+    
+    Returns:
+        dict: Simulation result, or None if the preset does not exist
+    
+    Raises:
+        ValueError: For an unknown zone or invalid rules/parameters
+    """
+    from .simulator import simulate
+    
+    preset = catalog.get_preset(preset_id)
+    if not preset:
+        return None
+    zone = dispatcher.get_zone(zone_id)
+    if not zone:
+        raise ValueError(f"Unknown zone: {zone_id}")
+    
+    schedules = [s for s in preset['schedules'] if (s['zone_id'] or dispatcher.default_zone_id) == zone.id]
+    
+    if rules is True:
+        rule_configs = _config.get('irrigation.rules', [])
+        compiled = [Rule.from_config(r) for r in rule_configs if r.get('enabled', True)]
+    else:
+        compiled = [Rule.from_config(r) for r in rules or []]
+    # Only soil moisture is simulated and rain replayed; other readings cannot drive a rule here
+    simulated = [
+        rule for rule in compiled
+        if (rule.zone_id or dispatcher.default_zone_id) == zone.id
+        and rule.trigger.sensor in ('soil_moisture', zone.moisture_key)
+        and all(c.sensor == 'rain' for c in rule.skip_conditions)
+    ]
+    for rule in simulated:
+        rule.trigger.sensor = 'soil_moisture'
+    
+    result = simulate(schedules, start, end, simulated, model, zone.flow_rate, source,
+                      current_app.config, points)
+    result.update({
+        'preset_id': preset_id,
+        'zone': zone.id,
+        'rules': [rule.id for rule in simulated],
+        'ignored_rules': [rule.id for rule in compiled if rule not in simulated]
+    })
+    return result
+
+# --- Moisture Prediction ---
+
+_predictor_config = _config.get('irrigation.predictor', {}) or {}
+
+def _on_prediction(prediction):
+    """Arms (or re-arms) a just-in-time run so watering starts shortly before the zone dries out."""
+    jit = _config.get('irrigation.predictor.just_in_time', {})
+    if not jit.get('enabled'):
+        return
+    zone_id = prediction['zone']
+    key = f"predict_jit:{zone_id}"
+    time_to_threshold = prediction['time_to_threshold_seconds']
+    if time_to_threshold is None or prediction['irrigating']:
+        timers.cancel(key)
+        return
+    delay = max(0, time_to_threshold - jit.get('lead_seconds', 1800))
+    timers.call_later(key, delay, _run_just_in_time, zone_id, jit.get('duration', 300))
+
+def _run_just_in_time(zone_id, duration):
+    """Starts a zone whose soil is predicted to reach the dry threshold."""
+    logger.info(f"Predicted dry soil in zone {zone_id}: starting just-in-time run of {duration}s.")
+    result = start_pump(duration_seconds=duration, zone_id=zone_id)
+    if result['status'] not in ('success', 'queued'):
+        logger.info(f"Just-in-time run for zone {zone_id} skipped: {result['message']}")
+
+predictor = MoisturePredictor(
+    {zone.id: zone.moisture_key for zone in dispatcher.zones.values()},
+    on_prediction=_on_prediction,
+    threshold=_predictor_config.get('threshold', 30.0),
+    window_seconds=_predictor_config.get('window_hours', 6) * 3600,
+    sample_interval=_predictor_config.get('sample_interval', 60),
+    settle_seconds=_predictor_config.get('settle_seconds', 600)
+)
+
+def _fit_predictor_history(app):
+    """Fits the default zone's drying rate from the recorded soil moisture and irrigation log."""
+    from weather.models import WeatherData
+    
+    since = datetime.now() - timedelta(days=_predictor_config.get('history_days', 7))
+    zone_id = dispatcher.default_zone_id
+    try:
+        with app.app_context():
+            rows = db.session.query(WeatherData.timestamp, WeatherData.soil_moisture).filter(
+                WeatherData.timestamp >= since,
+                WeatherData.soil_moisture.isnot(None)
+            ).order_by(WeatherData.timestamp.asc()).all()
+            logs = db.session.query(IrrigationLog.timestamp, IrrigationLog.duration).filter(
+                IrrigationLog.timestamp >= since,
+                (IrrigationLog.zone_id == zone_id) | IrrigationLog.zone_id.is_(None)
+            ).all()
+        times = [row[0].timestamp() for row in rows]
+        values = [row[1] for row in rows]
+        # IrrigationLog rows are written when a run stops
+        runs = [(ts.timestamp() - (duration or 0), ts.timestamp()) for ts, duration in logs]
+        predictor.fit_history(zone_id, times, values, runs)
+    except Exception as e:
+        logger.error(f"Failed to fit moisture predictor from history: {e}")
+
+def init_predictor(app, sensor_controller):
+    """Fits the predictor from history in the background and feeds it every soil-moisture reading."""
+    sensor_controller.subscribe('predictor', predictor.on_readings, policy='block')
+    thread = threading.Thread(target=_fit_predictor_history, args=(app,))
+    thread.daemon = True
+    thread.start()
+
+def get_predictions():
+    """Returns the drying rate and predicted time to the dry threshold of every zone."""
+    predictions = predictor.predictions()
+    for prediction in predictions:
+        prediction['just_in_time_in'] = timers.remaining(f"predict_jit:{prediction['zone']}")
+    return predictions
+
+def log_irrigation_run(preset_id, duration, zone_id=None):
+    """Queues an irrigation event for the background event log writer."""
+    event_log.log(IrrigationLog, preset_id=preset_id, zone_id=zone_id, duration=duration, pump_status=True)
+    logger.info(f"Logged irrigation run. Zone: {zone_id}, Preset ID: {preset_id}, Duration: {duration:.2f}s")
 
 
 def init_scheduler(app):
-    """Initializes and starts the scheduler thread."""
-    global scheduler_thread, scheduler_running
-    if not scheduler_thread:
-        scheduler_running = True
-        scheduler_thread = threading.Thread(target=scheduler_loop, args=(app,))
-        scheduler_thread.daemon = True
-        scheduler_thread.start()
+    """Initializes and starts the scheduler and event log writer threads."""
+    dispatcher.set_app(app)
+    event_log.start(app)
+    scheduler.start(app)
     logger.info("Irrigation scheduler initialized.")
 
 def shutdown_scheduler():
-    """Shuts down the scheduler thread."""
-    global scheduler_thread, scheduler_running
-    if scheduler_thread and scheduler_running:
-        scheduler_running = False
-        # Do not join the thread, as it causes an assertion error with eventlet.
-        # The daemon thread will exit when the main app exits.
-        scheduler_thread = None
-        logger.info("Irrigation scheduler stopped.")
\ No newline at end of file
+    """Shuts down the scheduler thread and stops all running zones."""
+    scheduler.stop()
+    dispatcher.stop_all()
+    event_log.stop()
+    logger.info("Irrigation scheduler stopped.")
@@ -0,0 +1,135 @@
+"""
+Weekly interval index for detecting schedule conflicts.
+
+Schedules repeat every week, so each one is an interval [start, end) in
+seconds since Monday 00:00, kept in a list sorted by start. A new interval is
+checked against its neighbours found with bisect, wrapping around the end of
+the week, for overlaps and for gaps shorter than the minimum interval.
+"""
+
+import heapq
+import bisect
+
+DAYS_OF_WEEK = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+DAY = 86400
+WEEK = 7 * DAY
+
+def week_seconds(day_of_week, start_time):
+    """Convert a day name and 'HH:MM' time to seconds since Monday 00:00."""
+    hour, minute = map(int, start_time.split(':'))
+    return DAYS_OF_WEEK.index(day_of_week) * DAY + hour * 3600 + minute * 60
+
+def format_week_seconds(seconds):
+    """Convert seconds since Monday 00:00 back to a day name and 'HH:MM' time."""
+    seconds %= WEEK
+    day, rest = divmod(seconds, DAY)
+    return DAYS_OF_WEEK[day], f"{rest // 3600:02d}:{rest % 3600 // 60:02d}"
+
+class ScheduleConflictError(ValueError):
+    """Raised when a schedule overlaps or is too close to existing schedules."""
+
+    def __init__(self, message, conflicts, free_slots):
+        super().__init__(message)
+        self.conflicts = conflicts
+        self.free_slots = free_slots
+
+class WeeklyIntervalIndex:
+    """Sorted weekly intervals of one preset and zone."""
+
+    def __init__(self, min_interval=0):
+        """Initialize an empty index.
+
+        Args:
+            min_interval: Minimum gap in seconds between the end of one run and
+                          the start of the next
+        """
+        self.min_interval = min_interval
+        self.starts = []
+        self.intervals = []
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def add(self, schedule_id, start, duration):
+        """Insert an interval without checking it."""
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.intervals.insert(position, (start, start + duration, schedule_id))
+
+    def _at(self, index):
+        """Get the interval at a cyclic index, shifted by a week when it wraps."""
+        count = len(self.intervals)
+        s, e, schedule_id = self.intervals[index % count]
+        offset = (index // count) * WEEK
+        return s + offset, e + offset, schedule_id
+
+    def conflicts(self, start, duration, ignore_id=None):
+        """Find intervals that overlap [start, start + duration) or violate the minimum gap.
+
+        Neighbours are visited outwards from the bisect position and the scan
+        stops at the first one far enough away on each side. Stored intervals
+        do not overlap, so their ends are sorted too and this inspects O(1)
+        intervals after an O(log n) bisect.
+
+        Returns:
+            list: (schedule_id, reason) tuples, reason being 'overlap' or 'min_interval'
+        """
+        end = start + duration
+        count = len(self.intervals)
+        position = bisect.bisect_right(self.starts, start)
+        found = {}
+
+        candidates = []
+        for step in range(count):
+            s, e, schedule_id = self._at(position - 1 - step)
+            if e + self.min_interval <= start:
+                break
+            candidates.append((s, e, schedule_id))
+        for step in range(count):
+            s, e, schedule_id = self._at(position + step)
+            if s >= end + self.min_interval:
+                break
+            candidates.append((s, e, schedule_id))
+
+        for s, e, schedule_id in candidates:
+            if schedule_id == ignore_id or schedule_id in found:
+                continue
+            found[schedule_id] = 'overlap' if s < end and start < e else 'min_interval'
+        return list(found.items())
+
+    def free_slots(self, start, duration, limit=3, ignore_id=None, granularity=60):
+        """Find the next start times, from start onwards, at which a run of duration fits.
+
+        Candidates are the requested start and the earliest start after each
+        existing run (its end plus the minimum interval), rounded up to the
+        granularity. Returned slots do not overlap one another.
+
+        Returns:
+            list: Start times in seconds since Monday 00:00
+        """
+        def align(value):
+            return -(-value // granularity) * granularity
+
+        candidates = [start]
+        position = bisect.bisect_right(self.starts, start)
+        for step in range(len(self.intervals)):
+            s, e, schedule_id = self._at(position - 1 + step)
+            if schedule_id != ignore_id:
+                candidates.append(align(e + self.min_interval))
+
+        candidates = [c for c in set(candidates) if start <= c < start + WEEK]
+        heapq.heapify(candidates)
+        slots = []
+        last = None
+        while candidates and len(slots) < limit:
+            candidate = heapq.heappop(candidates)
+            if candidate == last or (slots and candidate < slots[-1] + duration + self.min_interval):
+                continue
+            last = candidate
+            if not self.conflicts(candidate % WEEK, duration, ignore_id):
+                slots.append(candidate)
+                # Slots do not overlap each other: the next one may follow this run
+                following = align(candidate + duration + self.min_interval)
+                if following < start + WEEK:
+                    heapq.heappush(candidates, following)
+        return [slot % WEEK for slot in slots]
@@ -38,6 +38,7 @@ class Schedule(db.Model):
     start_time = db.Column(db.Time, nullable=False)  # Time of day for irrigation
     duration_seconds = db.Column(db.Integer, nullable=False) # Duration in seconds
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    zone_id = db.Column(db.String(50), nullable=True)  # None = default zone
 
     def to_dict(self):
         """Converts the schedule to a dictionary."""
@@ -47,7 +48,8 @@ class Schedule(db.Model):
             'day_of_week': self.day_of_week,
             'start_time': self.start_time.strftime('%H:%M'),
             'duration_seconds': self.duration_seconds,
-            'is_active': self.is_active
+            'is_active': self.is_active,
+            'zone_id': self.zone_id
         }
 
 class PumpLog(db.Model):
@@ -57,6 +59,8 @@ class PumpLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     action = db.Column(db.String(50), nullable=False)  # 'start', 'stop', etc.
     duration = db.Column(db.Float, nullable=True)  # Duration in seconds if action is 'stop'
+    zone_id = db.Column(db.String(50), nullable=True)
+    relay_state = db.Column(db.Boolean, nullable=True)  # Relay state after the action
     timestamp = db.Column(db.DateTime, default=datetime.now)
     
     def to_dict(self):
@@ -65,6 +69,8 @@ class PumpLog(db.Model):
             'id': self.id,
             'action': self.action,
             'duration': self.duration,
+            'zone_id': self.zone_id,
+            'relay_state': self.relay_state,
             'timestamp': self.timestamp.isoformat()
         }
 
@@ -74,6 +80,7 @@ class IrrigationLog(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     preset_id = db.Column(db.Integer, db.ForeignKey('presets.id'), nullable=True)
+    zone_id = db.Column(db.String(50), nullable=True)
     duration = db.Column(db.Float, nullable=True)
     pump_status = db.Column(db.Boolean, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.now)
@@ -86,6 +93,7 @@ class IrrigationLog(db.Model):
             'id': self.id,
             'preset_id': self.preset_id,
             'preset_name': self.preset.name if self.preset else 'Manual',
+            'zone_id': self.zone_id,
             'duration': self.duration,
             'pump_status': self.pump_status,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
@@ -0,0 +1,307 @@
+"""
+Soil-moisture drying model and time-to-threshold prediction.
+
+Each zone keeps a least-squares line over a sliding window of its recent
+soil-moisture samples. The running sums are updated in O(1) per sample, so
+fitting runs on every new reading. The line is restarted at every irrigation
+event and at sudden rises (rain), so a window only ever covers one drying
+segment. Until the live window holds enough samples, a typical drying rate
+fitted from history (vectorized rolling regression over the last days,
+segmented around IrrigationLog events) is used instead.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class RollingRegression:
+    """Least-squares line over a sliding time window, updated in O(1) per sample."""
+
+    def __init__(self, window_seconds):
+        """Initialize the regression.
+
+        Args:
+            window_seconds: Samples older than this, relative to the newest, are dropped
+        """
+        self.window_seconds = window_seconds
+        self.samples = deque()
+        self.reset()
+
+    def reset(self):
+        """Forget all samples."""
+        self.samples.clear()
+        self.origin = None
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = 0.0
+
+    def __len__(self):
+        return len(self.samples)
+
+    def _accumulate(self, t, y, sign):
+        x = t - self.origin
+        self.sum_t += sign * x
+        self.sum_y += sign * y
+        self.sum_tt += sign * x * x
+        self.sum_ty += sign * x * y
+
+    def _rebase(self, origin):
+        """Recompute the sums relative to a new time origin to keep them well conditioned."""
+        self.origin = origin
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = 0.0
+        for t, y in self.samples:
+            self._accumulate(t, y, 1)
+
+    def add(self, t, y):
+        """Add a sample and drop the ones that left the window."""
+        if self.origin is None:
+            self.origin = t
+        self.samples.append((t, y))
+        self._accumulate(t, y, 1)
+        while self.samples and self.samples[0][0] < t - self.window_seconds:
+            old_t, old_y = self.samples.popleft()
+            self._accumulate(old_t, old_y, -1)
+        if t - self.origin > 4 * self.window_seconds:
+            self._rebase(self.samples[0][0])
+
+    def slope(self):
+        """Get the fitted slope in units per second, or None with fewer than two samples."""
+        n = len(self.samples)
+        if n < 2:
+            return None
+        denominator = n * self.sum_tt - self.sum_t * self.sum_t
+        if denominator <= 0:
+            return None
+        return (n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+    def predict(self, t):
+        """Get the fitted value at time t, or None."""
+        slope = self.slope()
+        if slope is None:
+            return None
+        n = len(self.samples)
+        intercept = (self.sum_y - slope * self.sum_t) / n
+        return intercept + slope * (t - self.origin)
+
+def rolling_slopes(t, y, segments, window):
+    """Vectorized least-squares slopes over windows of consecutive samples.
+
+    Args:
+        t: Sample times in seconds
+        y: Sample values
+        segments: Segment id per sample; windows spanning two segments are discarded
+        window: Samples per window
+
+    Returns:
+        numpy.ndarray: Slopes (units per second) of the valid windows, in time order
+    """
+    if len(t) < window or window < 2:
+        return np.zeros(0)
+    x = t - t[0]
+
+    def window_sums(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return cumulative[window:] - cumulative[:-window]
+
+    sum_x, sum_y = window_sums(x), window_sums(y)
+    sum_xx, sum_xy = window_sums(x * x), window_sums(x * y)
+    denominator = window * sum_xx - sum_x * sum_x
+    valid = (segments[window - 1:] == segments[:len(segments) - window + 1]) & (denominator > 0)
+    return (window * sum_xy[valid] - sum_x[valid] * sum_y[valid]) / denominator[valid]
+
+def segment_history(t, y, runs, settle_seconds, jump):
+    """Assign drying-segment ids to history samples.
+
+    A new segment starts after every irrigation run (plus a settling time, during
+    which samples are dropped) and at every rise larger than jump.
+
+    Args:
+        runs: (start, end) times of irrigation runs, in seconds
+
+    Returns:
+        tuple: (kept sample mask, segment id per kept sample)
+    """
+    keep = np.ones(len(t), dtype=bool)
+    boundary = np.zeros(len(t), dtype=bool)
+    for start, end in runs:
+        keep &= ~((t >= start) & (t < end + settle_seconds))
+        after = np.searchsorted(t, end + settle_seconds)
+        if after < len(t):
+            boundary[after] = True
+    boundary[1:] |= np.diff(y) > jump
+    segments = np.cumsum(boundary)
+    return keep, segments[keep]
+
+class ZonePredictor:
+    """Drying-rate fit and time-to-threshold prediction for one zone."""
+
+    def __init__(self, zone_id, threshold=30.0, window_seconds=6 * 3600, sample_interval=60,
+                 settle_seconds=600, min_samples=10, jump=2.0):
+        """Initialize the predictor.
+
+        Args:
+            zone_id: Zone identifier
+            threshold: Moisture (%) at which the soil counts as dry
+            window_seconds: Length of the regression window
+            sample_interval: Minimum seconds between two samples used for fitting
+            settle_seconds: Samples ignored after irrigation while water soaks in
+            min_samples: Live samples needed before the live fit replaces the history rate
+            jump: Rise (%) between samples treated as rain, starting a new segment
+        """
+        self.zone_id = zone_id
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.settle_seconds = settle_seconds
+        self.min_samples = min_samples
+        self.jump = jump
+        self.regression = RollingRegression(window_seconds)
+        self.history_rate = None
+        self.last_sample = None
+        self.segment_started = None
+        self.settle_until = 0
+        self.irrigating = False
+
+    def seed(self, t, y, history_rate):
+        """Load the current segment and the historical drying rate from history."""
+        self.history_rate = history_rate
+        self.regression.reset()
+        for sample_t, sample_y in zip(t, y):
+            self.regression.add(float(sample_t), float(sample_y))
+        if len(t):
+            self.last_sample = (float(t[-1]), float(y[-1]))
+            self.segment_started = float(t[0])
+
+    def on_irrigation(self, action, now):
+        """Restart the drying segment around an irrigation run."""
+        if action == 'start':
+            self.irrigating = True
+            self.regression.reset()
+        elif action == 'stop':
+            self.irrigating = False
+            self.settle_until = now + self.settle_seconds
+            self.regression.reset()
+            self.segment_started = None
+
+    def add_sample(self, now, value):
+        """Feed a live reading.
+
+        Returns:
+            bool: True if the sample was used (the prediction may have changed)
+        """
+        if value is None or self.irrigating or now < self.settle_until:
+            return False
+        if self.last_sample and now - self.last_sample[0] < self.sample_interval:
+            return False
+        if self.last_sample and value - self.last_sample[1] > self.jump:
+            # Rain: start a new drying segment
+            self.regression.reset()
+            self.segment_started = None
+        if self.segment_started is None:
+            self.segment_started = now
+        self.regression.add(now, value)
+        self.last_sample = (now, value)
+        return True
+
+    def predict(self, now=None):
+        """Get the drying rate and the predicted time until the threshold is reached."""
+        now = now or time.time()
+        live = len(self.regression) >= self.min_samples and self.regression.slope() is not None
+        slope = self.regression.slope() if live else self.history_rate
+        moisture = self.regression.predict(now) if live else (self.last_sample[1] if self.last_sample else None)
+
+        time_to_threshold = None
+        if moisture is not None and slope is not None:
+            if moisture <= self.threshold:
+                time_to_threshold = 0.0
+            elif slope < 0:
+                time_to_threshold = (moisture - self.threshold) / -slope
+
+        return {
+            'zone': self.zone_id,
+            'moisture': moisture,
+            'rate_per_hour': slope * 3600 if slope is not None else None,
+            'rate_source': 'live' if live else ('history' if self.history_rate is not None else None),
+            'samples': len(self.regression),
+            'threshold': self.threshold,
+            'irrigating': self.irrigating,
+            'time_to_threshold_seconds': time_to_threshold,
+            'predicted_dry_at': now + time_to_threshold if time_to_threshold is not None else None
+        }
+
+class MoisturePredictor:
+    """Keeps a ZonePredictor per zone and feeds it from sensor readings and pump events."""
+
+    def __init__(self, zones, on_prediction=None, **options):
+        """Initialize the predictor.
+
+        Args:
+            zones: Mapping of zone id to the reading key of its soil moisture
+            on_prediction: Called with a zone's prediction dict after each used sample
+            **options: ZonePredictor options (threshold, window_seconds, ...)
+        """
+        self.moisture_keys = dict(zones)
+        self.on_prediction = on_prediction
+        self.zones = {zone_id: ZonePredictor(zone_id, **options) for zone_id in zones}
+        self.lock = threading.Lock()
+
+    def fit_history(self, zone_id, t, y, runs):
+        """Fit a zone from history with a vectorized rolling regression.
+
+        Args:
+            t: Sample times in seconds (ascending)
+            y: Soil moisture samples
+            runs: (start, end) times of the zone's irrigation runs
+        """
+        zone = self.zones[zone_id]
+        t = np.asarray(t, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(t) < 2:
+            return None
+        keep, segments = segment_history(t, y, runs, zone.settle_seconds, zone.jump)
+        t, y = t[keep], y[keep]
+        if len(t) < 2:
+            return None
+
+        spacing = float(np.median(np.diff(t))) or zone.sample_interval
+        window = max(2, int(zone.regression.window_seconds / spacing))
+        slopes = rolling_slopes(t, y, segments, min(window, len(t)))
+        history_rate = float(np.median(slopes)) if len(slopes) else None
+
+        last = segments == segments[-1]
+        with self.lock:
+            zone.seed(t[last], y[last], history_rate)
+        logger.info(f"Moisture predictor for zone {zone_id} fitted from {len(t)} samples "
+                    f"({len(slopes)} windows, rate {history_rate * 3600 if history_rate else 0:.3f} %/h).")
+        return history_rate
+
+    def on_readings(self, readings, changed_keys):
+        """Sensor sink: feed new soil-moisture readings to their zones."""
+        now = time.time()
+        for zone_id, key in self.moisture_keys.items():
+            if key not in changed_keys:
+                continue
+            with self.lock:
+                used = self.zones[zone_id].add_sample(now, readings.get(key))
+                prediction = self.zones[zone_id].predict(now) if used else None
+            if prediction and self.on_prediction:
+                try:
+                    self.on_prediction(prediction)
+                except Exception as e:
+                    logger.error(f"Error handling prediction for zone {zone_id}: {e}")
+
+    def on_pump_event(self, action, zone_id):
+        """Restart a zone's drying segment around irrigation."""
+        zone = self.zones.get(zone_id)
+        if zone:
+            with self.lock:
+                zone.on_irrigation(action, time.time())
+
+    def predictions(self):
+        """Get the current prediction of every zone."""
+        now = time.time()
+        with self.lock:
+            return [zone.predict(now) for zone in self.zones.values()]
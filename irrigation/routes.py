@@ -1,6 +1,7 @@
-from flask import Blueprint, jsonify, request, current_app
-from datetime import datetime
+from flask import Blueprint, jsonify, request, current_app, Response
+from datetime import datetime, timedelta
 from . import controllers
+from .intervals import ScheduleConflictError
 
 irrigation_bp = Blueprint('irrigation', __name__)
 
@@ -18,23 +19,65 @@ def get_irrigation_status():
 def start_pump_route():
     data = request.json or {}
     duration = data.get('duration')
-    result = controllers.start_pump(duration_seconds=duration)
+    result = controllers.start_pump(duration_seconds=duration, zone_id=data.get('zone'))
     return jsonify(result)
 
 @irrigation_bp.route('/api/irrigation/pump/stop', methods=['POST'])
 def stop_pump_route():
-    result = controllers.stop_pump()
+    data = request.get_json(silent=True) or {}
+    result = controllers.stop_pump(zone_id=data.get('zone'))
     return jsonify(result)
 
 @irrigation_bp.route('/api/irrigation/pump/status', methods=['GET'])
 def pump_status_route():
-    status = controllers.get_pump_status()
-    return jsonify(status)
+    status = controllers.get_pump_status(request.args.get('zone'))
+    return jsonify(status), 404 if status.get('status') == 'error' else 200
+
+@irrigation_bp.route('/api/irrigation/pump/command', methods=['POST'])
+def pump_command_route():
+    """Run a pump command with the same body as the 'pump_command' socket event."""
+    return jsonify(controllers.handle_pump_command(request.get_json(silent=True)))
+
+@irrigation_bp.route('/api/irrigation/zones', methods=['GET'])
+def zones_route():
+    """Get all zones, the run queue and the flow budget."""
+    return jsonify(controllers.get_zones())
+
+@irrigation_bp.route('/api/irrigation/rules', methods=['GET'])
+def rules_route():
+    """Get the sensor rules and their current state."""
+    return jsonify(controllers.get_rules())
+
+@irrigation_bp.route('/api/irrigation/predictions', methods=['GET'])
+def predictions_route():
+    """Get the fitted drying rate and predicted time-to-dry of every zone."""
+    return jsonify(controllers.get_predictions())
+
+@irrigation_bp.route('/api/irrigation/zones/<zone_id>/start', methods=['POST'])
+def start_zone_route(zone_id):
+    data = request.get_json(silent=True) or {}
+    result = controllers.start_pump(duration_seconds=data.get('duration'), zone_id=zone_id)
+    return jsonify(result), 404 if result['status'] == 'error' else 200
+
+@irrigation_bp.route('/api/irrigation/zones/<zone_id>/stop', methods=['POST'])
+def stop_zone_route(zone_id):
+    result = controllers.stop_pump(zone_id=zone_id)
+    return jsonify(result), 404 if result['status'] == 'error' else 200
+
+@irrigation_bp.route('/api/irrigation/schedule/upcoming', methods=['GET'])
+def upcoming_runs_route():
+    """Get the next scheduled runs of the active preset."""
+    limit = request.args.get('limit', 5, type=int)
+    return jsonify(controllers.get_upcoming_runs(limit))
 
 @irrigation_bp.route('/api/presets', methods=['GET'])
 def get_presets_route():
-    presets = controllers.get_all_presets()
-    return jsonify(presets)
+    """Get all presets from the catalog; answers 304 when the client's ETag matches."""
+    _, body, etag = controllers.get_presets_snapshot()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @irrigation_bp.route('/api/presets', methods=['POST'])
 def create_preset_route():
@@ -42,6 +85,33 @@ def create_preset_route():
     preset = controllers.create_preset(data)
     return jsonify(preset), 201
 
+@irrigation_bp.route('/api/presets/<int:preset_id>/simulate', methods=['POST'])
+def simulate_preset_route(preset_id):
+    """Simulate a preset over recorded history.
+    
+    JSON body: start, end (ISO dates or datetimes), zone, model (soil-moisture
+    model overrides), rules (true, false or a list of rule configurations),
+    source ('db', 'csv' or 'auto') and points (moisture series length).
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        end = datetime.fromisoformat(data['end']) if data.get('end') else datetime.now()
+        start = datetime.fromisoformat(data['start']) if data.get('start') else end - timedelta(days=30)
+        points = int(data.get('points', 0))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Invalid points or date format. Use ISO 8601."}), 400
+    
+    try:
+        result = controllers.simulate_preset(
+            preset_id, start, end, data.get('zone'), data.get('model'),
+            data.get('rules', True), data.get('source', 'auto'), points
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if result is None:
+        return jsonify({'message': 'Preset not found'}), 404
+    return jsonify(result)
+
 @irrigation_bp.route('/api/presets/<int:preset_id>', methods=['PUT'])
 def update_preset_route(preset_id):
     data = request.json
@@ -71,11 +141,37 @@ def deactivate_presets_route():
 @irrigation_bp.route('/api/presets/<int:preset_id>/schedules', methods=['POST'])
 def add_schedule_route(preset_id):
     data = request.json
-    schedule = controllers.add_schedule_to_preset(preset_id, data)
+    try:
+        schedule = controllers.add_schedule_to_preset(preset_id, data)
+    except ScheduleConflictError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'conflicts': e.conflicts,
+            'free_slots': e.free_slots
+        }), 409
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     if schedule:
         return jsonify(schedule), 201
     return jsonify({'message': 'Preset not found'}), 404
 
+@irrigation_bp.route('/api/presets/<int:preset_id>/schedules/free-slots', methods=['GET'])
+def free_slots_route(preset_id):
+    """Get the next free start times for a schedule.
+    
+    Query parameters: day_of_week, start_time (HH:MM), duration_seconds,
+    zone_id and limit (default 3).
+    """
+    limit = request.args.get('limit', 3, type=int)
+    try:
+        slots = controllers.find_free_slots(preset_id, request.args, limit)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if slots is None:
+        return jsonify({'message': 'Preset not found'}), 404
+    return jsonify(slots)
+
 @irrigation_bp.route('/api/schedules/<int:schedule_id>', methods=['DELETE'])
 def delete_schedule_route(schedule_id):
     if controllers.delete_schedule(schedule_id):
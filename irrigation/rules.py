@@ -0,0 +1,260 @@
+"""
+Sensor-triggered irrigation rules.
+
+Rules from irrigation.rules are compiled once into predicate objects that keep
+their own state (how long a condition has held, whether the rule is latched,
+when it last fired). They are evaluated incrementally on every new sensor
+reading, and only rules that reference the updated reading are touched, so a
+rule reacts within one sample period.
+
+Example rule:
+    {
+        "id": "dry_main",
+        "zone": "main",
+        "when": {"sensor": "soil_moisture", "below": 30, "for": 300},
+        "hysteresis": 5,
+        "duration": 300,
+        "min_interval": 3600,
+        "skip_if": [{"sensor": "rain", "above": 50}]
+    }
+"""
+
+import time
+import logging
+import threading
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class Condition:
+    """A threshold on one reading that must hold for a minimum time."""
+
+    __slots__ = ('sensor', 'threshold', 'below', 'hold_seconds', 'since')
+
+    def __init__(self, sensor, threshold, below, hold_seconds=0):
+        """Initialize the condition.
+
+        Args:
+            sensor: Key of the reading in the sensor snapshot
+            threshold: Threshold value
+            below: True for "value < threshold", False for "value > threshold"
+            hold_seconds: How long the comparison must hold before it is met
+        """
+        self.sensor = sensor
+        self.threshold = threshold
+        self.below = below
+        self.hold_seconds = hold_seconds
+        self.since = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Compile a condition from its {"sensor", "below"|"above", "for"} dict."""
+        if 'sensor' not in config:
+            raise ValueError("condition needs a 'sensor'")
+        if ('below' in config) == ('above' in config):
+            raise ValueError("condition needs exactly one of 'below' or 'above'")
+        below = 'below' in config
+        threshold = float(config['below'] if below else config['above'])
+        return cls(config['sensor'], threshold, below, float(config.get('for', 0)))
+
+    def compare(self, value):
+        """Check the threshold on a single value."""
+        return value < self.threshold if self.below else value > self.threshold
+
+    def update(self, value, now):
+        """Feed a new value and return whether the condition is met.
+
+        A missing reading resets the hold timer, so a sensor outage never
+        counts towards the required duration.
+        """
+        if value is None or not self.compare(value):
+            self.since = None
+            return False
+        if self.since is None:
+            self.since = now
+        return now - self.since >= self.hold_seconds
+
+    def released(self, value, hysteresis):
+        """Check whether a value is past the threshold by the hysteresis margin."""
+        if value is None:
+            return False
+        if self.below:
+            return value >= self.threshold + hysteresis
+        return value <= self.threshold - hysteresis
+
+class Rule:
+    """A compiled irrigation rule."""
+
+    def __init__(self, rule_id, zone_id, trigger, duration_seconds, hysteresis=0,
+                 min_interval=0, skip_conditions=None, enabled=True):
+        """Initialize the rule.
+
+        Args:
+            rule_id: Unique rule identifier
+            zone_id: Zone to run (None = default zone)
+            trigger: Condition that starts the zone
+            duration_seconds: Run duration
+            hysteresis: Margin the trigger reading must recover by before the rule can fire again
+            min_interval: Minimum seconds between two runs started by this rule
+            skip_conditions: Conditions that suppress the run while they hold (e.g. rain)
+            enabled: Whether the rule is evaluated
+        """
+        self.id = rule_id
+        self.zone_id = zone_id
+        self.trigger = trigger
+        self.duration_seconds = duration_seconds
+        self.hysteresis = hysteresis
+        self.min_interval = min_interval
+        self.skip_conditions = skip_conditions or []
+        self.enabled = enabled
+        self.latched = False
+        self.skipping = False
+        self.last_fired = None
+        self.last_fired_at = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Compile a rule from its configuration dict.
+
+        Raises:
+            ValueError: If the rule is incomplete or malformed
+        """
+        if 'id' not in config:
+            raise ValueError("rule needs an 'id'")
+        if 'when' not in config or 'duration' not in config:
+            raise ValueError(f"rule {config['id']} needs 'when' and 'duration'")
+        try:
+            return cls(
+                str(config['id']),
+                config.get('zone'),
+                Condition.from_config(config['when']),
+                int(config['duration']),
+                hysteresis=float(config.get('hysteresis', 0)),
+                min_interval=float(config.get('min_interval', 0)),
+                skip_conditions=[Condition.from_config(c) for c in config.get('skip_if', [])],
+                enabled=config.get('enabled', True)
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"rule {config['id']}: {e}")
+
+    @property
+    def sensors(self):
+        """Get the reading keys this rule depends on."""
+        return {self.trigger.sensor} | {c.sensor for c in self.skip_conditions}
+
+    def evaluate(self, readings, now):
+        """Evaluate the rule against a sensor snapshot.
+
+        Returns:
+            bool: True if the zone should be started now
+        """
+        value = readings.get(self.trigger.sensor)
+        met = self.trigger.update(value, now)
+        skip = [c for c in self.skip_conditions if c.update(readings.get(c.sensor), now)]
+
+        if self.latched:
+            if self.trigger.released(value, self.hysteresis):
+                self.latched = False
+                logger.info(f"Rule {self.id} re-armed ({self.trigger.sensor}={value}).")
+            return False
+        if not met:
+            self.skipping = False
+            return False
+        if self.last_fired is not None and now - self.last_fired < self.min_interval:
+            return False
+        if skip:
+            if not self.skipping:
+                reasons = ', '.join(f"{c.sensor}={readings.get(c.sensor)}" for c in skip)
+                logger.info(f"Rule {self.id} skipped: {reasons}.")
+                self.skipping = True
+            return False
+
+        self.skipping = False
+        self.latched = True
+        self.last_fired = now
+        self.last_fired_at = time.time()
+        return True
+
+    def to_dict(self):
+        """Convert the rule and its state to a dictionary."""
+        return {
+            'id': self.id,
+            'zone': self.zone_id,
+            'sensor': self.trigger.sensor,
+            'threshold': self.trigger.threshold,
+            'below': self.trigger.below,
+            'for': self.trigger.hold_seconds,
+            'duration': self.duration_seconds,
+            'hysteresis': self.hysteresis,
+            'min_interval': self.min_interval,
+            'skip_if': [{'sensor': c.sensor, 'threshold': c.threshold, 'below': c.below}
+                        for c in self.skip_conditions],
+            'enabled': self.enabled,
+            'condition_since': self.trigger.since,
+            'latched': self.latched,
+            'skipping': self.skipping,
+            'last_fired': self.last_fired_at
+        }
+
+class RuleEngine:
+    """Evaluates compiled rules on each sensor update."""
+
+    def __init__(self, fire_callback):
+        """Initialize the rule engine.
+
+        Args:
+            fire_callback: Called with a Rule when it decides to start its zone
+        """
+        self.fire_callback = fire_callback
+        self.rules = []
+        self.rules_by_sensor = {}
+        self.lock = threading.Lock()
+
+    def load(self, rule_configs):
+        """Compile rule configurations, replacing the current rules.
+
+        Invalid rules are logged and left out.
+        """
+        rules = []
+        for rule_config in rule_configs or []:
+            try:
+                rules.append(Rule.from_config(rule_config))
+            except ValueError as e:
+                logger.error(f"Ignoring invalid irrigation rule: {e}")
+
+        rules_by_sensor = {}
+        for rule in rules:
+            if rule.enabled:
+                for sensor in rule.sensors:
+                    rules_by_sensor.setdefault(sensor, []).append(rule)
+
+        with self.lock:
+            self.rules = rules
+            self.rules_by_sensor = rules_by_sensor
+        logger.info(f"Loaded {len(rules)} irrigation rule(s).")
+
+    def on_readings(self, readings, changed_keys):
+        """Sensor sink: evaluate the rules that depend on the changed readings."""
+        now = time.monotonic()
+        due = []
+        with self.lock:
+            affected = []
+            for key in changed_keys:
+                for rule in self.rules_by_sensor.get(key, ()):
+                    if rule not in affected:
+                        affected.append(rule)
+            for rule in affected:
+                if rule.evaluate(readings, now):
+                    due.append(rule)
+
+        for rule in due:
+            logger.info(f"Rule {rule.id} triggered: {rule.trigger.sensor}={readings.get(rule.trigger.sensor)}.")
+            try:
+                self.fire_callback(rule)
+            except Exception as e:
+                logger.error(f"Error running rule {rule.id}: {e}")
+
+    def status(self):
+        """Get every rule with its state."""
+        with self.lock:
+            return [rule.to_dict() for rule in self.rules]
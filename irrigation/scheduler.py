@@ -0,0 +1,231 @@
+"""
+Event-driven irrigation scheduler.
+
+The active preset is compiled into a heap of upcoming fire times. The
+scheduler thread sleeps until the earliest one (or until it is woken by a
+change), so it does not poll the database while idle. A run that was due
+while the thread was busy or delayed still fires within a grace window,
+instead of being lost to an exact hour/minute comparison.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, time
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DAYS_OF_WEEK = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+class ScheduleEntry:
+    """A compiled, weekly-recurring schedule of the active preset."""
+
+    __slots__ = ('schedule_id', 'preset_id', 'preset_name', 'weekday', 'start_time', 'duration_seconds', 'zone_id')
+
+    def __init__(self, schedule_id, preset_id, preset_name, weekday, start_time, duration_seconds, zone_id=None):
+        self.schedule_id = schedule_id
+        self.preset_id = preset_id
+        self.preset_name = preset_name
+        self.weekday = weekday
+        self.start_time = start_time
+        self.duration_seconds = duration_seconds
+        self.zone_id = zone_id
+
+    @classmethod
+    def from_schedule(cls, schedule, preset):
+        """Build an entry from a Schedule model and its Preset."""
+        return cls(
+            schedule.id, preset.id, preset.name,
+            DAYS_OF_WEEK.index(schedule.day_of_week),
+            schedule.start_time, schedule.duration_seconds, schedule.zone_id
+        )
+
+    @classmethod
+    def from_dict(cls, schedule, preset):
+        """Build an entry from catalog dicts of a schedule and its preset."""
+        hour, minute = map(int, schedule['start_time'].split(':'))
+        return cls(
+            schedule['id'], preset['id'], preset['name'],
+            DAYS_OF_WEEK.index(schedule['day_of_week']),
+            time(hour, minute), schedule['duration_seconds'], schedule['zone_id']
+        )
+
+    def next_fire_time(self, after):
+        """Get the first fire time strictly after the given datetime."""
+        days_ahead = (self.weekday - after.weekday()) % 7
+        candidate = datetime.combine(after.date() + timedelta(days=days_ahead), self.start_time)
+        if candidate <= after:
+            candidate += timedelta(days=7)
+        return candidate
+
+class IrrigationScheduler:
+    """Fires the active preset's schedules at their exact times."""
+
+    def __init__(self, fire_callback, catalog, grace_seconds=300, max_sleep=300):
+        """Initialize the scheduler.
+
+        Args:
+            fire_callback: Called with a ScheduleEntry when it is due
+            catalog: PresetCatalog the active preset is compiled from
+            grace_seconds: How late a run may still be fired after its time
+            max_sleep: Upper bound on a single sleep, so wall-clock
+                       adjustments (e.g. NTP at boot) are noticed
+        """
+        self.fire_callback = fire_callback
+        self.catalog = catalog
+        self.grace_seconds = grace_seconds
+        self.max_sleep = max_sleep
+        self.app = None
+        self.thread = None
+        self.running = False
+        self.heap = []
+        self.entries = {}
+        self.needs_rebuild = True
+        # Bumped by every change, so a rebuild can tell that it compiled a stale catalog
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def start(self, app):
+        """Start the scheduler thread."""
+        if self.thread:
+            return
+        self.app = app
+        self.running = True
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread."""
+        if self.thread and self.running:
+            self.running = False
+            self.wakeup.set()
+            # Do not join the thread, as it causes an assertion error with eventlet.
+            self.thread = None
+
+    def invalidate(self):
+        """Recompile the active preset before the next wakeup (e.g. after activation)."""
+        with self.lock:
+            self.needs_rebuild = True
+            self.generation += 1
+        self.wakeup.set()
+
+    def add_schedule(self, schedule, preset):
+        """Add a schedule incrementally if it belongs to the active preset."""
+        if not preset.is_active or not schedule.is_active:
+            return
+        entry = ScheduleEntry.from_schedule(schedule, preset)
+        with self.lock:
+            # SQLite may reuse a deleted schedule's id; its old fire time must not survive
+            self._drop_heap_items(entry.schedule_id)
+            self.entries[entry.schedule_id] = entry
+            self.generation += 1
+            heapq.heappush(self.heap, (entry.next_fire_time(datetime.now()), entry.schedule_id))
+        self.wakeup.set()
+
+    def remove_schedule(self, schedule_id):
+        """Remove a schedule incrementally, together with its heap item."""
+        with self.lock:
+            self.entries.pop(schedule_id, None)
+            self._drop_heap_items(schedule_id)
+            self.generation += 1
+        self.wakeup.set()
+
+    def _drop_heap_items(self, schedule_id):
+        """Remove a schedule's items from the heap; the caller holds the lock."""
+        heap = [item for item in self.heap if item[1] != schedule_id]
+        if len(heap) != len(self.heap):
+            heapq.heapify(heap)
+            self.heap = heap
+
+    def next_runs(self, limit=5):
+        """Get the upcoming fire times as dicts, soonest first."""
+        with self.lock:
+            upcoming = sorted(item for item in self.heap if item[1] in self.entries)[:limit]
+            return [{
+                'schedule_id': schedule_id,
+                'preset_id': self.entries[schedule_id].preset_id,
+                'zone_id': self.entries[schedule_id].zone_id,
+                'fire_at': fire_at.isoformat(),
+                'duration_seconds': self.entries[schedule_id].duration_seconds
+            } for fire_at, schedule_id in upcoming]
+
+    def _rebuild(self):
+        """Compile the active preset into a fresh heap of fire times.
+
+        The catalog is read outside the lock (it yields under eventlet). If a
+        schedule was added or removed, or the preset invalidated, meanwhile,
+        the result is discarded and the catalog read again.
+        """
+        while True:
+            with self.lock:
+                generation = self.generation
+            with self.app.app_context():
+                preset = self.catalog.get_active()
+            schedules = [s for s in preset['schedules'] if s['is_active']] if preset else []
+            entries = {s['id']: ScheduleEntry.from_dict(s, preset) for s in schedules}
+
+            now = datetime.now()
+            heap = [(entry.next_fire_time(now), schedule_id) for schedule_id, entry in entries.items()]
+            heapq.heapify(heap)
+
+            with self.lock:
+                if self.generation == generation:
+                    self.entries = entries
+                    self.heap = heap
+                    self.needs_rebuild = False
+                    break
+        logger.info(f"Scheduler compiled {len(entries)} schedule(s) for the active preset.")
+
+    def _run(self):
+        """Sleep until the next fire time, fire due schedules and reschedule them."""
+        logger.info("Irrigation scheduler started.")
+        while self.running:
+            try:
+                if self.needs_rebuild:
+                    self._rebuild()
+
+                due = self._pop_due(datetime.now())
+                for entry in due:
+                    self._fire(entry)
+                if due:
+                    continue
+
+                with self.lock:
+                    timeout = None
+                    if self.heap:
+                        delay = (self.heap[0][0] - datetime.now()).total_seconds()
+                        timeout = max(0, min(delay, self.max_sleep))
+                if timeout is None or timeout > 0:
+                    self.wakeup.wait(timeout)
+                self.wakeup.clear()
+            except Exception as e:
+                logger.error(f"Error in scheduler loop: {e}")
+                self.wakeup.wait(5)
+                self.wakeup.clear()
+        logger.info("Irrigation scheduler stopped.")
+
+    def _pop_due(self, now):
+        """Pop every entry whose fire time has passed and push its next occurrence."""
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                fire_at, schedule_id = heapq.heappop(self.heap)
+                entry = self.entries.get(schedule_id)
+                if entry is None:
+                    # Removed schedule
+                    continue
+                heapq.heappush(self.heap, (entry.next_fire_time(now), schedule_id))
+                if (now - fire_at).total_seconds() <= self.grace_seconds:
+                    due.append(entry)
+                else:
+                    logger.warning(f"Skipping schedule {schedule_id}: missed its {fire_at} run by more than {self.grace_seconds}s.")
+        return due
+
+    def _fire(self, entry):
+        """Run the fire callback for a due entry inside an app context."""
+        logger.info(f"Scheduler: Triggering pump for preset '{entry.preset_name}' based on schedule {entry.schedule_id}.")
+        with self.app.app_context():
+            self.fire_callback(entry)
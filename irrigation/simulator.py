@@ -0,0 +1,411 @@
+"""
+What-if simulation of a preset against recorded sensor history.
+
+History is aggregated onto a regular time grid (in SQL for the database, with
+bincount for the CSV logs). Soil moisture is then modelled as a bucket:
+each step it dries at a constant rate, gains water from rain and from
+irrigation runs, and is capped at field capacity. The whole trajectory is
+computed with cumulative sums; the upper cap uses the closed form of a walk
+reflected at a barrier, s = C - max.accumulate(max(C - cap, 0)), so no Python
+loop runs per time step. Sensor rules are replayed one firing at a time, each
+firing located with vectorized run-length arithmetic.
+"""
+
+import math
+import time
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from shared.database import db
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+DAYS_OF_WEEK = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+DEFAULT_MODEL = {
+    'step': 300,              # Seconds per simulation step
+    'drying_rate': None,      # Moisture lost per hour (%); estimated from history when None
+    'irrigation_rate': 2.0,   # Moisture gained per minute of watering (%)
+    'rain_gain': 1.0,         # Moisture gained per hour at a 100% rain reading (%)
+    'capacity': 100.0,        # Field capacity (%)
+    'threshold': 30.0,        # Moisture below which time is counted as dry (%)
+    'initial': None           # Starting moisture (%); first recorded value when None
+}
+
+def _wall_seconds(value):
+    """Convert a naive datetime to seconds since 1970-01-01 on the local wall clock."""
+    return int((value - EPOCH).total_seconds())
+
+def load_history(start, end, step, source='auto', config=None):
+    """Aggregate soil moisture and rain onto a regular grid.
+
+    Args:
+        start: Start of the range (datetime)
+        end: End of the range (datetime, exclusive)
+        step: Grid step in seconds
+        source: 'db', 'csv' or 'auto' (database, falling back to CSV logs)
+        config: App config used to locate the CSV logs
+
+    Returns:
+        tuple: (grid start times in wall seconds, mean moisture, mean rain,
+                number of source samples); buckets without samples are NaN
+    """
+    from weather.models import WeatherData
+
+    start_s = _wall_seconds(start)
+    n = max(0, math.ceil((_wall_seconds(end) - start_s) / step))
+    grid = start_s + step * np.arange(n, dtype=np.int64)
+    moisture = np.full(n, np.nan)
+    rain = np.full(n, np.nan)
+    count = 0
+
+    if source in ('db', 'auto'):
+        # SQLite's strftime('%s') reads the stored naive timestamps as wall-clock seconds
+        bucket = (func.cast(func.strftime('%s', WeatherData.timestamp), db.Integer) - start_s) // step
+        rows = db.session.query(
+            bucket, func.avg(WeatherData.soil_moisture), func.avg(WeatherData.rain), func.count()
+        ).filter(
+            WeatherData.timestamp >= start,
+            WeatherData.timestamp < end
+        ).group_by(bucket).all()
+        for index, moisture_avg, rain_avg, samples in rows:
+            if 0 <= index < n:
+                moisture[index] = np.nan if moisture_avg is None else moisture_avg
+                rain[index] = np.nan if rain_avg is None else rain_avg
+                count += samples
+
+    if source == 'csv' or (source == 'auto' and count == 0):
+        from reports.csv_store import get_csv_store
+        rows = list(get_csv_store(config or {}).query(start, end, ['soil_moisture', 'rain']))
+        if rows:
+            seconds = np.array([row[0] for row in rows], dtype='datetime64[s]').astype(np.int64)
+            index = (seconds - start_s) // step
+            values = np.array([row[1:] for row in rows], dtype=float)
+            moisture = _bucket_mean(index, values[:, 0], n)
+            rain = _bucket_mean(index, values[:, 1], n)
+            count = len(rows)
+
+    return grid, moisture, rain, count
+
+def _bucket_mean(index, values, n):
+    """Average values per bucket index, ignoring NaN; empty buckets are NaN."""
+    valid = ~np.isnan(values) & (index >= 0) & (index < n)
+    sums = np.bincount(index[valid], weights=values[valid], minlength=n)
+    counts = np.bincount(index[valid], minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+def estimate_drying_rate(moisture, rain, step, default=0.5):
+    """Estimate the drying rate (%/hour) as the median drop between dry-weather samples."""
+    drops = -np.diff(moisture)
+    dry = (drops > 0) & ~np.isnan(drops) & (np.nan_to_num(rain[1:], nan=0.0) < 5)
+    if dry.sum() < 10:
+        return default
+    return float(np.median(drops[dry])) * 3600 / step
+
+def schedule_runs(schedules, start, end):
+    """Expand weekly schedules into run start times and durations within [start, end).
+
+    Args:
+        schedules: Schedule dicts as served by the preset catalog
+
+    Returns:
+        tuple: (start times in wall seconds, durations in seconds), sorted by start
+    """
+    starts, durations = [], []
+    week = 7 * 86400
+    for schedule in schedules:
+        hour, minute = map(int, schedule['start_time'].split(':'))
+        days_ahead = (DAYS_OF_WEEK.index(schedule['day_of_week']) - start.weekday()) % 7
+        first = datetime.combine(start.date() + timedelta(days=days_ahead), datetime.min.time())
+        first = _wall_seconds(first.replace(hour=hour, minute=minute))
+        if first < _wall_seconds(start):
+            first += week
+        occurrences = np.arange(first, _wall_seconds(end), week, dtype=np.int64)
+        starts.append(occurrences)
+        durations.append(np.full(len(occurrences), schedule['duration_seconds'], dtype=np.int64))
+
+    if not starts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(starts)
+    durations = np.concatenate(durations)
+    order = np.argsort(starts, kind='stable')
+    return starts[order], durations[order]
+
+def _ramp_sum(points, edges):
+    """Evaluate sum(max(edge - point, 0)) over all points for every edge."""
+    points = np.sort(points)
+    prefix = np.concatenate(([0], np.cumsum(points)))
+    below = np.searchsorted(points, edges, side='right')
+    return below * edges - prefix[below]
+
+def watering_per_step(grid, step, starts, durations):
+    """Get the seconds of watering that fall inside each grid step."""
+    edges = np.append(grid, grid[-1] + step).astype(float) if len(grid) else np.zeros(1)
+    # Watered time up to t is sum(ramp(t - start) - ramp(t - end)) over all runs
+    watered = _ramp_sum(starts.astype(float), edges) - _ramp_sum((starts + durations).astype(float), edges)
+    return np.diff(watered)
+
+def step_deltas(rain, watering, model):
+    """Get the moisture change of each step before capping.
+
+    Args:
+        rain: Rain reading per step (%), NaN treated as dry
+        watering: Seconds of watering per step
+        model: Resolved model parameters
+    """
+    hours = model['step'] / 3600
+    return (
+        -model['drying_rate'] * hours
+        + model['rain_gain'] * np.nan_to_num(rain, nan=0.0) / 100 * hours
+        + model['irrigation_rate'] * watering / 60
+    )
+
+def moisture_trajectory(initial, deltas, capacity):
+    """Simulate soil moisture at the end of each step, starting from initial.
+
+    Moisture is clipped to [0, capacity] after every step
+    (x[t] = min(capacity, max(0, x[t-1] + d[t]))). Between two visits to
+    opposite bounds only one bound is active, so each such segment is
+    reflected at that bound in closed form; the walk switches to the other
+    bound at the first step that would cross it.
+    """
+    deltas = np.asarray(deltas, dtype=float)
+    moisture = np.empty(len(deltas))
+    position, level, at_floor = 0, float(initial), False
+    while position < len(deltas):
+        cumulative = level + np.cumsum(deltas[position:])
+        if at_floor:
+            # Dry soil: reflected at 0 until it would exceed field capacity
+            walk = cumulative - np.minimum.accumulate(np.minimum(cumulative, 0))
+            crossed = np.flatnonzero(walk > capacity)
+            bound = capacity
+        else:
+            # Water above field capacity drains away until the soil would dry out below 0
+            walk = cumulative - np.maximum.accumulate(np.maximum(cumulative - capacity, 0))
+            crossed = np.flatnonzero(walk < 0)
+            bound = 0.0
+        if not len(crossed):
+            moisture[position:] = walk
+            break
+        index = crossed[0]
+        moisture[position:position + index] = walk[:index]
+        moisture[position + index] = bound
+        position += index + 1
+        level, at_floor = bound, not at_floor
+    return moisture
+
+def _run_lengths(mask, carry=0):
+    """For each index, the number of consecutive True values ending there.
+
+    Args:
+        carry: Length of the True run that ended just before mask[0]
+    """
+    index = np.arange(len(mask))
+    last_false = np.maximum.accumulate(np.where(mask, -1, index))
+    lengths = index - last_false
+    lengths[last_false < 0] += carry
+    return lengths
+
+class _RuleReplay:
+    """State of one sensor rule while it is replayed over the simulated trajectory.
+
+    The trajectory is processed window by window; the state carried between
+    windows is how long each condition has held, the latch and the earliest
+    index allowed by min_interval.
+    """
+
+    def __init__(self, rule, step):
+        self.rule = rule
+        self.step = step
+        self.conditions = [rule.trigger] + rule.skip_conditions
+        self.carries = [0] * len(self.conditions)
+        self.latched = False
+        self.next_index = 0
+
+    def _series(self, condition, moisture, rain):
+        values = moisture if condition.sensor == 'soil_moisture' else rain
+        return values < condition.threshold if condition.below else values > condition.threshold
+
+    def first_fire(self, offset, moisture, rain):
+        """Find the first window index at which the rule fires, or None.
+
+        Args:
+            offset: Global index of the window's first step
+            moisture: Simulated moisture in the window
+            rain: Rain readings in the window (NaN replaced by 0)
+        """
+        eligible = None
+        for condition, carry in zip(self.conditions, self.carries):
+            mask = self._series(condition, moisture, rain)
+            held = mask & ((_run_lengths(mask, carry) - 1) * self.step >= condition.hold_seconds)
+            eligible = held if eligible is None else eligible & ~held
+
+        first = max(0, self.next_index - offset)
+        if self.latched:
+            # Latched until moisture recovers past the hysteresis margin; re-arming takes one sample
+            released = np.flatnonzero(moisture >= self.rule.trigger.threshold + self.rule.hysteresis)
+            if not len(released):
+                return None
+            first = max(first, int(released[0]) + 1)
+
+        candidates = np.flatnonzero(eligible[first:])
+        return first + int(candidates[0]) if len(candidates) else None
+
+    def advance(self, offset, moisture, rain, fired=None):
+        """Commit a window prefix to the rule state.
+
+        Args:
+            fired: Window index at which this rule fired (the prefix's last step)
+        """
+        for i, condition in enumerate(self.conditions):
+            self.carries[i] = int(_run_lengths(self._series(condition, moisture, rain), self.carries[i])[-1])
+        if self.latched and (moisture >= self.rule.trigger.threshold + self.rule.hysteresis).any():
+            self.latched = False
+        if fired is not None:
+            self.latched = True
+            self.next_index = offset + fired + max(1, math.ceil(self.rule.min_interval / self.step))
+
+def _run_watering(grid, step, index, duration):
+    """Get the watering seconds of a run starting at the end of step index.
+
+    Returns:
+        tuple: (first affected step, watering seconds of the affected steps)
+    """
+    run_start = grid[index] + step
+    first = index + 1
+    last = min(len(grid), first + math.ceil(duration / step) + 1)
+    lows = grid[first:last]
+    overlap = np.minimum(lows + step, run_start + duration) - np.maximum(lows, run_start)
+    return first, np.maximum(overlap, 0)
+
+def simulate(schedules, start, end, rules=None, model=None, flow_rate=1.0, source='auto',
+             config=None, points=0, window=256, max_rule_runs=10000):
+    """Replay a preset's schedules and sensor rules over recorded history.
+
+    Args:
+        schedules: Schedule dicts of the preset (from the preset catalog)
+        start: Start of the range (datetime)
+        end: End of the range (datetime, exclusive)
+        rules: Compiled Rule objects to replay alongside the schedules; their
+               conditions may only use 'soil_moisture' and 'rain'
+        model: Overrides for DEFAULT_MODEL
+        flow_rate: Zone flow rate in litres per minute
+        source: 'db', 'csv' or 'auto'
+        config: App config used to locate the CSV logs
+        points: When > 0, include a downsampled moisture series with this many points
+        window: Initial number of steps simulated at once while replaying rules
+        max_rule_runs: Safety limit on rule-triggered runs
+
+    Returns:
+        dict: Water used, runtime, time below threshold and run counts
+
+    Raises:
+        ValueError: If the range is empty, a parameter is invalid or there is no history
+    """
+    if end <= start:
+        raise ValueError("end must be after start")
+    params = dict(DEFAULT_MODEL)
+    params.update({key: value for key, value in (model or {}).items() if value is not None})
+    unknown = set(params) - set(DEFAULT_MODEL)
+    if unknown:
+        raise ValueError(f"Unknown model parameter(s): {', '.join(sorted(unknown))}")
+    step = params['step'] = int(params['step'])
+    if step <= 0:
+        raise ValueError("step must be positive")
+
+    started = time.perf_counter()
+    grid, observed, rain, source_count = load_history(start, end, step, source, config)
+    if source_count == 0:
+        raise ValueError("No recorded history in the requested range.")
+    loaded = time.perf_counter()
+
+    if params['drying_rate'] is None:
+        params['drying_rate'] = estimate_drying_rate(observed, rain, step)
+    if params['initial'] is None:
+        recorded = observed[~np.isnan(observed)]
+        params['initial'] = float(recorded[0]) if len(recorded) else params['capacity'] / 2
+
+    starts, durations = schedule_runs([s for s in schedules if s.get('is_active', True)], start, end)
+    scheduled_count = len(starts)
+    watering = watering_per_step(grid, step, starts, durations)
+    deltas = step_deltas(rain, watering, params)
+
+    replays = [_RuleReplay(rule, step) for rule in rules or []]
+    rule_count = 0
+    if not replays:
+        moisture = moisture_trajectory(params['initial'], deltas, params['capacity'])
+    else:
+        # Rules react to the simulated moisture, which their own runs change. Simulate a
+        # window ahead, commit it up to the earliest firing, add that run and continue.
+        moisture = np.empty(len(grid))
+        dry_rain = np.nan_to_num(rain, nan=0.0)
+        position, level, size = 0, params['initial'], window
+        irrigation_per_second = params['irrigation_rate'] / 60
+        while position < len(grid):
+            stop = min(len(grid), position + size)
+            trial = moisture_trajectory(level, deltas[position:stop], params['capacity'])
+            window_rain = dry_rain[position:stop]
+            fires = []
+            if rule_count < max_rule_runs:
+                for i, replay in enumerate(replays):
+                    index = replay.first_fire(position, trial, window_rain)
+                    if index is not None:
+                        fires.append((index, i))
+            if fires:
+                index, fired = min(fires)
+                stop = position + index + 1
+                trial = trial[:index + 1]
+                window_rain = window_rain[:index + 1]
+            for i, replay in enumerate(replays):
+                replay.advance(position, trial, window_rain, index if fires and i == fired else None)
+            moisture[position:stop] = trial
+            level = trial[-1]
+
+            if fires:
+                first, seconds = _run_watering(grid, step, stop - 1, replays[fired].rule.duration_seconds)
+                watering[first:first + len(seconds)] += seconds
+                deltas[first:first + len(seconds)] += seconds * irrigation_per_second
+                rule_count += 1
+                size = window
+            else:
+                # Nothing fired: look further ahead next time
+                size *= 2
+            position = stop
+
+    runtime = float(watering.sum())
+    recorded = ~np.isnan(observed)
+    result = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'steps': len(grid),
+        'source_count': source_count,
+        'model': params,
+        'runs': {'scheduled': scheduled_count, 'rules': rule_count},
+        'runtime_seconds': runtime,
+        'water_litres': runtime / 60 * flow_rate,
+        'time_below_threshold_seconds': int((moisture < params['threshold']).sum()) * step,
+        'observed_time_below_threshold_seconds': int((observed[recorded] < params['threshold']).sum()) * step,
+        'min_moisture': float(moisture.min()),
+        'final_moisture': float(moisture[-1]),
+        'elapsed_ms': {
+            'load': round((loaded - started) * 1000, 2),
+            'simulate': round((time.perf_counter() - loaded) * 1000, 2)
+        }
+    }
+
+    if points > 0:
+        from shared.downsample import downsample
+        from shared.serialization import build_columnar
+        indices = downsample(grid.astype(float), moisture, points, 'lttb')
+        rows = ((EPOCH + timedelta(seconds=int(grid[i])),
+                 float(moisture[i]),
+                 None if np.isnan(observed[i]) else float(observed[i])) for i in indices)
+        result['series'] = build_columnar(rows, ['simulated', 'observed'])
+    return result
@@ -0,0 +1,27 @@
+"""
+Socket.IO handlers for irrigation commands.
+"""
+
+import logging
+
+from shared.socketio import socketio
+from shared.workers import is_worker, forward
+from . import controllers
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+@socketio.on('pump_command')
+def handle_pump_command(data):
+    """Run a pump command; the returned dict is sent as the acknowledgement.
+
+    State changes are pushed to all clients as 'pump_status' events. A web
+    worker passes the command on to the primary, which drives the pumps.
+    """
+    try:
+        if is_worker():
+            return forward('POST', '/api/irrigation/pump/command', json=data).json()
+        return controllers.handle_pump_command(data)
+    except Exception as e:
+        logger.error(f"Error handling pump command {data}: {e}")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,324 @@
+"""
+Irrigation zones and the capacity-aware zone dispatcher.
+
+Each zone owns its own pump/relay and is linked to a soil-moisture channel.
+The dispatcher runs zones concurrently as long as the configured flow and
+concurrency budget allows, and queues further requests until capacity frees up.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+
+from shared.timers import timers
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class DummyPump:
+    """Stand-in pump used when the hardware pump cannot be initialized."""
+
+    def __init__(self, name="Water Pump"):
+        self.name = name
+
+    def start(self):
+        logger.warning(f"Running in dummy mode. {self.name} not started.")
+        return True
+
+    def stop(self):
+        logger.warning(f"Running in dummy mode. {self.name} not stopped.")
+        return True
+
+class Zone:
+    """A single irrigation zone with its own pump."""
+
+    def __init__(self, zone_id, name, pump, flow_rate=1.0, soil_moisture_channel=None, moisture_key='soil_moisture'):
+        """Initialize the zone.
+
+        Args:
+            zone_id: Unique zone identifier
+            name: Display name
+            pump: Pump instance controlling this zone's relay
+            flow_rate: Water flow in litres per minute while the pump runs
+            soil_moisture_channel: ADC channel of the zone's soil-moisture sensor
+            moisture_key: Key of the zone's soil moisture in the sensor readings
+        """
+        self.id = zone_id
+        self.name = name
+        self.pump = pump
+        self.flow_rate = flow_rate
+        self.soil_moisture_channel = soil_moisture_channel
+        self.moisture_key = moisture_key
+        self.running = False
+        self.start_time = None
+        self.planned_duration = None
+        self.run_id = 0
+        self.preset_id = None
+
+    @property
+    def timer_key(self):
+        """Key of this zone's auto-stop timer."""
+        return f"zone_auto_stop:{self.id}"
+
+    @property
+    def relay_state(self):
+        """Get the state of the zone's relay, or None without a hardware pump."""
+        relay = getattr(self.pump, 'relay', None)
+        return relay.get_state() if relay else None
+
+    def get_duration(self):
+        """Get how long the zone has been running, in seconds."""
+        if self.running and self.start_time:
+            return time.time() - self.start_time
+        return 0
+
+    def to_dict(self):
+        """Convert the zone state to a dictionary."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'running': self.running,
+            'duration': self.get_duration(),
+            'remaining': timers.remaining(self.timer_key),
+            'start_time': self.start_time,
+            'planned_duration': self.planned_duration,
+            'run_id': self.run_id,
+            'flow_rate': self.flow_rate,
+            'moisture_key': self.moisture_key,
+            'relay_state': self.relay_state
+        }
+
+class ZoneDispatcher:
+    """Runs irrigation zones concurrently within a flow/concurrency budget."""
+
+    def __init__(self, zones, max_flow=None, max_concurrent=None, on_run_finished=None, on_pump_event=None):
+        """Initialize the dispatcher.
+
+        Args:
+            zones: List of Zone instances; the first one is the default zone
+            max_flow: Total flow budget in litres per minute (None = unlimited)
+            max_concurrent: Maximum zones running at once (None = unlimited)
+            on_run_finished: Called with (zone, duration, preset_id) after a run stops
+            on_pump_event: Called with (action, zone, duration) on start/stop/queue;
+                           runs under the dispatcher lock, so it must not block
+        """
+        self.zones = {zone.id: zone for zone in zones}
+        self.default_zone_id = zones[0].id
+        self.max_flow = max_flow
+        self.max_concurrent = max_concurrent
+        self.on_run_finished = on_run_finished
+        self.on_pump_event = on_pump_event
+        self.queue = deque()
+        self.lock = threading.RLock()
+        self.app = None
+
+    def set_app(self, app):
+        """Set the Flask app used to run timer callbacks in an app context."""
+        self.app = app
+
+    def get_zone(self, zone_id=None):
+        """Get a zone by id, or the default zone when zone_id is None."""
+        return self.zones.get(zone_id or self.default_zone_id)
+
+    def _flow_in_use(self):
+        return sum(zone.flow_rate for zone in self.zones.values() if zone.running)
+
+    def _running_count(self):
+        return sum(1 for zone in self.zones.values() if zone.running)
+
+    def _has_capacity(self, zone):
+        """Check whether a zone fits in the remaining budget."""
+        running = self._running_count()
+        if running == 0:
+            # A zone larger than the whole budget may still run on its own
+            return True
+        if self.max_concurrent is not None and running >= self.max_concurrent:
+            return False
+        if self.max_flow is not None and self._flow_in_use() + zone.flow_rate > self.max_flow:
+            return False
+        return True
+
+    def request_run(self, zone_id=None, duration_seconds=None, preset_id=None):
+        """Start a zone now if capacity allows, otherwise queue it.
+
+        Returns:
+            dict: Status with 'success', 'queued' or 'warning'/'error'
+        """
+        with self.lock:
+            zone = self.get_zone(zone_id)
+            if not zone:
+                return {"status": "error", "message": f"Unknown zone: {zone_id}"}
+            if zone.running:
+                return {"status": "warning", "message": f"{zone.name} is already running."}
+            if any(request[0] == zone.id for request in self.queue):
+                return {"status": "warning", "message": f"{zone.name} is already queued."}
+
+            if not self._has_capacity(zone):
+                self.queue.append((zone.id, duration_seconds, preset_id))
+                self._emit('queued', zone)
+                logger.info(f"Queued {zone.name}: capacity in use ({len(self.queue)} waiting).")
+                return {"status": "queued", "message": f"{zone.name} queued until capacity is available.",
+                        "zone": zone.id, "position": len(self.queue)}
+
+            return self._start_zone(zone, duration_seconds, preset_id)
+
+    def _start_zone(self, zone, duration_seconds, preset_id):
+        """Switch a zone on and arm its auto-stop timer. Caller holds the lock."""
+        logger.info(f"Starting {zone.name}.")
+        zone.pump.start()
+        zone.running = True
+        zone.start_time = time.time()
+        zone.planned_duration = duration_seconds
+        zone.run_id += 1
+        zone.preset_id = preset_id
+
+        if duration_seconds:
+            timers.call_later(zone.timer_key, duration_seconds, self._auto_stop, zone.id, zone.run_id)
+        self._emit('start', zone)
+
+        return {
+            "status": "success",
+            "message": f"{zone.name} started for {duration_seconds}s." if duration_seconds else f"{zone.name} started.",
+            "zone": zone.id,
+            "run_id": zone.run_id
+        }
+
+    def stop(self, zone_id=None, run_id=None):
+        """Stop a zone, then start queued zones that now fit.
+
+        Args:
+            zone_id: Zone to stop (default zone when None)
+            run_id: When given, only stop if this is still the zone's current run
+        """
+        with self.lock:
+            zone = self.get_zone(zone_id)
+            if not zone:
+                return {"status": "error", "message": f"Unknown zone: {zone_id}"}
+            if not zone.running:
+                # A queued request can be withdrawn with a stop
+                for request in list(self.queue):
+                    if request[0] == zone.id:
+                        self.queue.remove(request)
+                        self._emit('dequeued', zone)
+                        return {"status": "success", "message": f"{zone.name} removed from queue.", "zone": zone.id}
+                return {"status": "warning", "message": f"{zone.name} is not running."}
+            if run_id is not None and run_id != zone.run_id:
+                logger.info(f"Ignoring stale auto-stop for {zone.name} run {run_id}.")
+                return {"status": "warning", "message": "Stale stop request ignored."}
+
+            timers.cancel(zone.timer_key)
+            duration = zone.get_duration()
+            logger.info(f"Stopping {zone.name} after {duration:.2f} seconds.")
+            zone.pump.stop()
+            zone.running = False
+            zone.start_time = None
+            zone.planned_duration = None
+            preset_id = zone.preset_id
+            zone.preset_id = None
+            self._emit('stop', zone, duration)
+
+            self._drain_queue()
+
+        if self.on_run_finished:
+            self.on_run_finished(zone, duration, preset_id)
+        return {"status": "success", "message": f"{zone.name} stopped.", "duration": duration, "zone": zone.id}
+
+    def _emit(self, action, zone, duration=None):
+        """Report a pump event to the on_pump_event callback."""
+        if self.on_pump_event:
+            try:
+                self.on_pump_event(action, zone, duration)
+            except Exception as e:
+                logger.error(f"Error reporting {action} of {zone.name}: {e}")
+
+    def stop_all(self):
+        """Stop every running zone and clear the queue."""
+        with self.lock:
+            self.queue.clear()
+            running = [zone.id for zone in self.zones.values() if zone.running]
+        return [self.stop(zone_id) for zone_id in running]
+
+    def _drain_queue(self):
+        """Start queued requests, in order, that fit the freed capacity. Caller holds the lock."""
+        for request in list(self.queue):
+            zone = self.zones[request[0]]
+            if zone.running:
+                self.queue.remove(request)
+            elif self._has_capacity(zone):
+                self.queue.remove(request)
+                self._start_zone(zone, request[1], request[2])
+
+    def _auto_stop(self, zone_id, run_id):
+        """Timer callback that ends a timed run."""
+        if self.app:
+            with self.app.app_context():
+                self.stop(zone_id, run_id=run_id)
+        else:
+            self.stop(zone_id, run_id=run_id)
+
+    def status(self):
+        """Get the state of every zone and the queue."""
+        with self.lock:
+            return {
+                'zones': [zone.to_dict() for zone in self.zones.values()],
+                'queue': [{'zone': zone_id, 'duration': duration, 'preset_id': preset_id}
+                          for zone_id, duration, preset_id in self.queue],
+                'flow_in_use': self._flow_in_use(),
+                'max_flow': self.max_flow,
+                'max_concurrent': self.max_concurrent
+            }
+
+def _zone_configs(config):
+    """Get the default soil-moisture channel and the zone configurations.
+
+    Uses hardware.zones when present, otherwise a single default zone on the
+    configured relay pin and soil-moisture channel.
+    """
+    pins = config.get('hardware.sensors.pins', {})
+    default_channel = pins.get('soil_moisture', {}).get('channel', 0)
+    zone_configs = config.get('hardware.zones') or [{
+        'id': 'main',
+        'name': 'Main',
+        'relay_pin': pins.get('relay', 21),
+        'soil_moisture_channel': default_channel
+    }]
+    return default_channel, zone_configs
+
+def zone_moisture_sensors(config):
+    """List (zone id, ADC channel, reading key) of the zones with their own soil-moisture channel."""
+    default_channel, zone_configs = _zone_configs(config)
+    sensors = []
+    for zone_config in zone_configs:
+        channel = zone_config.get('soil_moisture_channel', default_channel)
+        if channel != default_channel:
+            sensors.append((str(zone_config['id']), channel, f"soil_moisture_{zone_config['id']}"))
+    return sensors
+
+def build_zones(config, simulate=False):
+    """Create zones from the hardware configuration.
+
+    Args:
+        config: The configuration
+        simulate: Use simulated pumps without touching the relays (e.g. in a web worker)
+    """
+    default_channel, zone_configs = _zone_configs(config)
+
+    zones = []
+    for zone_config in zone_configs:
+        zone_id = str(zone_config['id'])
+        name = zone_config.get('name', zone_id)
+        if simulate:
+            pump = DummyPump(f"{name} Pump")
+        else:
+            try:
+                from hardware.pump import Pump
+                pump = Pump(relay_pin=zone_config['relay_pin'], name=f"{name} Pump")
+            except Exception as e:
+                logger.error(f"Could not initialize pump for zone {zone_id}: {e}. Running in simulated mode.")
+                pump = DummyPump(f"{name} Pump")
+
+        channel = zone_config.get('soil_moisture_channel', default_channel)
+        moisture_key = 'soil_moisture' if channel == default_channel else f"soil_moisture_{zone_id}"
+        zones.append(Zone(zone_id, name, pump, zone_config.get('flow_rate', 1.0), channel, moisture_key))
+    return zones
@@ -0,0 +1,280 @@
+"""
+Bulk backfill of the daily sensor CSV logs into the weather_data table.
+
+Usage:
+    python -m reports.backfill [--data-folder ~/sensor_data] [--db instance/app.db]
+
+Files are streamed line by line and inserted with executemany in large
+transactions while SQLite durability pragmas are relaxed. Rows whose
+timestamp already exists are skipped, and progress is checkpointed per file
+so an interrupted run resumes where it stopped.
+
+The running app stores its own samples (the database sink) independently of
+the CSV log, so the two have different timestamps for the same interval. A
+CSV row within `window` seconds (half the CSV log interval by default) of a
+row that was already stored is skipped as covered, so backfilling a period
+the app already recorded does not double its rows.
+
+The days that received rows are recorded next to the database (see
+shared.history), so the running app drops its cached ET0 for them.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import bisect
+import argparse
+from datetime import datetime
+
+from shared.history import HISTORY_CHANGES_FILE, mark_days_changed
+from .csv_store import parse_csv_line
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'instance', 'app.db')
+LOGGING_CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'logging.json')
+
+# SQLAlchemy's storage format for DateTime columns on SQLite
+SQLITE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS weather_data (
+    id INTEGER NOT NULL PRIMARY KEY,
+    temperature FLOAT NOT NULL,
+    humidity FLOAT NOT NULL,
+    soil_moisture FLOAT,
+    pressure FLOAT,
+    light FLOAT,
+    rain FLOAT,
+    timestamp DATETIME
+)
+"""
+CREATE_INDEX_SQL = "CREATE INDEX IF NOT EXISTS ix_weather_data_timestamp ON weather_data (timestamp)"
+INSERT_SQL = """
+INSERT INTO weather_data (timestamp, temperature, humidity, soil_moisture, pressure, light, rain)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _logging_config():
+    try:
+        with open(LOGGING_CONFIG_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def default_data_folder():
+    """Get the CSV data folder from config/logging.json."""
+    return _logging_config().get('data_folder', '~/sensor_data')
+
+def default_window():
+    """Get the coverage window: half the CSV log interval from config/logging.json."""
+    return _logging_config().get('log_interval', 60) / 2
+
+class CSVBackfill:
+    """Loads daily sensor CSV files into the weather_data table."""
+
+    def __init__(self, db_path, data_folder, batch_size=50000, window=30):
+        """Initialize the backfill.
+
+        Args:
+            db_path: Path to the SQLite database file
+            data_folder: Folder containing the YYYY-MM-DD.csv files
+            batch_size: Rows per executemany call and transaction
+            window: Seconds around an already stored row in which CSV rows are skipped as covered
+        """
+        self.db_path = db_path
+        self.data_folder = os.path.expanduser(data_folder)
+        self.batch_size = batch_size
+        self.window = window
+        self.state_path = os.path.join(self.data_folder, '.index', 'backfill.json')
+        self.state = self._load_state()
+
+    def _load_state(self):
+        """Load the per-file resume offsets."""
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        """Persist the per-file resume offsets atomically."""
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def csv_files(self):
+        """List the daily CSV files in chronological order."""
+        names = []
+        for name in os.listdir(self.data_folder):
+            if not name.endswith('.csv'):
+                continue
+            try:
+                datetime.strptime(name[:-4], '%Y-%m-%d')
+            except ValueError:
+                continue
+            names.append(name)
+        return [os.path.join(self.data_folder, name) for name in sorted(names)]
+
+    def run(self, reset=False):
+        """Backfill every CSV file and return the totals.
+
+        Args:
+            reset: Ignore saved offsets and rescan all files (duplicates are still skipped)
+        """
+        if reset:
+            self.state = {}
+
+        changed_days = []
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        totals = {'files': 0, 'inserted': 0, 'duplicates': 0, 'covered': 0, 'skipped': 0}
+        started = time.time()
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+        try:
+            # Relax durability for the bulk load; a crash only loses the current batch
+            conn.execute("PRAGMA journal_mode=MEMORY")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")
+
+            conn.execute(CREATE_TABLE_SQL)
+            conn.execute(CREATE_INDEX_SQL)
+
+            for path in self.csv_files():
+                counts = self.load_file(conn, path)
+                if counts['inserted']:
+                    changed_days.append(datetime.strptime(os.path.basename(path)[:-4], '%Y-%m-%d').date())
+                totals['files'] += 1
+                for key in ('inserted', 'duplicates', 'covered', 'skipped'):
+                    totals[key] += counts[key]
+        finally:
+            conn.execute(f"PRAGMA synchronous={synchronous}")
+            conn.execute(f"PRAGMA journal_mode={journal_mode}")
+            conn.close()
+            if changed_days:
+                # Tell the running app which days' cached results are stale
+                mark_days_changed(os.path.join(os.path.dirname(os.path.abspath(self.db_path)), HISTORY_CHANGES_FILE),
+                                  changed_days)
+
+        totals['seconds'] = time.time() - started
+        return totals
+
+    def load_file(self, conn, path):
+        """Stream one CSV file into the database from its saved offset."""
+        name = os.path.basename(path)
+        size = os.path.getsize(path)
+        offset = self.state.get(name, 0)
+        counts = {'inserted': 0, 'duplicates': 0, 'covered': 0, 'skipped': 0}
+
+        if offset > size:
+            # The file was replaced; scan it again and rely on deduplication
+            offset = 0
+        if offset == size:
+            return counts
+
+        day = datetime.strptime(name[:-4], '%Y-%m-%d')
+        existing = self._existing_timestamps(conn, day)
+        # Rows stored before this run, e.g. by the app's database sink
+        stored = sorted(datetime.fromisoformat(key) for key in existing)
+        started = time.time()
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            batch = []
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    # Partial line still being written
+                    break
+                offset += len(raw)
+
+                parsed = parse_csv_line(raw.decode('utf-8', errors='replace'))
+                if not parsed:
+                    continue
+                timestamp, values = parsed
+                if values[0] is None or values[1] is None:
+                    # temperature and humidity are required columns
+                    counts['skipped'] += 1
+                    continue
+
+                key = timestamp.strftime(SQLITE_DATETIME_FORMAT)
+                if key in existing:
+                    counts['duplicates'] += 1
+                    continue
+                if self._covered(stored, timestamp):
+                    counts['covered'] += 1
+                    continue
+                existing.add(key)
+                batch.append((key, *values))
+
+                if len(batch) >= self.batch_size:
+                    self._write_batch(conn, batch, name, offset)
+                    counts['inserted'] += len(batch)
+                    batch = []
+
+            self._write_batch(conn, batch, name, offset)
+            counts['inserted'] += len(batch)
+
+        elapsed = max(time.time() - started, 1e-6)
+        print(f"{name}: {counts['inserted']} inserted, {counts['duplicates']} duplicates, "
+              f"{counts['covered']} covered, {counts['skipped']} skipped ({counts['inserted'] / elapsed:,.0f} rows/s)")
+        return counts
+
+    def _existing_timestamps(self, conn, day):
+        """Get the timestamps already stored for one day."""
+        start = day.strftime('%Y-%m-%d')
+        rows = conn.execute(
+            "SELECT timestamp FROM weather_data WHERE timestamp >= ? AND timestamp < ?",
+            (start, start + '~')
+        )
+        return {row[0] for row in rows}
+
+    def _covered(self, stored, timestamp):
+        """Check whether a stored row lies within the window around timestamp."""
+        index = bisect.bisect_left(stored, timestamp)
+        neighbours = stored[max(index - 1, 0):index + 1]
+        return any(abs((other - timestamp).total_seconds()) < self.window for other in neighbours)
+
+    def _write_batch(self, conn, batch, name, offset):
+        """Insert a batch in one transaction and checkpoint the file offset."""
+        conn.execute("BEGIN")
+        try:
+            if batch:
+                conn.executemany(INSERT_SQL, batch)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.state[name] = offset
+        self._save_state()
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Backfill daily sensor CSV logs into the weather_data table.")
+    parser.add_argument('--data-folder', default=default_data_folder(), help="Folder with YYYY-MM-DD.csv files")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Path to the SQLite database")
+    parser.add_argument('--batch-size', type=int, default=50000, help="Rows per transaction")
+    parser.add_argument('--reset', action='store_true', help="Ignore saved progress and rescan all files")
+    parser.add_argument('--window', type=float, default=default_window(),
+                        help="Skip CSV rows within this many seconds of an already stored row (default: half the log interval)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    backfill = CSVBackfill(args.db, args.data_folder, args.batch_size, args.window)
+    if not os.path.isdir(backfill.data_folder):
+        print(f"Error: data folder {backfill.data_folder} not found.")
+        return 1
+
+    totals = backfill.run(reset=args.reset)
+    rate = totals['inserted'] / max(totals['seconds'], 1e-6)
+    print(f"\nBackfilled {totals['inserted']} rows from {totals['files']} file(s) in "
+          f"{totals['seconds']:.2f}s ({rate:,.0f} rows/s); "
+          f"{totals['duplicates']} duplicates, {totals['covered']} rows covered by stored samples "
+          f"and {totals['skipped']} incomplete rows skipped.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,40 @@
 from datetime import datetime, timedelta
-from flask import jsonify
+from flask import jsonify, current_app
 from shared.database import db
 from irrigation.models import IrrigationLog
 from weather.models import WeatherData
+from shared.serialization import build_columnar
+from .csv_store import get_csv_store, CSV_FIELDS
 
-def generate_report(report_type, start_date, end_date, options):
-    """Generate a report based on the specified parameters."""
+# Report options that map onto real columns, used by the columnar format
+WEATHER_COLUMNS = {
+    'temperature': WeatherData.temperature,
+    'humidity': WeatherData.humidity,
+    'soil_moisture': WeatherData.soil_moisture,
+    'pressure': WeatherData.pressure,
+    'light': WeatherData.light,
+    'rain': WeatherData.rain
+}
+
+IRRIGATION_COLUMNS = {
+    'pump_status': IrrigationLog.pump_status,
+    'duration': IrrigationLog.duration
+}
+
+REPORT_SOURCES = ('db', 'csv', 'auto')
+
+def generate_report(report_type, start_date, end_date, options, response_format='rows', source='auto'):
+    """Generate a report based on the specified parameters.
+    
+    Args:
+        report_type: 'weather' or 'irrigation'
+        start_date: Start date string (YYYY-MM-DD)
+        end_date: End date string (YYYY-MM-DD), inclusive
+        options: Dict of field name -> bool selecting the fields to include
+        response_format: 'rows' (list of dicts) or 'columnar' (parallel arrays)
+        source: Weather data source: 'db', 'csv' (daily sensor CSV logs) or
+                'auto' (database, falling back to CSV logs when it has no rows)
+    """
     
     # Convert string dates to datetime objects
     try:
@@ -16,17 +45,26 @@ def generate_report(report_type, start_date, end_date, options):
     except ValueError:
         return {"status": "error", "message": "Invalid date format. Use YYYY-MM-DD."}
     
+    if source not in REPORT_SOURCES:
+        return {"status": "error", "message": f"Invalid source. Use one of {', '.join(REPORT_SOURCES)}."}
+    
+    if response_format == 'columnar':
+        return generate_columnar_report(report_type, start_date, end_date, options, source)
+    
     # Generate the appropriate report
     if report_type == 'weather':
-        return generate_weather_report(start_date, end_date, options)
+        return generate_weather_report(start_date, end_date, options, source)
     elif report_type == 'irrigation':
         return generate_irrigation_report(start_date, end_date, options)
     else:
         return {"status": "error", "message": "Invalid report type."}
 
-def generate_weather_report(start_date, end_date, options):
+def generate_weather_report(start_date, end_date, options, source='auto'):
     """Generate a weather report."""
     
+    if source == 'csv':
+        return generate_csv_weather_report(start_date, end_date, options)
+    
     # Build the query
     query = db.session.query(WeatherData).filter(
         WeatherData.timestamp >= start_date,
@@ -36,8 +74,10 @@ def generate_weather_report(start_date, end_date, options):
     # Execute the query
     data = query.all()
     
-    # If no data, return empty list
+    # If no data, fall back to the CSV logs or return an empty list
     if not data:
+        if source == 'auto':
+            return generate_csv_weather_report(start_date, end_date, options)
         return []
     
     # Convert to list of dictionaries with only the selected options
@@ -67,6 +107,21 @@ def generate_weather_report(start_date, end_date, options):
     
     return result
 
+def generate_csv_weather_report(start_date, end_date, options):
+    """Generate a weather report from the daily sensor CSV logs."""
+    fields = [name for name in CSV_FIELDS if options.get(name, False)]
+    store = get_csv_store(current_app.config)
+    
+    result = []
+    for row in store.query(start_date, end_date, fields):
+        entry = {'timestamp': row[0].isoformat()}
+        entry.update(zip(fields, row[1:]))
+        result.append(entry)
+    
+    # Match the database report, which lists the newest entries first
+    result.reverse()
+    return result
+
 def generate_irrigation_report(start_date, end_date, options):
     """Generate an irrigation report."""
     
@@ -102,4 +157,36 @@ def generate_irrigation_report(start_date, end_date, options):
         
         result.append(entry)
     
-    return result
\ No newline at end of file
+    return result
+
+def generate_columnar_report(report_type, start_date, end_date, options, source='auto'):
+    """Generate a report as parallel arrays sorted by ascending timestamp.
+    
+    Only the selected columns are fetched, and rows are never materialized
+    as ORM objects or per-row dicts.
+    """
+    if report_type == 'weather':
+        model, column_map = WeatherData, WEATHER_COLUMNS
+    elif report_type == 'irrigation':
+        model, column_map = IrrigationLog, IRRIGATION_COLUMNS
+    else:
+        return {"status": "error", "message": "Invalid report type."}
+    
+    fields = [name for name in column_map if options.get(name, False)]
+    
+    if report_type == 'weather' and source == 'csv':
+        store = get_csv_store(current_app.config)
+        return build_columnar(store.query(start_date, end_date, fields), fields)
+    
+    query = db.session.query(
+        model.timestamp, *[column_map[name] for name in fields]
+    ).filter(
+        model.timestamp >= start_date,
+        model.timestamp < end_date
+    ).order_by(model.timestamp.asc())
+    
+    result = build_columnar(query.yield_per(1000), fields)
+    if report_type == 'weather' and source == 'auto' and not result['count']:
+        store = get_csv_store(current_app.config)
+        return build_columnar(store.query(start_date, end_date, fields), fields)
+    return result
@@ -0,0 +1,187 @@
+"""
+Query engine over the daily sensor CSV logs.
+
+The sensor controller writes one CSV file per day (YYYY-MM-DD.csv). This
+module answers time-range queries directly from those files. Each file gets a
+sparse index of timestamp -> byte offset, persisted next to the data, so a
+query seeks straight to the right block and parses only the lines it needs.
+Indexes are extended incrementally as the current day's file grows.
+"""
+
+import os
+import json
+import bisect
+import logging
+import threading
+from datetime import datetime, timedelta
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Column order of the CSV files written by SensorController
+CSV_FIELDS = ('temperature', 'humidity', 'soil_moisture', 'pressure', 'light', 'rain')
+
+INDEX_VERSION = 1
+
+def parse_csv_line(line):
+    """Parse one CSV data line into (timestamp, values tuple).
+
+    Returns:
+        tuple: (datetime, tuple of floats or None), or None for unparsable lines
+    """
+    parts = line.rstrip('\r\n').split(',')
+    if len(parts) < len(CSV_FIELDS) + 1:
+        return None
+    try:
+        timestamp = datetime.fromisoformat(parts[0])
+    except ValueError:
+        return None
+    values = tuple(float(value) if value else None for value in parts[1:len(CSV_FIELDS) + 1])
+    return timestamp, values
+
+class CSVHistoryStore:
+    """Time-range queries over daily sensor CSV files using sparse offset indexes."""
+
+    def __init__(self, data_folder, stride=256):
+        """Initialize the store.
+
+        Args:
+            data_folder: Folder containing the YYYY-MM-DD.csv files
+            stride: Number of data lines between two index entries
+        """
+        self.data_folder = os.path.expanduser(data_folder)
+        self.index_folder = os.path.join(self.data_folder, '.index')
+        self.stride = stride
+        self.indexes = {}
+        self.index_lock = threading.Lock()
+
+    def files_for_range(self, start, end):
+        """List existing CSV files whose day overlaps [start, end)."""
+        paths = []
+        day = datetime(start.year, start.month, start.day)
+        while day < end:
+            path = os.path.join(self.data_folder, f"{day.strftime('%Y-%m-%d')}.csv")
+            if os.path.isfile(path):
+                paths.append(path)
+            day += timedelta(days=1)
+        return paths
+
+    def get_index(self, path):
+        """Get the sparse index for a file, building or extending it as needed."""
+        with self.index_lock:
+            index = self.indexes.get(path) or self._load_index(path)
+            size = os.path.getsize(path)
+
+            if index is None or size < index['indexed_to']:
+                # New file, or the file was truncated/replaced: index from scratch
+                index = {'version': INDEX_VERSION, 'indexed_to': 0, 'lines': 0, 'entries': []}
+
+            if size > index['indexed_to']:
+                self._extend_index(path, index)
+                self._save_index(path, index)
+
+            self.indexes[path] = index
+            return index
+
+    def _extend_index(self, path, index):
+        """Index complete lines appended since the last indexing pass."""
+        with open(path, 'rb') as f:
+            f.seek(index['indexed_to'])
+            offset = index['indexed_to']
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    # Partial line still being written; pick it up next time
+                    break
+                if offset > 0 or not raw.startswith(b'Timestamp'):
+                    if index['lines'] % self.stride == 0:
+                        parsed = parse_csv_line(raw.decode('utf-8', errors='replace'))
+                        if parsed:
+                            index['entries'].append([parsed[0].timestamp(), offset])
+                    index['lines'] += 1
+                offset += len(raw)
+            index['indexed_to'] = offset
+
+    def _index_path(self, path):
+        """Get the sidecar index path for a CSV file."""
+        return os.path.join(self.index_folder, os.path.basename(path) + '.idx.json')
+
+    def _load_index(self, path):
+        """Load a persisted index, or None if missing or unusable."""
+        try:
+            with open(self._index_path(path), 'r') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                return index
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _save_index(self, path, index):
+        """Persist an index atomically next to the data."""
+        try:
+            os.makedirs(self.index_folder, exist_ok=True)
+            index_path = self._index_path(path)
+            tmp_path = index_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            logger.error(f"Could not persist CSV index for {path}: {e}")
+
+    def _read_file_range(self, path, start, end):
+        """Yield parsed rows from one file within [start, end)."""
+        index = self.get_index(path)
+        entries = index['entries']
+
+        # Seek to the last indexed line at or before the start of the range
+        offset = 0
+        if entries:
+            position = bisect.bisect_right([entry[0] for entry in entries], start.timestamp()) - 1
+            if position >= 0:
+                offset = entries[position][1]
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break
+                parsed = parse_csv_line(raw.decode('utf-8', errors='replace'))
+                if not parsed:
+                    continue
+                timestamp, values = parsed
+                if timestamp < start:
+                    continue
+                if timestamp >= end:
+                    break
+                yield timestamp, values
+
+    def query(self, start, end, fields=CSV_FIELDS):
+        """Yield rows shaped (timestamp, *values) in ascending time order.
+
+        Args:
+            start: Start of the range (datetime, inclusive)
+            end: End of the range (datetime, exclusive)
+            fields: Field names to return, in order
+
+        Raises:
+            ValueError: If a field is not recorded in the CSV files
+        """
+        positions = []
+        for field in fields:
+            if field not in CSV_FIELDS:
+                raise ValueError(f"Field {field} is not recorded in CSV logs.")
+            positions.append(CSV_FIELDS.index(field))
+
+        for path in self.files_for_range(start, end):
+            for timestamp, values in self._read_file_range(path, start, end):
+                yield (timestamp, *[values[position] for position in positions])
+
+_stores = {}
+
+def get_csv_store(config):
+    """Get the shared store for the data folder configured in config['logging']."""
+    logging_config = config.get('logging', {})
+    data_folder = logging_config.get('data_folder', '~/sensor_data')
+    if data_folder not in _stores:
+        _stores[data_folder] = CSVHistoryStore(data_folder)
+    return _stores[data_folder]
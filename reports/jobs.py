@@ -0,0 +1,191 @@
+"""
+Background report jobs.
+
+Reports are generated outside the HTTP request: the date range is split into
+daily chunks, each chunk runs in eventlet's native thread pool so SQLite work
+never blocks the hub, and progress is pushed to clients over Socket.IO.
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from eventlet import tpool
+
+from shared.socketio import socketio
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+REPORT_TYPES = ('weather', 'irrigation')
+
+class ReportJobManager:
+    """Runs report generation jobs in the background with a concurrency limit."""
+
+    def __init__(self, max_workers=None, result_ttl=600):
+        """Initialize the job manager.
+
+        Args:
+            max_workers: Maximum number of reports generated at the same time
+            result_ttl: Seconds a finished job and its result are kept
+        """
+        if max_workers is None:
+            max_workers = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        self.worker_slots = threading.BoundedSemaphore(max_workers)
+
+    def submit(self, app, report_type, start_date, end_date, options, response_format='rows', source='auto'):
+        """Queue a report for background generation.
+
+        Returns:
+            dict: The public job status, or an error status for invalid input
+        """
+        if report_type not in REPORT_TYPES:
+            return {"status": "error", "message": "Invalid report type."}
+        try:
+            days = _split_days(start_date, end_date)
+        except ValueError:
+            return {"status": "error", "message": "Invalid date format. Use YYYY-MM-DD."}
+
+        self._evict_expired()
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'type': report_type,
+            'format': response_format,
+            'source': source,
+            'status': 'queued',
+            'progress': 0,
+            'total_chunks': len(days),
+            'completed_chunks': 0,
+            'created_at': time.time(),
+            'finished_at': None,
+            'error': None,
+            'result': None
+        }
+        with self.jobs_lock:
+            self.jobs[job['id']] = job
+
+        socketio.start_background_task(
+            self._run_job, app, job, days, options
+        )
+        logger.info(f"Queued {report_type} report job {job['id']} covering {len(days)} day(s)")
+        return self.describe(job)
+
+    def get(self, job_id):
+        """Get a job by id, or None if it is unknown or expired."""
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def describe(self, job):
+        """Get the public status of a job, without its result."""
+        return {key: value for key, value in job.items() if key != 'result'}
+
+    def _run_job(self, app, job, days, options):
+        """Generate a report chunk by chunk and publish progress."""
+        from .controllers import generate_report
+
+        with self.worker_slots:
+            job['status'] = 'running'
+            self._emit('report_progress', job)
+
+            parts = []
+            try:
+                for day in days:
+                    # Run the query and row building in a native thread
+                    part = tpool.execute(
+                        _generate_in_context, app, generate_report,
+                        job['type'], day, options, job['format'], job['source']
+                    )
+                    if isinstance(part, dict) and part.get('status') == 'error':
+                        raise ValueError(part.get('message'))
+                    parts.append(part)
+
+                    job['completed_chunks'] += 1
+                    job['progress'] = int(job['completed_chunks'] * 100 / job['total_chunks'])
+                    self._emit('report_progress', job)
+
+                job['result'] = _merge_parts(parts, job['format'])
+                job['status'] = 'completed'
+                logger.info(f"Report job {job['id']} completed")
+            except Exception as e:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+                logger.error(f"Report job {job['id']} failed: {e}")
+            finally:
+                job['finished_at'] = time.time()
+
+        self._emit('report_complete', job)
+
+    def _emit(self, event, job):
+        """Emit a job event to all connected clients."""
+        try:
+            socketio.emit(event, self.describe(job))
+        except Exception as e:
+            logger.error(f"Failed to emit {event} for job {job['id']}: {e}")
+
+    def _evict_expired(self):
+        """Drop finished jobs older than the result TTL."""
+        cutoff = time.time() - self.result_ttl
+        with self.jobs_lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job['finished_at'] and job['finished_at'] < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+def _split_days(start_date, end_date):
+    """Split an inclusive YYYY-MM-DD range into a list of day strings."""
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    days = []
+    current = start
+    while current <= end:
+        days.append(current.strftime('%Y-%m-%d'))
+        current += timedelta(days=1)
+    return days
+
+def _generate_in_context(app, generate_report, report_type, day, options, response_format, source):
+    """Generate one day of a report inside its own app context."""
+    with app.app_context():
+        return generate_report(report_type, day, day, options, response_format, source)
+
+def _merge_parts(parts, response_format):
+    """Merge per-day report chunks into a single report."""
+    if response_format != 'columnar':
+        # Row reports are newest first, so the latest day comes first
+        merged = []
+        for part in reversed(parts):
+            merged.extend(part)
+        return merged
+
+    fields = parts[0]['fields'] if parts else []
+    merged = {
+        'format': 'columnar',
+        'count': sum(part['count'] for part in parts),
+        'fields': fields,
+        'timestamp': [],
+        'columns': {field: [] for field in fields},
+        'nulls': {}
+    }
+    for part in parts:
+        merged['timestamp'].extend(part['timestamp'])
+        for field in fields:
+            merged['columns'][field].extend(part['columns'][field])
+
+    # A field needs a mask if any chunk had missing values for it
+    for field in fields:
+        if any(field in part['nulls'] for part in parts):
+            mask = []
+            for part in parts:
+                mask.extend(part['nulls'].get(field, [0] * part['count']))
+            merged['nulls'][field] = mask
+    return merged
+
+# Shared job manager instance
+report_jobs = ReportJobManager()
@@ -1,12 +1,14 @@
-from flask import Blueprint, jsonify, request, current_app, send_file
+from flask import Blueprint, jsonify, request, current_app, send_file, Response
 from datetime import datetime
 import os
 import csv
 import tempfile
+from shared.workers import worker_local
 
 reports_bp = Blueprint('reports', __name__)
 
 @reports_bp.route('/api/reports/generate', methods=['POST'])
+@worker_local
 def generate_report_route():
     """Generate a report based on the specified parameters."""
     from .controllers import generate_report
@@ -16,11 +18,80 @@ def generate_report_route():
     start_date = data.get('start_date')
     end_date = data.get('end_date')
     options = data.get('options', {})
+    response_format = data.get('format', 'rows')
+    source = data.get('source', 'auto')
+    
+    result = generate_report(report_type, start_date, end_date, options, response_format, source)
+    
+    # Columnar responses can be encoded with a faster JSON encoder or msgpack
+    if isinstance(result, dict) and result.get('format') == 'columnar':
+        from shared.serialization import encode_payload
+        try:
+            body, mimetype = encode_payload(result, data.get('encoding', 'json'))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        return Response(body, mimetype=mimetype)
     
-    result = generate_report(report_type, start_date, end_date, options)
     return jsonify(result)
 
+@reports_bp.route('/api/reports/jobs', methods=['POST'])
+def submit_report_job_route():
+    """Queue a report for background generation.
+    
+    Progress is pushed as 'report_progress' events and completion as a
+    'report_complete' event; the result is fetched from the result endpoint.
+    """
+    from .jobs import report_jobs
+    
+    data = request.json
+    job = report_jobs.submit(
+        current_app._get_current_object(),
+        data.get('type'),
+        data.get('start_date'),
+        data.get('end_date'),
+        data.get('options', {}),
+        data.get('format', 'rows'),
+        data.get('source', 'auto')
+    )
+    if job.get('status') == 'error':
+        return jsonify(job), 400
+    return jsonify(job), 202
+
+@reports_bp.route('/api/reports/jobs/<job_id>', methods=['GET'])
+def report_job_status_route(job_id):
+    """Get the status and progress of a report job."""
+    from .jobs import report_jobs
+    
+    job = report_jobs.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(report_jobs.describe(job))
+
+@reports_bp.route('/api/reports/jobs/<job_id>/result', methods=['GET'])
+def report_job_result_route(job_id):
+    """Get the result of a completed report job."""
+    from .jobs import report_jobs
+    
+    job = report_jobs.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    if job['status'] == 'failed':
+        return jsonify({"status": "error", "message": job['error']}), 500
+    if job['status'] != 'completed':
+        return jsonify(report_jobs.describe(job)), 409
+    
+    if job['format'] == 'columnar':
+        from shared.serialization import encode_payload
+        try:
+            body, mimetype = encode_payload(job['result'], request.args.get('encoding', 'json'))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        return Response(body, mimetype=mimetype)
+    
+    return jsonify(job['result'])
+
 @reports_bp.route('/api/reports/download', methods=['POST'])
+@worker_local
 def download_report():
     """Download a report as CSV."""
     data = request.json
@@ -0,0 +1,109 @@
+"""
+Boot phases and their timing.
+
+Startup is split into named phases. Each phase records when it started
+(relative to process start), how long it took and whether it failed, so slow
+steps show up in the log and at /api/system/boot. Independent phases can run
+concurrently, and slow ones (hardware probing) can run in the background
+while the HTTP server is already accepting requests.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class BootProfiler:
+    """Records the duration and outcome of each boot phase."""
+
+    def __init__(self):
+        """Start the boot clock."""
+        self.started = time.monotonic()
+        self.phases = {}
+        self.lock = threading.Lock()
+
+    def _record(self, name, **fields):
+        with self.lock:
+            self.phases.setdefault(name, {'name': name}).update(fields)
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as a boot phase. Exceptions are recorded and re-raised."""
+        start = time.monotonic()
+        self._record(name, status='running', start=round(start - self.started, 4),
+                     thread=threading.current_thread().name)
+        try:
+            yield
+        except Exception as e:
+            self._record(name, status='failed', error=str(e), duration=round(time.monotonic() - start, 4))
+            logger.error(f"Boot phase '{name}' failed after {time.monotonic() - start:.3f}s: {e}")
+            raise
+        duration = time.monotonic() - start
+        self._record(name, status='done', duration=round(duration, 4))
+        logger.info(f"Boot phase '{name}' took {duration:.3f}s")
+
+    def _run_phase(self, name, func, args, results):
+        try:
+            with self.phase(name):
+                results[name] = func(*args)
+        except Exception as e:
+            results[name] = e
+
+    def run_parallel(self, phases):
+        """Run independent phases concurrently and wait for all of them.
+
+        Args:
+            phases: Mapping of phase name to a callable
+
+        Returns:
+            dict: Phase name to the callable's return value, or the exception it raised
+        """
+        results = {}
+        threads = []
+        for name, func in phases.items():
+            thread = threading.Thread(target=self._run_phase, args=(name, func, (), results), name=f"boot-{name}")
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def run_background(self, name, func, *args):
+        """Start a phase without waiting for it; its progress shows in the report."""
+        self._record(name, status='pending')
+        thread = threading.Thread(target=self._run_phase, args=(name, func, args, {}), name=f"boot-{name}")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def measure(self, name):
+        """Record a phase that ran from the start of the boot until now (e.g. module imports)."""
+        duration = time.monotonic() - self.started
+        self._record(name, status='done', start=0.0, duration=round(duration, 4),
+                     thread=threading.current_thread().name)
+        logger.info(f"Boot phase '{name}' took {duration:.3f}s")
+
+    def mark(self, name):
+        """Record an instant milestone, such as the server accepting requests."""
+        self._record(name, status='done', start=round(time.monotonic() - self.started, 4), duration=0.0)
+        logger.info(f"Boot milestone '{name}' reached after {time.monotonic() - self.started:.3f}s")
+
+    def report(self):
+        """Get every phase in start order and whether the boot has completed."""
+        with self.lock:
+            phases = sorted((dict(phase) for phase in self.phases.values()),
+                            key=lambda phase: phase.get('start', float('inf')))
+        complete = all(phase['status'] in ('done', 'failed') for phase in phases)
+        ends = [phase['start'] + phase.get('duration', 0) for phase in phases if 'start' in phase]
+        return {
+            'complete': complete,
+            'elapsed': round(max(ends), 4) if complete and ends else None,
+            'phases': phases
+        }
+
+# Shared boot profiler, started when the module is first imported
+boot = BootProfiler()
@@ -7,17 +7,69 @@ This module provides a centralized configuration system that loads settings from
 3. Environment variables (for key operational parameters)
 
 Configuration files are stored in the 'config' directory and organized by category.
+
+Lookups are served from an immutable snapshot with every dotted key
+flattened into one dictionary, so `get` is a single hash lookup. `watch`
+polls the files' modification times; a changed file is re-read, validated
+and swapped in as a new snapshot, and subscribers are told which keys
+changed. An invalid file leaves the current snapshot in place.
 """
 
 import os
+import copy
 import json
+import time
 import logging
+import threading
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+def flatten(tree: Dict[str, Any], prefix: str = '') -> Iterable:
+    """Yield (dotted key, value) for every node of a nested dict, branches included."""
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        yield path, value
+        if isinstance(value, dict):
+            yield from flatten(value, f"{path}.")
+
+class ConfigError(ValueError):
+    """Raised when configuration files cannot be loaded or fail validation."""
+
+class ConfigSnapshot:
+    """Immutable, flattened view of the configuration at one point in time."""
+    
+    def __init__(self, tree: Dict[str, Any], version: int = 0):
+        """Build the snapshot from a nested configuration dict.
+        
+        Args:
+            tree: Configuration by section; it is copied, so later changes do not leak in
+            version: Increasing snapshot number
+        """
+        self.tree = copy.deepcopy(tree)
+        self.values = MappingProxyType(dict(flatten(self.tree)))
+        self.version = version
+        self.loaded_at = time.time()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a value by dotted key. Branch values are shared and must not be modified."""
+        return self.values.get(key, default)
+    
+    def leaves(self) -> Dict[str, Any]:
+        """Get the values that are not themselves sections."""
+        return {key: value for key, value in self.values.items() if not isinstance(value, dict)}
+    
+    def changed_keys(self, other: 'ConfigSnapshot') -> List[str]:
+        """List the leaf keys whose value differs between this snapshot and another."""
+        mine, theirs = self.leaves(), other.leaves()
+        return sorted(key for key in mine.keys() | theirs.keys()
+                      if mine.get(key, _MISSING) != theirs.get(key, _MISSING))
+
 class Config:
     """Application configuration management."""
     
@@ -67,6 +119,20 @@ class Config:
                     "wet_value": 300
                 }
             }
+        },
+        "executor": {
+            "max_concurrent": 4,
+            "timeout": 3.0,
+            "timeouts": {
+                "dht": 12.0,
+                "probe": 20.0
+            }
+        },
+        "circuit_breaker": {
+            "failure_threshold": 3,
+            "base_delay": 5.0,
+            "max_delay": 300.0,
+            "jitter": 0.2
         }
     }
     
@@ -78,7 +144,33 @@ class Config:
         "DEBUG": "server.debug",
         "NETWORK_UPDATE_INTERVAL": "server.network_update_interval",
         "DATA_RETENTION_DAYS": "database.retention.max_days",
-        "DATA_RETENTION_ENABLED": "database.retention.enabled"
+        "DATA_RETENTION_ENABLED": "database.retention.enabled",
+        "CONFIG_WATCH_INTERVAL": "server.config_watch_interval"
+    }
+    
+    # Checks applied before a reloaded configuration is accepted:
+    # dotted key -> (accepted types, minimum value or None)
+    VALIDATION_RULES = {
+        "hardware.sensors.ui_update_interval": ((int, float), 0.1),
+        "hardware.sensors.db_update_interval": ((int, float), 1),
+        "hardware.sensors.pins.soil_moisture.dry_value": ((int,), 0),
+        "hardware.sensors.pins.soil_moisture.wet_value": ((int,), 0),
+        "hardware.sensors.pins.ldr.min_value": ((int,), 0),
+        "hardware.sensors.pins.ldr.max_value": ((int,), 0),
+        "hardware.sensors.pins.rain.dry_value": ((int,), 0),
+        "hardware.sensors.pins.rain.wet_value": ((int,), 0),
+        "hardware.executor.timeout": ((int, float), 0.1),
+        "hardware.circuit_breaker.failure_threshold": ((int,), 1),
+        "hardware.circuit_breaker.base_delay": ((int, float), 0.1),
+        "hardware.circuit_breaker.max_delay": ((int, float), 0.1),
+        "hardware.circuit_breaker.jitter": ((int, float), 0),
+        "logging.csv_enabled": ((bool,), None),
+        "logging.data_folder": ((str,), None),
+        "logging.log_interval": ((int, float), 1),
+        "irrigation.dispatcher.max_flow": ((int, float), 0),
+        "irrigation.dispatcher.max_concurrent": ((int,), 1),
+        "irrigation.schedules.min_interval": ((int,), 0),
+        "irrigation.rules": ((list,), None)
     }
     
     def __init__(self, config_dir: Optional[str] = None):
@@ -93,6 +185,10 @@ class Config:
         
         # Initialize empty configuration
         self.config = {}
+        self.subscribers = []
+        self.lock = threading.RLock()
+        self.watch_thread = None
+        self.watching = False
         
         # Load configuration from files
         self._load_config_files()
@@ -100,6 +196,9 @@ class Config:
         # Override with environment variables
         self._load_from_env()
         
+        self.snapshot = ConfigSnapshot(self.config)
+        self.mtimes = self._file_mtimes()
+        
         # Set Flask-specific configuration
         self.SECRET_KEY = self.get("server.secret_key", "dev-key-change-in-production")
         self.SQLALCHEMY_DATABASE_URI = self.get("database.main.uri", "sqlite:///instance/irrigation.db")
@@ -120,7 +219,7 @@ class Config:
                     logger.warning(f"Configuration file {file_path} not found")
                     # Use default configuration for hardware if file not found
                     if section == "hardware":
-                        self.config[section] = self.DEFAULT_HARDWARE_CONFIG
+                        self.config[section] = copy.deepcopy(self.DEFAULT_HARDWARE_CONFIG)
                         logger.info("Using default hardware configuration")
                     else:
                         self.config[section] = {}
@@ -128,13 +227,17 @@ class Config:
                 logger.error(f"Error loading configuration file {file_path}: {e}")
                 # Use default configuration for hardware if error loading file
                 if section == "hardware":
-                    self.config[section] = self.DEFAULT_HARDWARE_CONFIG
+                    self.config[section] = copy.deepcopy(self.DEFAULT_HARDWARE_CONFIG)
                     logger.info("Using default hardware configuration due to error")
                 else:
                     self.config[section] = {}
     
-    def _load_from_env(self) -> None:
-        """Override configuration with environment variables."""
+    def _load_from_env(self, tree: Optional[Dict[str, Any]] = None) -> None:
+        """Override configuration with environment variables.
+        
+        Args:
+            tree: Configuration dict to update (default: the current configuration)
+        """
         for env_var, config_path in self.ENV_MAPPINGS.items():
             if env_var in os.environ:
                 # Parse the value based on type
@@ -152,7 +255,7 @@ class Config:
                     value = float(value)
                 
                 # Set the configuration value
-                self.set(config_path, value)
+                self._set_in(self.config if tree is None else tree, config_path, value)
                 logger.debug(f"Set {config_path} from environment variable {env_var}")
     
     def get(self, key: str, default: Any = None) -> Any:
@@ -165,16 +268,22 @@ class Config:
         Returns:
             The configuration value or default if not found
         """
+        return self.snapshot.values.get(key, default)
+    
+    @staticmethod
+    def _set_in(tree: Dict[str, Any], key: str, value: Any) -> None:
+        """Set a dotted key in a nested dict, creating sections as needed."""
         parts = key.split('.')
-        value = self.config
         
-        # Navigate through the nested dictionaries
-        for part in parts:
-            if part not in value:
-                return default
-            value = value[part]
+        # Navigate to the parent dictionary
+        parent = tree
+        for part in parts[:-1]:
+            if part not in parent:
+                parent[part] = {}
+            parent = parent[part]
         
-        return value
+        # Set the value
+        parent[parts[-1]] = value
     
     def set(self, key: str, value: Any) -> None:
         """Set a configuration value.
@@ -183,17 +292,137 @@ class Config:
             key: Dot-separated configuration key (e.g., 'hardware.sensors.ui_update_interval')
             value: Value to set
         """
-        parts = key.split('.')
+        with self.lock:
+            # The current tree belongs to the published snapshot; change a copy
+            tree = copy.deepcopy(self.config)
+            self._set_in(tree, key, value)
+            self._swap(tree)
+    
+    def validate(self, tree: Dict[str, Any]) -> List[str]:
+        """Check a configuration against VALIDATION_RULES.
         
-        # Navigate to the parent dictionary
-        parent = self.config
-        for part in parts[:-1]:
-            if part not in parent:
-                parent[part] = {}
-            parent = parent[part]
+        Returns:
+            list: Error messages; empty if the configuration is valid
+        """
+        values = dict(flatten(tree))
+        errors = []
+        for key, (types, minimum) in self.VALIDATION_RULES.items():
+            if key not in values:
+                continue
+            value = values[key]
+            # bool is a subclass of int, so it is only accepted where it is listed
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                errors.append(f"{key} must be {' or '.join(t.__name__ for t in types)}, got {value!r}")
+            elif minimum is not None and value < minimum:
+                errors.append(f"{key} must be at least {minimum}, got {value!r}")
+        return errors
+    
+    def subscribe(self, callback: Callable, prefixes: Optional[Iterable[str]] = None) -> None:
+        """Register a callback for configuration changes.
         
-        # Set the value
-        parent[parts[-1]] = value
+        Args:
+            callback: Called as callback(snapshot, changed_keys) after a new snapshot is swapped in
+            prefixes: Only call it when a changed key starts with one of these (default: any change)
+        """
+        self.subscribers.append((callback, tuple(prefixes) if prefixes else None))
+    
+    def _swap(self, tree: Dict[str, Any]) -> List[str]:
+        """Replace the snapshot and notify subscribers of the changed keys. Caller holds the lock."""
+        snapshot = ConfigSnapshot(tree, self.snapshot.version + 1)
+        changed = snapshot.changed_keys(self.snapshot)
+        self.config = snapshot.tree
+        self.snapshot = snapshot
+        if not changed:
+            return changed
+        logger.info(f"Configuration changed: {', '.join(changed)}")
+        for callback, prefixes in self.subscribers:
+            if prefixes and not any(key.startswith(prefixes) for key in changed):
+                continue
+            try:
+                callback(snapshot, changed)
+            except Exception as e:
+                logger.error(f"Error in configuration subscriber: {e}")
+        return changed
+    
+    def _file_mtimes(self) -> Dict[str, float]:
+        """Get the modification time of each configuration file (None if missing)."""
+        mtimes = {}
+        for section, filename in self.CONFIG_FILES.items():
+            try:
+                mtimes[section] = os.stat(self.CONFIG_DIR / filename).st_mtime_ns
+            except OSError:
+                mtimes[section] = None
+        return mtimes
+    
+    def reload(self) -> List[str]:
+        """Re-read the configuration files and swap in the new configuration if it is valid.
+        
+        Returns:
+            list: The changed keys
+            
+        Raises:
+            ConfigError: If a file cannot be parsed or the configuration fails validation;
+                         the current configuration is kept
+        """
+        tree = {}
+        for section, filename in self.CONFIG_FILES.items():
+            file_path = self.CONFIG_DIR / filename
+            if not file_path.exists():
+                tree[section] = copy.deepcopy(self.config.get(section, {}))
+                continue
+            try:
+                with open(file_path, 'r') as f:
+                    tree[section] = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ConfigError(f"Error loading configuration file {file_path}: {e}")
+            if not isinstance(tree[section], dict):
+                raise ConfigError(f"Configuration file {file_path} must contain a JSON object")
+        self._load_from_env(tree)
+        
+        errors = self.validate(tree)
+        if errors:
+            raise ConfigError(f"Invalid configuration: {'; '.join(errors)}")
+        with self.lock:
+            return self._swap(tree)
+    
+    def check_for_changes(self) -> List[str]:
+        """Reload the configuration if any file's modification time changed.
+        
+        Returns:
+            list: The changed keys (empty if nothing changed or the new files were rejected)
+        """
+        mtimes = self._file_mtimes()
+        if mtimes == self.mtimes:
+            return []
+        self.mtimes = mtimes
+        try:
+            return self.reload()
+        except ConfigError as e:
+            logger.error(f"{e}. Keeping the current configuration.")
+            return []
+    
+    def watch(self, interval: float = 2.0) -> None:
+        """Start polling the configuration files for changes in the background."""
+        if self.watch_thread:
+            return
+        self.watching = True
+        self.watch_thread = threading.Thread(target=self._watch_loop, args=(interval,))
+        self.watch_thread.daemon = True
+        self.watch_thread.start()
+        logger.info(f"Watching configuration files every {interval}s.")
+    
+    def stop_watching(self) -> None:
+        """Stop polling the configuration files."""
+        self.watching = False
+        self.watch_thread = None
+    
+    def _watch_loop(self, interval: float) -> None:
+        while self.watching:
+            time.sleep(interval)
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                logger.error(f"Error checking configuration files: {e}")
     
     def save(self) -> None:
         """Save the current configuration to files."""
@@ -210,4 +439,16 @@ class Config:
                     
                     logger.debug(f"Saved configuration to {file_path}")
                 except Exception as e:
-                    logger.error(f"Error saving configuration to {file_path}: {e}")
\ No newline at end of file
+                    logger.error(f"Error saving configuration to {file_path}: {e}")
+
+_shared_config = None
+
+def get_config() -> Config:
+    """Get the process-wide configuration, loading it on first use.
+    
+    Modules share this instance so that a hot reload is seen everywhere.
+    """
+    global _shared_config
+    if _shared_config is None:
+        _shared_config = Config()
+    return _shared_config
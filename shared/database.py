@@ -1,4 +1,23 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 
 # Create database instance
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+def add_missing_columns(*models):
+    """Add nullable columns introduced after a table was first created.
+    
+    db.create_all() only creates missing tables, so columns added to an
+    existing model are added here with ALTER TABLE. Must run in an app context.
+    """
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for model in models:
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Time-series downsampling for charts.
+
+Implements Largest-Triangle-Three-Buckets (LTTB) and a min/max envelope,
+both operating on NumPy arrays so large ranges can be reduced to the number
+of points a chart can actually draw without losing visible peaks.
+"""
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+def lttb(x, y, threshold):
+    """Downsample a series using Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: 1-D array of monotonically increasing x values (e.g. epoch seconds)
+        y: 1-D array of values, same length as x
+        threshold: Number of points to return (at least 3)
+
+    Returns:
+        numpy.ndarray: Sorted indices of the selected points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Bucket edges for the interior points; first and last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Average point of every bucket, computed in one pass
+    counts = ends - starts
+    avg_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+    # The bucket after the last interior bucket is the final point itself
+    avg_x = np.append(avg_x, x[-1])
+    avg_y = np.append(avg_y, y[-1])
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    prev = 0
+    for bucket, (start, end) in enumerate(zip(starts, ends)):
+        bx = x[start:end]
+        by = y[start:end]
+        # Twice the triangle area formed with the previous pick and next bucket average
+        area = np.abs(
+            (x[prev] - avg_x[bucket + 1]) * (by - y[prev])
+            - (x[prev] - bx) * (avg_y[bucket + 1] - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        selected[bucket + 1] = prev
+
+    return selected
+
+def minmax_envelope(x, y, threshold):
+    """Downsample by keeping the minimum and maximum point of each bucket.
+
+    Args:
+        x: 1-D array of monotonically increasing x values
+        y: 1-D array of values, same length as x
+        threshold: Maximum number of points to return (two per bucket; an odd
+            threshold spends its spare point on the last sample)
+
+    Returns:
+        numpy.ndarray: Sorted indices of the selected points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    buckets = threshold // 2
+    bucket_ids = (np.arange(n) * buckets) // n
+
+    # Sort by bucket, then by value: the first entry of each bucket is its
+    # minimum and the last entry is its maximum
+    order = np.lexsort((y, bucket_ids))
+    boundaries = np.flatnonzero(np.diff(bucket_ids[order])) + 1
+    firsts = np.concatenate(([0], boundaries))
+    lasts = np.concatenate((boundaries - 1, [n - 1]))
+
+    selected = [order[firsts], order[lasts]]
+    if threshold % 2:
+        # Keep the final sample too, so the chart reaches the end of the range
+        selected.append([n - 1])
+    return np.unique(np.concatenate(selected))
+
+def downsample(x, y, threshold, method='lttb'):
+    """Downsample a series with the named method.
+
+    Returns:
+        numpy.ndarray: Sorted indices of the selected points
+
+    Raises:
+        ValueError: If the method is unknown
+    """
+    if method == 'lttb':
+        return lttb(x, y, threshold)
+    if method == 'minmax':
+        return minmax_envelope(x, y, threshold)
+    raise ValueError(f"Unknown downsampling method: {method}. Use one of {', '.join(DOWNSAMPLE_METHODS)}.")
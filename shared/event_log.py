@@ -0,0 +1,143 @@
+"""
+Asynchronous, batched event log writer.
+
+Callers enqueue log rows without touching the database; a background thread
+inserts them in batches (one executemany and commit per table). Hardware
+actuation therefore never waits on SQLite. Rows carry the time they were
+logged, not the time they were flushed.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from .database import db
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class EventLogWriter:
+    """Queues model rows and writes them to the database in batches."""
+
+    def __init__(self, flush_interval=1.0, batch_size=500, max_queue=10000):
+        """Initialize the writer.
+
+        Args:
+            flush_interval: Maximum seconds a row waits in the queue
+            batch_size: Rows written per transaction
+            max_queue: Queue bound; the oldest rows are dropped beyond it
+        """
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.app = None
+        self.thread = None
+        self.running = False
+        self.written = 0
+        self.dropped = 0
+
+    def start(self, app):
+        """Start the background writer thread."""
+        if self.thread:
+            return
+        self.app = app
+        self.running = True
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop the writer thread and flush whatever is still queued."""
+        if not self.thread:
+            return
+        self.running = False
+        self.wakeup.set()
+        # Do not join the thread, as it causes an assertion error with eventlet.
+        self.thread = None
+        self.flush()
+
+    def log(self, model, **fields):
+        """Queue a row for a model; never blocks on the database.
+
+        The row's timestamp defaults to now if the model has a timestamp column.
+        """
+        if 'timestamp' in model.__table__.columns and 'timestamp' not in fields:
+            fields['timestamp'] = datetime.now()
+        with self.lock:
+            if len(self.queue) >= self.max_queue:
+                self.queue.popleft()
+                self.dropped += 1
+                if self.dropped % 100 == 1:
+                    logger.warning(f"Event log queue full; {self.dropped} event(s) dropped so far.")
+            self.queue.append((model, fields))
+            if len(self.queue) >= self.batch_size:
+                self.wakeup.set()
+
+    def flush(self):
+        """Write all queued rows now, batch by batch.
+
+        Returns:
+            int: Number of rows written
+        """
+        written = 0
+        while True:
+            with self.lock:
+                batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            if not batch:
+                return written
+            if not self._write_batch(batch):
+                return written
+            written += len(batch)
+
+    def _write_batch(self, batch):
+        """Insert one batch, grouped per table, in a single transaction."""
+        rows_by_model = {}
+        for model, fields in batch:
+            rows_by_model.setdefault(model, []).append(fields)
+
+        started = time.monotonic()
+        try:
+            with self.app.app_context():
+                for model, rows in rows_by_model.items():
+                    db.session.execute(model.__table__.insert(), rows)
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} event log row(s): {e}")
+            with self.app.app_context():
+                db.session.rollback()
+            # Put the batch back so it is retried on the next flush
+            with self.lock:
+                self.queue.extendleft(reversed(batch))
+                while len(self.queue) > self.max_queue:
+                    self.queue.popleft()
+                    self.dropped += 1
+            return False
+
+        self.written += len(batch)
+        logger.debug(f"Wrote {len(batch)} event log row(s) in {time.monotonic() - started:.3f}s.")
+        return True
+
+    def _run(self):
+        """Flush the queue every flush_interval, or sooner when a batch fills up."""
+        logger.info("Event log writer started.")
+        while self.running:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            if not self.flush() and self.queue:
+                # The database is failing; back off before retrying
+                time.sleep(self.flush_interval * 5)
+        logger.info("Event log writer stopped.")
+
+    def status(self):
+        """Get queue and throughput counters."""
+        with self.lock:
+            queued = len(self.queue)
+        return {'queued': queued, 'written': self.written, 'dropped': self.dropped}
+
+# Shared event log writer instance
+event_log = EventLogWriter()
@@ -0,0 +1,69 @@
+"""
+Marker file for sensor history added outside the running app.
+
+`python -m reports.backfill` inserts rows into closed days whose results the
+app may already have cached (ET0). It records the days it touched in a small
+JSON file next to the database, and every web process checks the file's
+modification time and drops its cached results for those days.
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import date
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+HISTORY_CHANGES_FILE = 'history_changes.json'
+
+def _load(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def mark_days_changed(path, days):
+    """Record that rows were added to these days (dates), replacing the file atomically."""
+    changes = _load(path)
+    stamp = time.time()
+    for day in days:
+        changes[day.isoformat()] = stamp
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(changes, f)
+    os.replace(tmp_path, path)
+
+class HistoryChanges:
+    """Follows the marker file and reports the days changed since the last check."""
+
+    def __init__(self, path):
+        """Initialize the follower; changes recorded before now are not reported."""
+        self.path = path
+        self.mtime = self._mtime()
+        self.seen = _load(path)
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self):
+        """Get the days changed since the last call.
+
+        Returns:
+            list: Dates whose history changed
+        """
+        mtime = self._mtime()
+        if mtime is None or mtime == self.mtime:
+            return []
+        self.mtime = mtime
+        changes = _load(self.path)
+        changed = [day for day, stamp in changes.items() if self.seen.get(day) != stamp]
+        self.seen = changes
+        if changed:
+            logger.info(f"Sensor history changed for {len(changed)} day(s); dropping cached results.")
+        return [date.fromisoformat(day) for day in changed]
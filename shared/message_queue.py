@@ -0,0 +1,312 @@
+"""
+Local message queue for Socket.IO fan-out across web workers.
+
+With several web worker processes, an emit in one process has to reach the
+clients connected to all of them. python-socketio does this through a
+client manager that publishes every emit to a message queue. This module
+provides a queue that needs no external service: a small broker on a UNIX
+socket that relays length-prefixed frames to every subscriber of a channel,
+and a socketio.PubSubManager that talks to it. A redis:// URL uses Redis
+instead (requires the redis package).
+
+Run the broker on its own with `python -m shared.message_queue`; app.py
+starts it in the primary process when WEB_WORKERS is set.
+"""
+
+import os
+import sys
+import time
+import queue
+import pickle
+import socket
+import struct
+import logging
+import threading
+
+import socketio
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'instance', 'socketio.sock')
+DEFAULT_URL = f"unix://{DEFAULT_SOCKET_PATH}"
+DEFAULT_CHANNEL = 'flask-socketio'
+
+HEADER = struct.Struct('!I')
+SUBSCRIBE = b'S'
+PUBLISH = b'P'
+
+def send_frame(sock, payload):
+    """Send one length-prefixed frame."""
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return bytes(data)
+
+def recv_frame(sock):
+    """Receive one length-prefixed frame, or None when the peer closed the connection."""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    return _recv_exact(sock, HEADER.unpack(header)[0])
+
+def socket_path(url):
+    """Get the socket path of a unix:// URL."""
+    if not url.startswith('unix://'):
+        raise ValueError(f"Not a unix:// message queue URL: {url}")
+    return url[len('unix://'):]
+
+class MessageBroker:
+    """Relays frames published on a UNIX socket to all subscribers of the same channel.
+
+    A client opens a connection and sends a handshake frame: the role
+    (S for subscribe, P for publish) followed by the channel name. A
+    publisher then sends frames; a subscriber receives every frame published
+    to its channel from then on. Each subscriber has a bounded queue, so a
+    slow or stuck subscriber is disconnected (it reconnects) instead of
+    holding up the others.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET_PATH, max_pending=1000):
+        """Initialize the broker.
+
+        Args:
+            path: Path of the UNIX socket
+            max_pending: Frames queued per subscriber before it is disconnected
+        """
+        self.path = path
+        self.max_pending = max_pending
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.running = False
+        self.published = 0
+        self.dropped = 0
+
+    def start(self):
+        """Bind the socket and accept connections in the background."""
+        if self.running:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left over from a previous run
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        os.chmod(self.path, 0o600)  # Frames are pickled; only this user may connect
+        self.server.listen(64)
+        self.running = True
+        thread = threading.Thread(target=self._accept_loop, name='message-broker')
+        thread.daemon = True
+        thread.start()
+        logger.info(f"Message broker listening on {self.path}")
+
+    def stop(self):
+        """Close the socket and disconnect all clients."""
+        self.running = False
+        if self.server:
+            self.server.close()
+            self.server = None
+        with self.lock:
+            subscribers = [sub for subs in self.subscribers.values() for sub in subs]
+            self.subscribers.clear()
+        for subscriber in subscribers:
+            self._disconnect(subscriber)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def stats(self):
+        """Get the subscribers per channel, the frames published and the subscribers dropped for lagging."""
+        with self.lock:
+            return {
+                'subscribers': {channel: len(subs) for channel, subs in self.subscribers.items()},
+                'published': self.published,
+                'dropped': self.dropped
+            }
+
+    def publish(self, channel, frame):
+        """Queue a frame for every subscriber of a channel."""
+        with self.lock:
+            self.published += 1
+            subscribers = list(self.subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber[1].put_nowait(frame)
+            except queue.Full:
+                logger.warning(f"Subscriber of '{channel}' is {self.max_pending} frames behind; disconnecting it.")
+                with self.lock:
+                    self.dropped += 1
+                self._remove(channel, subscriber)
+                self._disconnect(subscriber)
+
+    @staticmethod
+    def _disconnect(subscriber):
+        """Discard a subscriber's pending frames and let its writer close the connection."""
+        pending = subscriber[1]
+        while True:
+            try:
+                pending.get_nowait()
+            except queue.Empty:
+                break
+        pending.put_nowait(None)
+
+    def _remove(self, channel, subscriber):
+        with self.lock:
+            subscribers = self.subscribers.get(channel, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            thread = threading.Thread(target=self._serve, args=(conn,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, conn):
+        try:
+            handshake = recv_frame(conn)
+            if not handshake:
+                return
+            role, channel = handshake[:1], handshake[1:].decode('utf-8')
+            if role == PUBLISH:
+                while True:
+                    frame = recv_frame(conn)
+                    if frame is None:
+                        break
+                    self.publish(channel, frame)
+            elif role == SUBSCRIBE:
+                self._serve_subscriber(conn, channel)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def _serve_subscriber(self, conn, channel):
+        subscriber = (conn, queue.Queue(maxsize=self.max_pending))
+        with self.lock:
+            self.subscribers.setdefault(channel, []).append(subscriber)
+        try:
+            while True:
+                frame = subscriber[1].get()
+                if frame is None:
+                    break
+                send_frame(conn, frame)
+        finally:
+            self._remove(channel, subscriber)
+
+class UnixSocketManager(socketio.PubSubManager):
+    """Socket.IO client manager that fans out through a MessageBroker."""
+
+    name = 'unix'
+
+    def __init__(self, url=DEFAULT_URL, channel=DEFAULT_CHANNEL, write_only=False, logger=None):
+        """Initialize the manager.
+
+        Args:
+            url: unix:// URL of the broker socket
+            channel: Channel shared by the processes that should see each other's emits
+            write_only: Only publish (for a process without connected clients)
+        """
+        self.path = socket_path(url)
+        self.publisher = None
+        self.publish_lock = threading.Lock()
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _connect(self, role):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+            send_frame(sock, role + self.channel.encode('utf-8'))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _publish(self, data):
+        payload = pickle.dumps(data)
+        with self.publish_lock:
+            for retry in (True, False):
+                try:
+                    if self.publisher is None:
+                        self.publisher = self._connect(PUBLISH)
+                    send_frame(self.publisher, payload)
+                    return
+                except OSError as e:
+                    if self.publisher:
+                        self.publisher.close()
+                        self.publisher = None
+                    if not retry:
+                        logger.error(f"Cannot publish to the message broker at {self.path}: {e}")
+
+    def _listen(self):
+        retry_sleep = 1
+        while True:
+            try:
+                sock = self._connect(SUBSCRIBE)
+            except OSError as e:
+                logger.error(f"Cannot reach the message broker at {self.path} ({e}); retrying in {retry_sleep}s")
+                time.sleep(retry_sleep)
+                retry_sleep = min(retry_sleep * 2, 30)
+                continue
+            retry_sleep = 1
+            try:
+                while True:
+                    frame = recv_frame(sock)
+                    if frame is None:
+                        break
+                    yield frame
+            except OSError as e:
+                logger.error(f"Lost the message broker connection: {e}")
+            finally:
+                sock.close()
+
+def create_client_manager(url, channel=DEFAULT_CHANNEL, write_only=False):
+    """Create the Socket.IO client manager for a message queue URL.
+
+    Args:
+        url: unix:///path/to/socket for the local broker, or redis://host:port/db
+
+    Returns:
+        socketio.PubSubManager: The manager to pass to the Socket.IO server
+    """
+    if url.startswith('unix://'):
+        return UnixSocketManager(url, channel=channel, write_only=write_only)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel, write_only=write_only)
+    raise ValueError(f"Unsupported message queue URL: {url}")
+
+def main(argv=None):
+    """Run the broker until SIGINT or SIGTERM."""
+    import signal
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local Socket.IO message broker")
+    parser.add_argument('--url', default=os.environ.get('SOCKETIO_MESSAGE_QUEUE', DEFAULT_URL),
+                        help="unix:// URL of the broker socket")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    broker = MessageBroker(socket_path(args.url))
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda sig, frame: stopped.set())
+    signal.signal(signal.SIGINT, lambda sig, frame: stopped.set())
+    broker.start()
+    while not stopped.wait(1):
+        pass
+    broker.stop()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
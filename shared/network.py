@@ -0,0 +1,206 @@
+"""
+Cached network information (IP address and WiFi SSID).
+
+The interface state is polled from /sys/class/net and /proc/net/wireless,
+which are cheap reads. The SSID is read with the SIOCGIWESSID ioctl, and
+only when that state changes; `iwgetid` is run only if the ioctl is not
+available. Display and API code read the cached values, so they never spawn
+a process. Listeners are called when the IP address or SSID changes.
+"""
+
+import os
+import time
+import array
+import fcntl
+import socket
+import struct
+import logging
+import platform
+import threading
+import subprocess
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SYS_NET = '/sys/class/net'
+PROC_WIRELESS = '/proc/net/wireless'
+SIOCGIWESSID = 0x8B1B
+ESSID_MAX_SIZE = 32
+
+def read_file(path):
+    """Read a small text file, returning '' if it cannot be read."""
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+def wireless_interfaces():
+    """List the interfaces present in /proc/net/wireless."""
+    lines = read_file(PROC_WIRELESS).splitlines()[2:]
+    return [line.split(':', 1)[0].strip() for line in lines if ':' in line]
+
+def link_signature():
+    """Get the state of all interfaces as a comparable tuple.
+
+    It changes when an interface goes up or down, gains or loses carrier or
+    (re)associates with an access point.
+    """
+    try:
+        interfaces = sorted(os.listdir(SYS_NET))
+    except OSError:
+        interfaces = []
+    state = tuple(
+        (name, read_file(f"{SYS_NET}/{name}/operstate"), read_file(f"{SYS_NET}/{name}/carrier"))
+        for name in interfaces if name != 'lo'
+    )
+    return state, tuple(wireless_interfaces())
+
+def get_ip_address():
+    """Get the primary IP address of the device."""
+    try:
+        # Connecting a UDP socket sends nothing; it only selects the outgoing interface
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(('8.8.8.8', 80))
+        ip = s.getsockname()[0]
+        s.close()
+        return ip
+    except Exception:
+        return '127.0.0.1'
+
+def read_essid(interface):
+    """Read the SSID an interface is associated with using the wireless extensions ioctl.
+
+    Returns:
+        str: The SSID ('' when not associated), or None if the ioctl is unavailable
+    """
+    buffer = array.array('B', bytes(ESSID_MAX_SIZE + 1))
+    address, length = buffer.buffer_info()
+    request = struct.pack('16sPHH', interface.encode('utf-8')[:15], address, length, 0)
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        result = fcntl.ioctl(s.fileno(), SIOCGIWESSID, request)
+    except OSError:
+        return None
+    finally:
+        s.close()
+    size = struct.unpack('16sPHH', result)[2]
+    return buffer.tobytes()[:size].rstrip(b'\x00').decode('utf-8', 'replace')
+
+def read_ssid_with_iwgetid():
+    """Get the SSID by running iwgetid (fallback when the ioctl is unavailable)."""
+    try:
+        return subprocess.check_output(['iwgetid', '-r'], timeout=5).decode('utf-8').strip()
+    except Exception as e:
+        logger.error(f"Error getting network SSID: {e}")
+        return None
+
+class NetworkInfo:
+    """Polls the link state and keeps the IP address and SSID cached."""
+
+    def __init__(self, poll_interval=5, refresh_interval=60):
+        """Initialize the provider.
+
+        Args:
+            poll_interval: Seconds between link state checks (file reads only)
+            refresh_interval: Seconds between IP address checks when the link state is unchanged
+        """
+        self.poll_interval = poll_interval
+        self.refresh_interval = refresh_interval
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.info = {'ip_address': '127.0.0.1', 'ssid': 'Unknown', 'interface': None, 'updated': None}
+        self.signature = None
+        self.last_refresh = 0
+        self.thread = None
+        self.running = False
+        self.process_calls = 0
+
+    def add_listener(self, callback):
+        """Register callback(info) to be called when the IP address or SSID changes."""
+        self.listeners.append(callback)
+
+    def get(self):
+        """Get a copy of the cached network information."""
+        with self.lock:
+            return dict(self.info)
+
+    def _read_ssid(self, wireless):
+        """Get (interface, SSID) of the first associated wireless interface."""
+        if platform.system() != "Linux":
+            return None, "Dev-SSID"  # Placeholder for development
+        for interface in wireless:
+            essid = read_essid(interface)
+            if essid is None:
+                break
+            if essid:
+                return interface, essid
+        else:
+            return None, "Not connected"
+        self.process_calls += 1
+        essid = read_ssid_with_iwgetid()
+        if essid is None:
+            return None, "Unknown"
+        return None, essid or "Not connected"
+
+    def refresh(self, force=False):
+        """Re-read the network information if the link state changed.
+
+        Returns:
+            bool: True if the IP address or SSID changed
+        """
+        signature = link_signature()
+        now = time.monotonic()
+        link_changed = signature != self.signature
+        if not (force or link_changed or now - self.last_refresh >= self.refresh_interval):
+            return False
+        self.last_refresh = now
+
+        ip_address = get_ip_address()
+        if force or link_changed or self.signature is None:
+            interface, ssid = self._read_ssid(signature[1])
+        else:
+            interface, ssid = self.info['interface'], self.info['ssid']
+        self.signature = signature
+
+        with self.lock:
+            # The first reading is always published
+            changed = self.info['updated'] is None or (ip_address, ssid) != (self.info['ip_address'], self.info['ssid'])
+            updated = time.time() if changed else self.info['updated']
+            self.info = {'ip_address': ip_address, 'ssid': ssid, 'interface': interface, 'updated': updated}
+            info = dict(self.info)
+        if changed:
+            logger.info(f"Network change detected. New IP: {ip_address}, New SSID: {ssid}")
+            for callback in self.listeners:
+                try:
+                    callback(info)
+                except Exception as e:
+                    logger.error(f"Error in network listener: {e}")
+        return changed
+
+    def start(self):
+        """Read the network information once and start polling in the background."""
+        if self.thread:
+            return
+        self.refresh(force=True)
+        self.running = True
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop polling."""
+        self.running = False
+        self.thread = None
+
+    def _run(self):
+        logger.info(f"Network info polled every {self.poll_interval}s, refreshed every {self.refresh_interval}s.")
+        while self.running:
+            time.sleep(self.poll_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error updating network info: {e}")
+
+# Shared network information provider
+network_info = NetworkInfo()
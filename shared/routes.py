@@ -1,15 +1,20 @@
 from flask import Blueprint, jsonify, current_app
 from datetime import datetime
+from .network import network_info
+from .boot import boot
+from .workers import worker_local
 
 shared_bp = Blueprint('shared', __name__)
 
 @shared_bp.route('/api/server-time', methods=['GET'])
+@worker_local
 def get_server_time():
     """Get the current server time."""
     current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     return jsonify({"time": current_time})
 
 @shared_bp.route('/api/server-time/display', methods=['GET'])
+@worker_local
 def get_server_time_display():
     """Get the current server time formatted for display."""
     now = datetime.now()
@@ -18,4 +23,20 @@ def get_server_time_display():
     return jsonify({
         'formatted_time': formatted_time,
         'timestamp': now.isoformat()
-    })
\ No newline at end of file
+    })
+
+@shared_bp.route('/api/network', methods=['GET'])
+def get_network():
+    """Get the cached IP address and WiFi SSID."""
+    return jsonify(network_info.get())
+
+@shared_bp.route('/api/system/boot', methods=['GET'])
+def get_boot_report():
+    """Get the duration and status of each startup phase."""
+    return jsonify(boot.report())
+
+@shared_bp.route('/api/system/hardware', methods=['GET'])
+def get_hardware_status():
+    """Get the hardware executor's per-device call counts, timings, timeouts and stuck devices."""
+    from hardware.executor import hardware_executor
+    return jsonify(hardware_executor.status())
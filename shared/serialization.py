@@ -0,0 +1,95 @@
+"""
+Response serialization helpers.
+
+Provides a compact columnar layout for bulk time-series responses and
+optional fast encoders (orjson, msgpack) with a standard-library fallback.
+"""
+
+import json
+from datetime import datetime
+
+# Optional faster encoders
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+SUPPORTED_ENCODINGS = ('json', 'msgpack')
+
+def to_epoch_ms(value):
+    """Convert a naive local datetime to epoch milliseconds."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+def build_columnar(rows, fields):
+    """Convert row tuples into a columnar payload.
+
+    Args:
+        rows: Iterable of tuples shaped (timestamp, field_1, ..., field_n)
+        fields: Names of the value fields, in the same order as in each row
+
+    Returns:
+        dict: Parallel arrays per field with epoch-millisecond timestamps.
+              Fields containing missing values carry a null mask (1 = null)
+              and store 0 in the masked positions so every array stays numeric.
+    """
+    timestamps = []
+    columns = {field: [] for field in fields}
+    nulls = {field: [] for field in fields}
+    has_nulls = dict.fromkeys(fields, False)
+
+    for row in rows:
+        timestamps.append(to_epoch_ms(row[0]))
+        for index, field in enumerate(fields, start=1):
+            value = row[index]
+            if value is None:
+                columns[field].append(0)
+                nulls[field].append(1)
+                has_nulls[field] = True
+            else:
+                columns[field].append(value)
+                nulls[field].append(0)
+
+    return {
+        'format': 'columnar',
+        'count': len(timestamps),
+        'fields': list(fields),
+        'timestamp': timestamps,
+        'columns': columns,
+        'nulls': {field: mask for field, mask in nulls.items() if has_nulls[field]}
+    }
+
+def encode_payload(payload, encoding='json'):
+    """Encode a payload with the fastest available encoder.
+
+    Args:
+        payload: JSON-serializable data
+        encoding: 'json' or 'msgpack'
+
+    Returns:
+        tuple: (body bytes, mimetype)
+
+    Raises:
+        ValueError: If the encoding is unknown or its encoder is not installed
+    """
+    if encoding == 'msgpack':
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("msgpack encoding requested but msgpack is not installed.")
+        return msgpack.packb(payload, use_bin_type=True), 'application/x-msgpack'
+
+    if encoding == 'json':
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(payload), 'application/json'
+        return json.dumps(payload, separators=(',', ':')).encode('utf-8'), 'application/json'
+
+    raise ValueError(f"Unsupported encoding: {encoding}. Use one of {', '.join(SUPPORTED_ENCODINGS)}.")
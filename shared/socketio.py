@@ -1,14 +1,40 @@
-from flask_socketio import SocketIO
+import os
+
+from flask_socketio import SocketIO, emit
+
+from .workers import worker_count, is_worker, socketio_transports
 
 # Create SocketIO instance with proper configuration
 # cors_allowed_origins="*" allows connections from any origin
 # async_mode='eventlet' uses eventlet for async operations
 socketio = SocketIO(cors_allowed_origins="*", async_mode='eventlet')
 
+def init_socketio(app):
+    """Initialize Socket.IO for the app.
+
+    With web workers, emits go through the message queue (SOCKETIO_MESSAGE_QUEUE,
+    the local broker by default) so every worker's clients receive them. The
+    primary has no clients of its own and only publishes.
+    """
+    if worker_count() <= 0:
+        socketio.init_app(app)
+        return
+    from .message_queue import DEFAULT_URL, create_client_manager
+    url = os.environ.get('SOCKETIO_MESSAGE_QUEUE', DEFAULT_URL)
+    manager = create_client_manager(url, write_only=not is_worker())
+    socketio.init_app(app, client_manager=manager, transports=socketio_transports())
+
 
-# Add this event handler
 @socketio.on('get_sensor_status')
 def handle_get_sensor_status():
-    """Handle request for sensor status."""
-    from shared.sensor import sensor_controller
-    socketio.emit('sensor_status', {'sensor_status': sensor_controller.get_sensor_status()})
\ No newline at end of file
+    """Send the requesting client each sensor's connection status and circuit breaker state.
+
+    A web worker has no sensors of its own and asks the primary.
+    """
+    if is_worker():
+        from .workers import forward
+        health = forward('GET', '/api/weather/sensors/status').json()
+    else:
+        from weather.controllers import get_sensor_health
+        health = get_sensor_health()
+    emit('sensor_status', {'sensor_status': health})
\ No newline at end of file
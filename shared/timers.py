@@ -0,0 +1,86 @@
+"""
+Central timer service for delayed actions.
+
+Timers are registered on the eventlet hub's timer heap (via spawn_after), so
+a pending deadline costs a heap entry rather than a sleeping thread, and can
+be cancelled at any time. Each timer is stored under a key; scheduling a key
+again replaces (cancels) the previous timer for that key.
+"""
+
+import time
+import logging
+import threading
+
+import eventlet
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class TimerService:
+    """Keyed, cancellable one-shot timers running on the eventlet hub."""
+
+    def __init__(self):
+        """Initialize the timer service."""
+        self.timers = {}
+        self.lock = threading.Lock()
+
+    def call_later(self, key, delay, callback, *args, **kwargs):
+        """Run callback(*args, **kwargs) after delay seconds.
+
+        Any pending timer with the same key is cancelled first.
+
+        Args:
+            key: Name identifying the timer (e.g. 'pump_auto_stop')
+            delay: Delay in seconds
+            callback: Function to call in its own greenthread
+        """
+        with self.lock:
+            previous = self.timers.pop(key, None)
+            if previous:
+                previous[0].cancel()
+            green_thread = eventlet.spawn_after(delay, self._fire, key, callback, args, kwargs)
+            self.timers[key] = (green_thread, time.monotonic() + delay)
+        return green_thread
+
+    def cancel(self, key):
+        """Cancel the pending timer for a key.
+
+        Returns:
+            bool: True if a pending timer was cancelled
+        """
+        with self.lock:
+            pending = self.timers.pop(key, None)
+        if pending:
+            pending[0].cancel()
+            return True
+        return False
+
+    def remaining(self, key):
+        """Get the seconds left before a timer fires, or None if none is pending."""
+        with self.lock:
+            pending = self.timers.get(key)
+        if not pending:
+            return None
+        return max(0.0, pending[1] - time.monotonic())
+
+    def cancel_all(self):
+        """Cancel every pending timer."""
+        with self.lock:
+            pending = list(self.timers.values())
+            self.timers.clear()
+        for green_thread, _ in pending:
+            green_thread.cancel()
+
+    def _fire(self, key, callback, args, kwargs):
+        """Unregister a due timer and run its callback."""
+        with self.lock:
+            pending = self.timers.get(key)
+            if pending and pending[0] is eventlet.getcurrent():
+                del self.timers[key]
+        try:
+            callback(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error in timer '{key}': {e}")
+
+# Shared timer service instance
+timers = TimerService()
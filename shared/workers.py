@@ -0,0 +1,160 @@
+"""
+Multi-process web tier.
+
+With WEB_WORKERS=N, app.py runs as the primary process: it owns the
+hardware, the scheduler, the rules and the sensor broadcast, runs the local
+message broker and serves the API on a loopback port. It starts N worker
+processes (WEB_ROLE=worker) that all listen on the public port (the kernel
+spreads connections over them with SO_REUSEPORT) and serve the page, the
+Socket.IO connections and the database-backed reads marked with
+worker_local. Every other request is forwarded to the primary, so state that
+lives in one process (pumps, caches, jobs) stays consistent. Emits from the
+primary reach the clients of every worker through the message queue.
+
+Clients connect with the websocket transport only: long-polling needs every
+request of a session to reach the same process, which SO_REUSEPORT does not
+guarantee.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+import subprocess
+
+import requests
+from flask import request, jsonify, Response
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Headers passed through when a request is forwarded to the primary
+FORWARDED_HEADERS = ('Content-Type', 'Accept', 'If-None-Match', 'Content-Disposition', 'ETag')
+
+def worker_count():
+    """Get the number of web workers (0 runs a single process)."""
+    return int(os.environ.get('WEB_WORKERS', 0))
+
+def is_worker():
+    """Check whether this process is a web worker."""
+    return os.environ.get('WEB_ROLE') == 'worker'
+
+def primary_port():
+    """Get the loopback port the primary process serves the API on."""
+    return int(os.environ.get('WEB_PRIMARY_PORT', 5100))
+
+def primary_url():
+    """Get the base URL of the primary process."""
+    return f"http://127.0.0.1:{primary_port()}"
+
+def socketio_transports():
+    """Get the Socket.IO transports clients may use (websocket only with workers)."""
+    return ['websocket'] if worker_count() > 0 else ['polling', 'websocket']
+
+def worker_local(view):
+    """Mark a view as safe to serve in a worker (it only reads the database)."""
+    view.worker_local = True
+    return view
+
+def forward(method, path, **kwargs):
+    """Send a request to the primary process.
+
+    Returns:
+        requests.Response: The primary's response
+    """
+    kwargs.setdefault('timeout', 30)
+    return requests.request(method, primary_url() + path, **kwargs)
+
+def forward_request():
+    """Forward the current request to the primary and relay its response."""
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    try:
+        response = forward(request.method, request.full_path, data=request.get_data(), headers=headers)
+    except requests.RequestException as e:
+        logger.error(f"Cannot forward {request.method} {request.path} to the primary: {e}")
+        return jsonify({"status": "error", "message": "Primary process unavailable"}), 503
+    relayed = {name: response.headers[name] for name in FORWARDED_HEADERS if name in response.headers}
+    return Response(response.content, status=response.status_code, headers=relayed)
+
+def init_app(app):
+    """Forward every request a worker does not serve itself to the primary."""
+
+    @app.before_request
+    def forward_to_primary():
+        view = app.view_functions.get(request.endpoint)
+        if view is None or request.endpoint == 'static' or getattr(view, 'worker_local', False):
+            return None
+        return forward_request()
+
+def watch_primary(check_interval=2):
+    """Exit this worker when the primary that started it goes away.
+
+    A worker left running after its primary died would keep the public port
+    (SO_REUSEPORT) and answer every forwarded request with 503. When the
+    parent exits, the worker is re-parented, so a changed getppid() means
+    the primary is gone.
+    """
+    primary = os.getppid()
+
+    def watch():
+        while os.getppid() == primary:
+            time.sleep(check_interval)
+        logger.warning(f"Primary process {primary} exited; stopping web worker {os.environ.get('WEB_WORKER_ID')}.")
+        os._exit(0)
+
+    thread = threading.Thread(target=watch)
+    thread.daemon = True
+    thread.start()
+
+class WorkerPool:
+    """Starts the web worker processes and restarts them when they exit."""
+
+    def __init__(self, count, check_interval=2):
+        """Initialize the pool.
+
+        Args:
+            count: Number of worker processes
+            check_interval: Seconds between checks for exited workers
+        """
+        self.count = count
+        self.check_interval = check_interval
+        self.processes = {}
+        self.running = False
+        self.thread = None
+
+    def _spawn(self, index):
+        env = dict(os.environ, WEB_ROLE='worker', WEB_WORKER_ID=str(index))
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.Popen([sys.executable, os.path.join(root, 'app.py')], cwd=root, env=env)
+        self.processes[index] = process
+        logger.info(f"Started web worker {index} (pid {process.pid}).")
+
+    def start(self):
+        """Start the workers and watch them in the background."""
+        self.running = True
+        for index in range(self.count):
+            self._spawn(index)
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Send SIGTERM to the workers without waiting (this runs in the signal handler)."""
+        self.running = False
+        for process in self.processes.values():
+            if process.poll() is None:
+                process.terminate()
+
+    def status(self):
+        """Get the pid and state of each worker."""
+        return [{'worker': index, 'pid': process.pid, 'running': process.poll() is None}
+                for index, process in sorted(self.processes.items())]
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.check_interval)
+            for index, process in list(self.processes.items()):
+                if self.running and process.poll() is not None:
+                    logger.warning(f"Web worker {index} exited with code {process.returncode}; restarting it.")
+                    self._spawn(index)
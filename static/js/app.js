@@ -4,6 +4,10 @@ let activePreset = null;
 let selectedPresetId = null;
 let serverTimeOffset = 0;
 let isServerOnline = false; // Track server connection status
+let socket = null;
+let pumpRunningSince = null; // Local clock time matching the server-side pump start
+let pumpTimerInterval = null;
+let pumpZoneId = null; // Zone shown in the pump card (the server's default zone)
 
 // --- DOMContentLoaded ---
 document.addEventListener('DOMContentLoaded', () => {
@@ -11,15 +15,16 @@ document.addEventListener('DOMContentLoaded', () => {
     initializeEventListeners();
     initializeClock();
     loadAndDisplayPresets();
-    updatePumpStatus(); // Initial check
 });
 
 // --- INITIALIZATION ---
 function initializeSocketIO() {
-    const socket = io();
+    // Websocket only when the server runs several web workers (no sticky sessions)
+    socket = io({ transports: SOCKETIO_TRANSPORTS });
 
     socket.on('connect', () => {
         console.log('Connected to server via Socket.IO');
+        updatePumpStatus(); // Resync pump state after every (re)connect
     });
 
     socket.on('sensor_update', (data) => {
@@ -30,8 +35,9 @@ function initializeSocketIO() {
         updateSensorStatuses(statuses);
     });
 
-    socket.on('pump_status_update', (data) => {
-        updatePumpStatusUI(data);
+    socket.on('pump_status', (data) => {
+        // Pushed by the server on every start/stop, including scheduled and rule-triggered runs
+        if (pumpZoneId === null || data.zone === pumpZoneId) updatePumpStatusUI(data);
     });
 }
 
@@ -345,11 +351,26 @@ async function deleteSchedule(scheduleId) {
 
 // --- PUMP & SENSOR UI UPDATES ---
 
+function sendPumpCommand(command) {
+    // Sends a pump command over Socket.IO and resolves with the server's acknowledgement
+    return new Promise((resolve, reject) => {
+        if (!socket || !socket.connected) {
+            reject(new Error('Not connected to server'));
+            return;
+        }
+        const timer = setTimeout(() => reject(new Error('No acknowledgement from server')), 5000);
+        socket.emit('pump_command', command, (result) => {
+            clearTimeout(timer);
+            resolve(result);
+        });
+    });
+}
+
 async function manualPumpControl(action) {
     try {
-        const response = await fetch(`/api/irrigation/pump/${action}`, { method: 'POST' });
-        const data = await response.json();
-        showAlert(data.message, data.status);
+        const result = await sendPumpCommand({ action });
+        const alertType = { success: 'success', queued: 'info', warning: 'warning' }[result.status] || 'danger';
+        showAlert(result.message, alertType);
     } catch (error) {
         console.error(`Failed to ${action} pump:`, error);
         showAlert(`Error: Could not ${action} pump.`, 'danger');
@@ -358,29 +379,36 @@ async function manualPumpControl(action) {
 
 async function updatePumpStatus() {
     try {
-        const response = await fetch('/api/irrigation/pump/status');
-        if (response.ok) {
-            const data = await response.json();
-            updatePumpStatusUI(data);
-        }
+        const status = await sendPumpCommand({ action: 'status' });
+        pumpZoneId = status.zone;
+        updatePumpStatusUI(status);
     } catch (error) {
         console.error('Failed to fetch pump status:', error);
     }
 }
 
+function renderPumpRunningTime() {
+    const runningTimeEl = document.getElementById('running-time');
+    runningTimeEl.textContent = pumpRunningSince === null ? '0' : Math.round((Date.now() - pumpRunningSince) / 1000);
+}
+
 function updatePumpStatusUI(data) {
     const pumpStatusEl = document.getElementById('pump-status');
-    const runningTimeEl = document.getElementById('running-time');
-    
+
     if (data.running) {
         pumpStatusEl.textContent = 'Running';
         pumpStatusEl.className = 'badge bg-success';
-        runningTimeEl.textContent = Math.round(data.duration);
+        // The server reports how long the pump has run; anchor the local display to its start time
+        pumpRunningSince = Date.now() - data.duration * 1000;
+        if (!pumpTimerInterval) pumpTimerInterval = setInterval(renderPumpRunningTime, 1000);
     } else {
         pumpStatusEl.textContent = 'Stopped';
         pumpStatusEl.className = 'badge bg-danger';
-        runningTimeEl.textContent = '0';
+        pumpRunningSince = null;
+        clearInterval(pumpTimerInterval);
+        pumpTimerInterval = null;
     }
+    renderPumpRunningTime();
 }
 
 function updateSensorReadings(data) {
@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+import pytest
+
+# The hardware package imports the Raspberry Pi driver libraries
+pytest.importorskip('board')
+
+from hardware.acquisition import SharedMemorySensorController, SharedReadings, TRAILER, TRAILER_OFFSET
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def test_block_left_by_a_dead_writer_is_not_attached():
+    block = SharedReadings.create('test_acquisition_block', ['temperature'])
+    try:
+        controller = SharedMemorySensorController('test_acquisition_block')
+        live = controller._attach_live()
+        assert live is not None
+        live.close()
+
+        # Same block, but the process that wrote it is gone
+        checksum = TRAILER.unpack_from(block.shm.buf, TRAILER_OFFSET)[0]
+        TRAILER.pack_into(block.shm.buf, TRAILER_OFFSET, checksum, dead_pid())
+        assert controller._attach_live() is None
+    finally:
+        block.close()
@@ -0,0 +1,32 @@
+import json
+import sqlite3
+
+from reports.backfill import CSVBackfill, CREATE_TABLE_SQL, INSERT_SQL
+from shared.history import HISTORY_CHANGES_FILE
+
+def test_rows_covered_by_live_samples_are_skipped(tmp_path):
+    db_path = str(tmp_path / 'app.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute(CREATE_TABLE_SQL)
+    # The app's database sink stored two samples, offset from the CSV rows
+    for timestamp in ('2026-05-01 10:00:12.500000', '2026-05-01 10:01:12.500000'):
+        conn.execute(INSERT_SQL, (timestamp, 20.0, 50.0, 30.0, 1013.0, 40.0, 0.0))
+    conn.commit()
+    conn.close()
+
+    (tmp_path / '2026-05-01.csv').write_text(
+        "Timestamp,Temperature,Humidity,Soil,Pressure,Light,Rain\n"
+        "2026-05-01T10:00:00,20.1,50.1,30.1,1013.1,40.1,0.0\n"
+        "2026-05-01T10:01:00,20.2,50.2,30.2,1013.2,40.2,0.0\n"
+        "2026-05-01T10:02:00,20.3,50.3,30.3,1013.3,40.3,0.0\n"
+    )
+    totals = CSVBackfill(db_path, str(tmp_path), window=30).run()
+
+    assert totals['covered'] == 2
+    assert totals['inserted'] == 1
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM weather_data").fetchone()[0] == 3
+    conn.close()
+
+    # The running app is told to drop its cached results for the day
+    assert list(json.loads((tmp_path / HISTORY_CHANGES_FILE).read_text())) == ['2026-05-01']
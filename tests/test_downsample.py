@@ -0,0 +1,20 @@
+import numpy as np
+
+from shared.downsample import downsample, minmax_envelope
+
+def test_minmax_envelope_uses_odd_threshold_fully():
+    x = np.arange(10000, dtype=float)
+    y = np.random.default_rng(0).normal(size=10000)
+    y[-1] = 0.0
+
+    assert len(minmax_envelope(x, y, 801)) == 801
+    assert len(minmax_envelope(x, y, 800)) == 800
+
+def test_minmax_envelope_keeps_last_point_for_odd_threshold():
+    x = np.arange(100, dtype=float)
+    y = np.concatenate((np.linspace(0, 10, 50), np.linspace(9, 5, 50)))
+
+    indices = minmax_envelope(x, y, 3)
+
+    assert list(indices) == [0, 49, 99]
+    assert len(downsample(x, y, 3, 'minmax')) == 3
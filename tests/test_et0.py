@@ -0,0 +1,61 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+# Importing the weather package starts the sensor controller, which needs the Raspberry Pi driver libraries
+pytest.importorskip('board')
+
+from flask import Flask
+
+from shared.database import db
+from shared.history import HISTORY_CHANGES_FILE, mark_days_changed
+from weather.et0 import ET0Calculator, _runs
+from weather.models import WeatherData
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+
+def test_days_without_samples_are_not_cached(app):
+    calculator = ET0Calculator()
+    day = date.today() - timedelta(days=3)
+    assert calculator.daily(day, day)[0]['et0'] is None
+
+    # History arrives later, e.g. from a backfill
+    midnight = datetime.combine(day, datetime.min.time())
+    db.session.add_all(WeatherData(timestamp=midnight + timedelta(hours=hour), temperature=10 + hour % 12,
+                                   humidity=50, light=hour * 4) for hour in range(24))
+    db.session.commit()
+
+    entry = calculator.daily(day, day)[0]
+    assert entry['samples'] == 24
+    assert entry['et0'] is not None
+
+def test_backfilled_days_are_recomputed(app, tmp_path):
+    changes_path = str(tmp_path / HISTORY_CHANGES_FILE)
+    calculator = ET0Calculator(changes_path=changes_path)
+    day = date.today() - timedelta(days=2)
+    midnight = datetime.combine(day, datetime.min.time())
+
+    def add_hours(hours):
+        db.session.add_all(WeatherData(timestamp=midnight + timedelta(hours=hour), temperature=10 + hour % 12,
+                                       humidity=50, light=hour * 4) for hour in hours)
+        db.session.commit()
+
+    add_hours(range(6))
+    assert calculator.daily(day, day)[0]['samples'] == 6
+
+    # A backfill adds the rest of the day and records it in the marker file
+    add_hours(range(6, 24))
+    mark_days_changed(changes_path, [day])
+    assert calculator.daily(day, day)[0]['samples'] == 24
+
+def test_missing_days_are_split_into_runs():
+    first = date(2026, 5, 1)
+    days = [first, first + timedelta(days=1), first + timedelta(days=5), first + timedelta(days=6)]
+    assert _runs(days) == [(days[0], days[1]), (days[2], days[3])]
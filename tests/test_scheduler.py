@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from flask import Flask
+
+from irrigation.scheduler import DAYS_OF_WEEK, IrrigationScheduler
+
+def schedule(schedule_id):
+    return {'id': schedule_id, 'is_active': True, 'day_of_week': 'Monday', 'start_time': '06:00',
+            'duration_seconds': 60, 'zone_id': None}
+
+class ChangingCatalog:
+    """Catalog whose active preset gains a schedule while the first read is in flight."""
+
+    def __init__(self):
+        self.scheduler = None
+        self.reads = 0
+
+    def get_active(self):
+        self.reads += 1
+        if self.reads == 1:
+            self.scheduler.invalidate()
+            return {'id': 1, 'name': 'Summer', 'schedules': [schedule(1)]}
+        return {'id': 1, 'name': 'Summer', 'schedules': [schedule(1), schedule(2)]}
+
+def test_rebuild_does_not_lose_concurrent_changes():
+    catalog = ChangingCatalog()
+    scheduler = IrrigationScheduler(lambda entry: None, catalog)
+    catalog.scheduler = scheduler
+    scheduler.app = Flask(__name__)
+
+    scheduler._rebuild()
+
+    assert catalog.reads == 2
+    assert sorted(scheduler.entries) == [1, 2]
+    assert not scheduler.needs_rebuild
+
+def test_reused_schedule_id_keeps_only_its_own_fire_time():
+    scheduler = IrrigationScheduler(lambda entry: None, None)
+    preset = SimpleNamespace(id=1, name='Summer', is_active=True)
+    now = datetime.now()
+
+    def model(at):
+        return SimpleNamespace(id=5, is_active=True, day_of_week=DAYS_OF_WEEK[at.weekday()],
+                               start_time=at.time().replace(second=0, microsecond=0),
+                               duration_seconds=60, zone_id=None)
+
+    scheduler.add_schedule(model(now + timedelta(minutes=10)), preset)
+    scheduler.remove_schedule(5)
+    # SQLite hands the deleted id to the next schedule
+    scheduler.add_schedule(model(now + timedelta(hours=3)), preset)
+
+    runs = scheduler.next_runs()
+    assert len(runs) == 1
+    assert len(scheduler.heap) == 1
+    assert scheduler._pop_due(now + timedelta(minutes=11)) == []
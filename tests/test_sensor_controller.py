@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+# The hardware package imports the Raspberry Pi driver libraries
+pytest.importorskip('board')
+
+from hardware.circuit_breaker import OPEN
+from hardware.sensor_controller import SensorController
+
+class UnpluggedSensor:
+    """Behaves like the drivers with no device attached: no exception, only None values."""
+
+    def __init__(self):
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        return None
+
+def test_none_readings_open_the_breaker():
+    controller = SensorController()
+    controller.apply_breaker_config({'failure_threshold': 1, 'base_delay': 60, 'jitter': 0})
+    sensor = UnpluggedSensor()
+    controller.sensors = {}
+    controller.probed = True
+    controller.add_sensor('probe', sensor, 'probe_moisture')
+    controller.start_monitoring()
+    try:
+        deadline = time.monotonic() + 5
+        while controller.get_breaker('probe').state != OPEN and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.5)
+    finally:
+        controller.stop_monitoring()
+
+    health = controller.get_sensor_health()['probe']
+    assert health['status'] == 'Disconnected'
+    assert health['breaker']['state'] == OPEN
+    assert health['breaker']['successes'] == 0
+    assert sensor.reads == 1
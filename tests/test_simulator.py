@@ -0,0 +1,26 @@
+import numpy as np
+
+from irrigation.simulator import moisture_trajectory
+
+def clipped_walk(initial, deltas, capacity):
+    """Reference: clip to [0, capacity] after every step."""
+    level, levels = initial, []
+    for delta in deltas:
+        level = min(capacity, max(0.0, level + delta))
+        levels.append(level)
+    return np.array(levels)
+
+def test_dry_soil_recovers_after_rain():
+    moisture = moisture_trajectory(50, [-20, -20, -20, -20, 10, 10, 10], 100)
+    np.testing.assert_allclose(moisture, [30, 10, 0, 0, 10, 20, 30])
+
+def test_drains_above_capacity_then_dries_out():
+    moisture = moisture_trajectory(90, [20, -50, -80, 30, 100, -10], 100)
+    np.testing.assert_allclose(moisture, [100, 50, 0, 30, 100, 90])
+
+def test_matches_step_by_step_clipping():
+    rng = np.random.default_rng(0)
+    for initial in (0, 40, 100):
+        deltas = rng.normal(0, 15, 500)
+        np.testing.assert_allclose(moisture_trajectory(initial, deltas, 100),
+                                   clipped_walk(initial, deltas, 100))
@@ -2,33 +2,45 @@ from datetime import datetime
 from shared.database import db
 from shared.socketio import socketio
 from .models import WeatherData
+from .et0 import ET0Calculator
+from shared.config import get_config
+from shared.network import network_info
+from shared.boot import boot
+from shared.event_log import event_log
+from shared.history import HISTORY_CHANGES_FILE
 import time
 import threading
 import logging
 from flask import current_app
 
 # Import the sensor controller
-from hardware.sensor_controller import SensorController
+from hardware.acquisition import create_sensor_controller
 from hardware.lcd_16x2 import LCD
-import subprocess
+from hardware.executor import hardware_executor
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-import platform
 import os
 
 # Get configuration from environment or use defaults
 UI_UPDATE_INTERVAL = int(os.environ.get('UI_UPDATE_INTERVAL', 2))  # 2 seconds default
 DB_UPDATE_INTERVAL = int(os.environ.get('DB_UPDATE_INTERVAL', 60))  # 60 seconds default
 
-# Initialize a single sensor controller instance
-sensor_controller = SensorController()
+# Initialize a single sensor controller instance (local sensors or the acquisition process)
+sensor_controller = create_sensor_controller()
+
+# ET0 from the stored history, for water-aware scheduling
+et0_calculator = ET0Calculator(
+    latitude=get_config().get('irrigation.et0.latitude', 45.0),
+    changes_path=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', HISTORY_CHANGES_FILE)
+)
 
 # LCD display instance - will be initialized in init_app
 lcd = None
 lcd_thread = None
 lcd_running = False
+lcd_readings = {}
 
 def init_app(app):
     """
@@ -41,29 +53,38 @@ def init_app(app):
         # Pass the app and socketio instances to the sensor controller
         sensor_controller.set_app(app)
         sensor_controller.set_socketio(socketio)
+        sensor_controller.apply_breaker_config(get_config().get('hardware.circuit_breaker', {}))
         
-        # Start all monitoring threads (sensor reading, UI broadcasting, CSV logging)
+        # Open the sensors, then start all monitoring threads (sensor reading, UI broadcasting, CSV logging)
+        with boot.phase('sensors'):
+            sensor_controller.probe_sensors()
         sensor_controller.start_monitoring()
         
+        # Store a sample every DB_UPDATE_INTERVAL seconds through the batched event log
+        sensor_controller.subscribe('database', persist_readings, policy='coalesce', min_interval=DB_UPDATE_INTERVAL)
+        
         config = app.config.get_namespace('')
         lcd_config = config.get('hardware', {}).get('sensors', {}).get('pins', {}).get('lcd', {})
-        lcd = LCD(
-            cols=lcd_config.get('cols', 16), 
-            rows=lcd_config.get('rows', 2), 
-            pin_rs=lcd_config.get('pin_rs', 25), 
-            pin_e=lcd_config.get('pin_e', 24), 
-            pins_data=lcd_config.get('pins_data', [23, 17, 18, 22])
-        )
+        with boot.phase('lcd'):
+            # GPIO setup and every LCD write run through the hardware executor
+            lcd = hardware_executor.call(
+                'lcd', LCD,
+                timeout=hardware_executor.timeout_for('probe'),
+                cols=lcd_config.get('cols', 16), 
+                rows=lcd_config.get('rows', 2), 
+                pin_rs=lcd_config.get('pin_rs', 25), 
+                pin_e=lcd_config.get('pin_e', 24), 
+                pins_data=lcd_config.get('pins_data', [23, 17, 18, 22])
+            )
         
-        from app import get_network_ssid
-        network_ssid = get_network_ssid()
-        ip_address = app.config.get('IP_ADDRESS', '127.0.0.1')
-        port = app.config.get('PORT', 5000)
+        network = network_info.get()
         
-        lcd.clear()
-        lcd.write_line(0, f"Network: {network_ssid}")
-        lcd.write_line(1, f"{ip_address}")
+        hardware_executor.call('lcd', lcd.clear)
+        hardware_executor.call('lcd', lcd.render, [f"Network: {network['ssid']}", network['ip_address']])
+        network_info.add_listener(_on_network_change)
+        get_config().subscribe(_on_lcd_config_change, ['hardware.sensors.pins.lcd'])
         
+        sensor_controller.subscribe('lcd', _on_lcd_readings, policy='coalesce')
         lcd_running = True
         lcd_thread = threading.Thread(target=lcd_update_loop, args=(app,))
         lcd_thread.daemon = True
@@ -76,90 +97,89 @@ def init_app(app):
     logger.info("Weather controller initialized and monitoring started.")
     return sensor_controller
 
-def get_pressure_display():
-    """Get formatted pressure display data."""
-    from hardware.bmp180 import BMP180Sensor
-    
-    try:
-        # Create a BMP180 sensor instance
-        bmp_sensor = BMP180Sensor()
-        
-        # Get the pressure reading
-        _, pressure, _ = bmp_sensor.read()
-        
-        if pressure is None:
-            return ("Pressure:", "Not available")
-        
-        # Format the pressure reading
-        return (f"Pressure:", f"{pressure:.1f} hPa")
-    except Exception:
-        return ("Pressure:", "Error")
-
-def get_light_display():
-    """Get formatted light display data."""
-    from hardware.ldr_aout import LDRSensor
-    
-    try:
-        # Create an LDR sensor instance
-        ldr_sensor = LDRSensor()
-        
-        # Get the light percentage
-        light = ldr_sensor.get_light_percentage()
-        
-        if light is None:
-            return ("Light Level:", "Not available")
-        
-        # Format the light reading
-        return (f"Light Level:", f"{light:.1f}%")
-    except Exception:
-        return ("Light Level:", "Error")
-
-def get_rain_display():
-    """Get formatted rain display data."""
-    from hardware.rain_aout import RainSensor
-    
-    try:
-        # Create a Rain sensor instance
-        rain_sensor = RainSensor()
-        
-        # Get the rain percentage
-        rain = rain_sensor.get_rain_percentage()
-        
-        if rain is None:
-            return ("Rain Level:", "Not available")
-        
-        # Format the rain reading
-        return (f"Rain Level:", f"{rain:.1f}%")
-    except Exception:
-        return ("Rain Level:", "Error")
+# Set when the network changes so the LCD shows it next
+lcd_network_changed = threading.Event()
+
+def _on_network_change(info):
+    """Shows the new network on the LCD at its next update."""
+    lcd_network_changed.set()
+
+# Single-reading pages after network, address and temperature/humidity
+LCD_SENSOR_PAGES = (
+    ("Soil Moisture:", 'soil_moisture', '%'),
+    ("Pressure:", 'pressure', ' hPa'),
+    ("Light Level:", 'light', '%'),
+    ("Rain Level:", 'rain', '%')
+)
+LCD_PAGE_COUNT = 3 + len(LCD_SENSOR_PAGES)
+
+def _on_lcd_readings(readings, changed_keys):
+    """Sink: keep the newest readings for the next LCD page."""
+    global lcd_readings
+    lcd_readings = readings
+
+def persist_readings(readings, changed_keys):
+    """Sink: queue a WeatherData row; samples without temperature and humidity are skipped."""
+    if readings.get('temperature') is None or readings.get('humidity') is None:
+        return
+    event_log.log(
+        WeatherData,
+        timestamp=datetime.fromisoformat(readings['timestamp']),
+        temperature=readings['temperature'],
+        humidity=readings['humidity'],
+        soil_moisture=readings.get('soil_moisture'),
+        pressure=readings.get('pressure'),
+        light=readings.get('light'),
+        rain=readings.get('rain')
+    )
+
+def _on_lcd_config_change(snapshot, changed_keys):
+    """Redraws the LCD after its configuration changed; pin changes still need a restart."""
+    if lcd:
+        lcd.invalidate()
+    # changed_keys lists every key of the reload, not only the LCD ones
+    lcd_keys = [key for key in changed_keys if key.startswith('hardware.sensors.pins.lcd.')]
+    if any(not key.endswith('.page_seconds') for key in lcd_keys):
+        logger.warning("LCD pin or size changes take effect after a restart.")
+
+def format_reading(value, unit, fmt='.1f'):
+    """Format a sensor reading for the LCD, or '--' when it is missing."""
+    return f"{value:{fmt}}{unit}" if isinstance(value, (int, float)) else "--"
+
+def render_lcd_page(page, readings, network, port):
+    """Build the two lines of an LCD page from a snapshot of the readings."""
+    if page == 0:
+        return "Network:", network['ssid']
+    if page == 1:
+        return network['ip_address'], f"Port:{port}"
+    if page == 2:
+        return (f"Temp: {format_reading(readings.get('temperature'), 'C')}",
+                f"Humid: {format_reading(readings.get('humidity'), '%')}")
+    label, key, unit = LCD_SENSOR_PAGES[page - 3]
+    return label, format_reading(readings.get(key), unit)
 
 def lcd_update_loop(app):
-    """Background thread for updating LCD display."""
+    """Background thread for updating LCD display.
+    
+    Pages are rendered from the newest readings delivered to the 'lcd' sink
+    and the cached network info; the LCD only rewrites the cells that changed.
+    """
     global lcd_running
     time.sleep(5)
     
-    from app import get_network_ssid
-    display_modes = [
-        lambda: (f"Network:", f"{get_network_ssid()}"),
-        lambda: (f"{app.config.get('IP_ADDRESS', '127.0.0.1')[:16]}", f"Port:{app.config.get('PORT', 5000)}"),
-        lambda: (f"Temp: {sensor_controller.get_latest_readings().get('temperature', 0):.1f}C", f"Humid: {sensor_controller.get_latest_readings().get('humidity', 0):.1f}%"),
-        lambda: (f"Soil Moisture:", f"{sensor_controller.get_latest_readings().get('soil_moisture', 0):.1f}%"),
-        lambda: (f"Pressure:", f"{sensor_controller.get_latest_readings().get('pressure', 0):.1f} hPa"),
-        lambda: (f"Light Level:", f"{sensor_controller.get_latest_readings().get('light', 0):.1f}%"),
-        lambda: (f"Rain Level:", f"{sensor_controller.get_latest_readings().get('rain', 0):.1f}%")
-    ]
-    
-    current_mode = 0
+    port = app.config.get('PORT', 5000)
+    current_page = 0
     while lcd_running and lcd:
         try:
-            line1, line2 = display_modes[current_mode]()
-            lcd.clear()
-            lcd.write_line(0, line1)
-            lcd.write_line(1, line2)
-            current_mode = (current_mode + 1) % len(display_modes)
-            time.sleep(3)
+            if lcd_network_changed.is_set():
+                lcd_network_changed.clear()
+                current_page = 0
+            hardware_executor.call('lcd', lcd.render, render_lcd_page(current_page, lcd_readings, network_info.get(), port))
+            current_page = (current_page + 1) % LCD_PAGE_COUNT
+            time.sleep(get_config().get('hardware.sensors.pins.lcd.page_seconds', 3))
         except Exception as e:
             logger.error(f"Error in LCD update loop: {e}")
+            lcd.invalidate()
             time.sleep(1)
 
 def get_current_weather_data():
@@ -183,31 +203,95 @@ def update_weather_data(data):
     db.session.commit()
     logger.info(f"Logged new weather data to database: {data}")
 
-def get_network_ssid():
-    """Get the SSID of the connected WiFi network."""
-    try:
-        if platform.system() == "Linux":
-            # For Raspberry Pi / Linux
-            result = subprocess.check_output(['iwgetid', '-r']).decode('utf-8').strip()
-            return result if result else "Not connected"
-        else:
-            # For other OS (e.g., development)
-            return "Dev-SSID"  # Placeholder for development
-    except Exception as e:
-        logger.error(f"Error getting network SSID: {e}")
-        return "Unknown"
-
 def display_shutdown():
     """Display shutdown message on the LCD."""
     global lcd
     if lcd:
         try:
-            lcd.clear()
-            lcd.write_line(0, "System")
-            lcd.write_line(1, "Shutting Down...")
+            hardware_executor.call('lcd', lcd.render, ["System", "Shutting Down..."])
         except Exception:
             pass
 
 def get_latest_weather_data():
     """Get the latest weather data from the controller."""
     return sensor_controller.get_latest_readings()
+
+def get_sensor_health():
+    """Get the connection status and circuit breaker state of each sensor."""
+    return sensor_controller.get_sensor_health()
+
+def get_sensor_bus_status():
+    """Get the sensor bus sinks (queue depth, drops, latency) and per-reading sample metrics."""
+    return sensor_controller.get_bus_status()
+
+# Fields that can be requested from the history endpoint
+HISTORY_FIELDS = ('temperature', 'humidity', 'soil_moisture', 'pressure', 'light', 'rain')
+# Downsampling returns every row below 3 points, so the point count is bounded both ways
+MIN_HISTORY_POINTS = 3
+MAX_HISTORY_POINTS = 10000
+
+def get_et0(start_day, end_day, resolution='daily'):
+    """Get reference evapotranspiration (mm) per day or per hour.
+    
+    Args:
+        start_day: First day (date)
+        end_day: Last day (date, inclusive)
+        resolution: 'daily' or 'hourly'
+        
+    Returns:
+        dict: Latitude, resolution and the computed values
+    """
+    if resolution == 'hourly':
+        values = [{'timestamp': hour.isoformat(), 'et0': value}
+                  for hour, value in et0_calculator.hourly(start_day, end_day)]
+    elif resolution == 'daily':
+        values = [{key: value for key, value in day.items() if key != 'hourly'}
+                  for day in et0_calculator.daily(start_day, end_day)]
+    else:
+        raise ValueError(f"Unknown resolution: {resolution}. Use 'daily' or 'hourly'.")
+    return {'latitude': et0_calculator.latitude, 'resolution': resolution, 'values': values}
+
+def get_weather_history(field, start, end, points=800, method='lttb', source='auto'):
+    """Get a chart-ready, downsampled series for a single weather field.
+    
+    Args:
+        field: Name of the WeatherData column to return
+        start: Start of the range (datetime)
+        end: End of the range (datetime, exclusive)
+        points: Maximum number of points to return (MIN_HISTORY_POINTS to MAX_HISTORY_POINTS)
+        method: 'lttb' or 'minmax'
+        source: 'db', 'csv' or 'auto' (database, falling back to CSV logs)
+        
+    Returns:
+        dict: Columnar payload with the selected points
+    """
+    import numpy as np
+    from shared.downsample import downsample
+    from shared.serialization import build_columnar
+    
+    if field not in HISTORY_FIELDS:
+        raise ValueError(f"Unknown field: {field}. Use one of {', '.join(HISTORY_FIELDS)}.")
+    if not MIN_HISTORY_POINTS <= points <= MAX_HISTORY_POINTS:
+        raise ValueError(f"points must be between {MIN_HISTORY_POINTS} and {MAX_HISTORY_POINTS}.")
+    
+    rows = []
+    if source in ('db', 'auto'):
+        column = getattr(WeatherData, field)
+        rows = db.session.query(WeatherData.timestamp, column).filter(
+            WeatherData.timestamp >= start,
+            WeatherData.timestamp < end,
+            column.isnot(None)
+        ).order_by(WeatherData.timestamp.asc()).all()
+    if source == 'csv' or (source == 'auto' and not rows):
+        from reports.csv_store import get_csv_store
+        store = get_csv_store(current_app.config)
+        rows = [row for row in store.query(start, end, [field]) if row[1] is not None]
+    
+    timestamps = np.fromiter((row[0].timestamp() for row in rows), dtype=float, count=len(rows))
+    values = np.fromiter((row[1] for row in rows), dtype=float, count=len(rows))
+    indices = downsample(timestamps, values, points, method)
+    
+    result = build_columnar(((rows[i][0], float(values[i])) for i in indices), [field])
+    result['method'] = method
+    result['source_count'] = len(rows)
+    return result
@@ -0,0 +1,228 @@
+"""
+Reference evapotranspiration (ET0) from the onboard sensors.
+
+Daily ET0 uses the Hargreaves equation (FAO-56, eq. 52), which needs only
+the daily minimum, maximum and mean temperature and the extraterrestrial
+radiation for the site latitude. Penman-Monteith would also need wind speed
+and net radiation, which the station does not measure. Hourly values
+distribute the daily ET0 over the day in proportion to the light sensor
+(or, without light readings, to the temperature above the daily minimum).
+
+Days are aggregated with NumPy, one query per run of uncached days. Closed
+days with samples are cached once they have settled; today and days without
+samples are recomputed on each request. Days a backfill added rows to are
+dropped from the cache (see shared.history).
+"""
+
+import logging
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import has_app_context
+
+from shared.database import db
+from shared.history import HistoryChanges
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SOLAR_CONSTANT = 0.0820  # MJ m-2 min-1
+
+def extraterrestrial_radiation(latitude, day_of_year):
+    """Daily extraterrestrial radiation Ra in MJ m-2 day-1 (FAO-56, eq. 21).
+
+    Args:
+        latitude: Site latitude in degrees (negative south of the equator)
+        day_of_year: Day number(s) 1-366, scalar or array
+    """
+    phi = np.radians(latitude)
+    j = np.asarray(day_of_year, dtype=float)
+    inverse_distance = 1 + 0.033 * np.cos(2 * np.pi * j / 365)
+    declination = 0.409 * np.sin(2 * np.pi * j / 365 - 1.39)
+    sunset_angle = np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1.0, 1.0))
+    return (24 * 60 / np.pi) * SOLAR_CONSTANT * inverse_distance * (
+        sunset_angle * np.sin(phi) * np.sin(declination)
+        + np.cos(phi) * np.cos(declination) * np.sin(sunset_angle)
+    )
+
+def hargreaves(t_min, t_max, t_mean, ra):
+    """Daily reference evapotranspiration in mm (FAO-56, eq. 52).
+
+    Args:
+        t_min, t_max, t_mean: Daily temperatures in degrees Celsius (scalars or arrays)
+        ra: Extraterrestrial radiation in MJ m-2 day-1
+    """
+    t_range = np.maximum(np.asarray(t_max, dtype=float) - np.asarray(t_min, dtype=float), 0.0)
+    et0 = 0.0023 * 0.408 * ra * (np.asarray(t_mean, dtype=float) + 17.8) * np.sqrt(t_range)
+    return np.maximum(et0, 0.0)
+
+def aggregate_days(timestamps, temperature, light, latitude):
+    """Compute daily and hourly ET0 for every day present in the samples.
+
+    Args:
+        timestamps: numpy datetime64[s] array, sorted ascending
+        temperature: Temperatures in degrees Celsius
+        light: Light readings (NaN where missing)
+        latitude: Site latitude in degrees
+
+    Returns:
+        list: One dict per day with date, et0, t_min, t_max, t_mean, samples and hourly (24 values)
+    """
+    if len(timestamps) == 0:
+        return []
+    days = timestamps.astype('datetime64[D]')
+    hours = ((timestamps - days).astype('timedelta64[h]').astype(int)).clip(0, 23)
+    day_values, starts, counts = np.unique(days, return_index=True, return_counts=True)
+
+    t_min = np.minimum.reduceat(temperature, starts)
+    t_max = np.maximum.reduceat(temperature, starts)
+    t_mean = np.add.reduceat(temperature, starts) / counts
+    day_of_year = np.array([d.timetuple().tm_yday for d in day_values.astype(date)])
+    daily = hargreaves(t_min, t_max, t_mean, extraterrestrial_radiation(latitude, day_of_year))
+
+    # Hourly weights: light where it was measured, else warmth above the daily minimum
+    day_index = np.repeat(np.arange(len(day_values)), counts)
+    has_light = ~np.isnan(light)
+    weight = np.where(has_light, np.nan_to_num(light), temperature - t_min[day_index])
+    weight = np.maximum(weight, 0.0)
+    hourly_weight = np.zeros((len(day_values), 24))
+    np.add.at(hourly_weight, (day_index, hours), weight)
+    totals = hourly_weight.sum(axis=1, keepdims=True)
+    shares = np.divide(hourly_weight, totals, out=np.full_like(hourly_weight, 1 / 24), where=totals > 0)
+    hourly = shares * daily[:, None]
+
+    return [{
+        'date': day_values[i].astype(date).isoformat(),
+        'et0': round(float(daily[i]), 3),
+        't_min': round(float(t_min[i]), 2),
+        't_max': round(float(t_max[i]), 2),
+        't_mean': round(float(t_mean[i]), 2),
+        'samples': int(counts[i]),
+        'hourly': [round(float(value), 4) for value in hourly[i]]
+    } for i in range(len(day_values))]
+
+def _runs(days):
+    """Split sorted dates into (first, last) runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and (day - runs[-1][1]).days == 1:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+class ET0Calculator:
+    """Daily and hourly ET0 over the stored history, cached per closed day."""
+
+    def __init__(self, latitude=45.0, changes_path=None, settle_time=timedelta(minutes=10)):
+        """Initialize the calculator.
+
+        Args:
+            latitude: Site latitude in degrees
+            changes_path: Marker file of backfilled days (shared.history), or None
+            settle_time: How long after midnight a day is still recomputed, so
+                         samples still queued for the database are included
+        """
+        self.latitude = latitude
+        self.app = None
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.changes = HistoryChanges(changes_path) if changes_path else None
+        self.settle_time = settle_time
+
+    def set_app(self, app):
+        """Set the Flask app used to query the history outside a request."""
+        self.app = app
+
+    def invalidate(self, day=None):
+        """Drop cached days (all of them, or one date), e.g. after a history backfill."""
+        with self.lock:
+            if day is None:
+                self.cache.clear()
+            else:
+                self.cache.pop(day, None)
+
+    def _query(self, start, end):
+        """Load temperature and light samples of [start, end) with one query."""
+        from .models import WeatherData
+
+        rows = db.session.query(WeatherData.timestamp, WeatherData.temperature, WeatherData.light).filter(
+            WeatherData.timestamp >= start,
+            WeatherData.timestamp < end,
+            WeatherData.temperature.isnot(None)
+        ).order_by(WeatherData.timestamp.asc()).all()
+        timestamps = np.array([row[0] for row in rows], dtype='datetime64[s]')
+        temperature = np.fromiter((row[1] for row in rows), dtype=float, count=len(rows))
+        light = np.fromiter((np.nan if row[2] is None else row[2] for row in rows), dtype=float, count=len(rows))
+        return timestamps, temperature, light
+
+    def _compute(self, start_day, end_day):
+        """Aggregate the days from start_day to end_day inclusive."""
+        start = datetime.combine(start_day, datetime.min.time())
+        end = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+        if self.app is not None and not has_app_context():
+            with self.app.app_context():
+                samples = self._query(start, end)
+        else:
+            samples = self._query(start, end)
+        return {date.fromisoformat(day['date']): day for day in aggregate_days(*samples, self.latitude)}
+
+    def daily(self, start_day, end_day):
+        """Get ET0 for each day from start_day to end_day inclusive.
+
+        Closed days are served from the cache; each run of consecutive
+        missing days (today included) is computed with one query. Days
+        without samples are not cached, and a day is only cached once it
+        has been closed for settle_time, so history stored later is picked up.
+
+        Returns:
+            list: Day dicts in date order; days without samples have et0 None
+        """
+        if self.changes is not None:
+            for day in self.changes.poll():
+                self.invalidate(day)
+        now = datetime.now()
+        today = now.date()
+        settled = (now - self.settle_time).date()
+        requested = [start_day + timedelta(days=i) for i in range((end_day - start_day).days + 1)]
+        with self.lock:
+            missing = [day for day in requested if day >= today or day not in self.cache]
+        computed = {}
+        for first, last in _runs(missing):
+            computed.update(self._compute(first, last))
+
+        result = []
+        with self.lock:
+            for day in requested:
+                if day in missing:
+                    entry = computed.get(day) or {'date': day.isoformat(), 'et0': None, 'samples': 0, 'hourly': None}
+                    if day < settled and entry['samples']:
+                        self.cache[day] = entry
+                else:
+                    entry = self.cache[day]
+                result.append(entry)
+        if missing:
+            logger.debug(f"ET0 computed for {len(missing)} day(s) from {min(missing)} to {max(missing)}.")
+        return result
+
+    def hourly(self, start_day, end_day):
+        """Get hourly ET0 values between two days inclusive.
+
+        Returns:
+            list: (datetime of the hour start, ET0 in mm) tuples for days with samples
+        """
+        hours = []
+        for day in self.daily(start_day, end_day):
+            if not day['hourly']:
+                continue
+            midnight = datetime.fromisoformat(day['date'])
+            hours.extend((midnight + timedelta(hours=hour), value) for hour, value in enumerate(day['hourly']))
+        return hours
+
+    def recent_average(self, days):
+        """Get the mean daily ET0 of the last closed days that have samples, or None."""
+        yesterday = date.today() - timedelta(days=1)
+        values = [day['et0'] for day in self.daily(yesterday - timedelta(days=days - 1), yesterday)
+                  if day['et0'] is not None]
+        return sum(values) / len(values) if values else None
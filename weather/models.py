@@ -12,7 +12,7 @@ class WeatherData(db.Model):
     pressure = db.Column(db.Float, nullable=True)
     light = db.Column(db.Float, nullable=True)
     rain = db.Column(db.Float, nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.now)
+    timestamp = db.Column(db.DateTime, default=datetime.now, index=True)
     
     def to_dict(self):
         """Convert the model to a dictionary."""
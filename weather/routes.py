@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
-from .controllers import get_latest_weather_data, update_weather_data
+from datetime import date, datetime, timedelta
+from shared.workers import worker_local
+from .controllers import get_latest_weather_data, update_weather_data, get_weather_history, get_et0, get_sensor_bus_status, get_sensor_health
 
 weather_bp = Blueprint('weather', __name__)
 
@@ -8,8 +10,64 @@ def current_weather():
     """Get current weather data."""
     return jsonify(get_latest_weather_data())
 
+@weather_bp.route('/api/weather/sensors/status', methods=['GET'])
+def sensor_status():
+    """Get each sensor's connection status and circuit breaker state (closed, open, half_open)."""
+    return jsonify(get_sensor_health())
+
+@weather_bp.route('/api/weather/sensors/bus', methods=['GET'])
+def sensor_bus_status():
+    """Get the sinks of the sensor bus with their queue depth, drops and delivery latency."""
+    return jsonify(get_sensor_bus_status())
+
 @weather_bp.route('/api/weather/update', methods=['POST'])
 def update_weather():
     """Update weather data (protected endpoint for sensors)."""
     data = request.json
-    return jsonify(update_weather_data(data))
\ No newline at end of file
+    return jsonify(update_weather_data(data))
+
+@weather_bp.route('/api/weather/history', methods=['GET'])
+@worker_local
+def weather_history():
+    """Get a downsampled history of one field for charting.
+    
+    Query parameters: field, start, end (ISO dates or datetimes),
+    points (default 800), method ('lttb' or 'minmax') and
+    source ('db', 'csv' or 'auto').
+    """
+    field = request.args.get('field', 'soil_moisture')
+    method = request.args.get('method', 'lttb')
+    source = request.args.get('source', 'auto')
+    try:
+        points = int(request.args.get('points', 800))
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else datetime.now()
+        start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=7)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid points or date format. Use ISO 8601."}), 400
+    
+    try:
+        return jsonify(get_weather_history(field, start, end, points, method, source))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@weather_bp.route('/api/weather/et0', methods=['GET'])
+@worker_local
+def weather_et0():
+    """Get reference evapotranspiration computed from the stored history.
+    
+    Query parameters: start, end (ISO dates, default the last 7 days) and
+    resolution ('daily' or 'hourly').
+    """
+    resolution = request.args.get('resolution', 'daily')
+    try:
+        end = date.fromisoformat(request.args['end']) if 'end' in request.args else date.today()
+        start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=6)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid date format. Use YYYY-MM-DD."}), 400
+    if start > end or (end - start).days > 366:
+        return jsonify({"status": "error", "message": "Range must be ascending and at most a year."}), 400
+    
+    try:
+        return jsonify(get_et0(start, end, resolution))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400